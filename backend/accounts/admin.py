@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import HemisEndpoint
 
-# Register your models here.
+
+@admin.register(HemisEndpoint)
+class HemisEndpointAdmin(admin.ModelAdmin):
+    list_display = ('user_type', 'base', 'path', 'auth', 'successes', 'failures', 'latency_ms', 'retry_after', 'last_error')
+    list_filter = ('user_type',)
+    readonly_fields = ('successes', 'failures', 'latency_ms', 'last_success_at', 'last_failure_at', 'last_error')
@@ -0,0 +1,125 @@
+"""
+Token authentication without a query per request.
+
+DRF's ``TokenAuthentication`` loads the token and its user on every request.
+``CachedTokenAuthentication`` keeps resolved tokens in a bounded in-process
+LRU (``TOKEN_CACHE_SIZE`` entries, ``TOKEN_CACHE_TTL`` seconds) and, when
+``TOKEN_CACHE_ALIAS`` names a cache, in that shared cache too, so a worker
+that has not seen a token yet still skips the database.
+
+Entries hold the user's column values (never the password hash) and every
+request gets its own fresh ``User`` built from them, so nothing cached on one
+request's user (``user.profile``...) leaks into another. Only safe methods
+use the cache: writes load the real user, so ``save()`` never writes back a
+stale copy and ``check_password`` sees the current hash.
+
+accounts.signals drops a token's entries when it is deleted and when its
+user is saved (password change, deactivation). That clears this process and
+the shared cache at once; other processes' LRUs expire within the TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Everything the request needs of a user; the password hash stays in the DB
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+class TokenCache:
+    """Thread-safe LRU of ``token key -> user values`` with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, values = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return values
+
+    def set(self, key, values):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, values)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+token_cache = TokenCache(
+    getattr(settings, 'TOKEN_CACHE_SIZE', 10000),
+    getattr(settings, 'TOKEN_CACHE_TTL', 60),
+)
+
+
+def shared_cache():
+    alias = getattr(settings, 'TOKEN_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def _shared_key(key):
+    return f'auth-token:{key}'
+
+
+def invalidate_token(key):
+    token_cache.delete(key)
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(_shared_key(key))
+
+
+def invalidate_user(user):
+    for key in Token.objects.filter(user=user).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate(self, request):
+        self.safe = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        if not self.safe:
+            return super().authenticate_credentials(key)
+
+        values = token_cache.get(key)
+        if values is None:
+            cache = shared_cache()
+            values = cache.get(_shared_key(key)) if cache is not None else None
+            if values is None:
+                user, token = super().authenticate_credentials(key)
+                values = tuple(getattr(user, name) for name in USER_FIELDS)
+                if cache is not None:
+                    cache.set(_shared_key(key), values, getattr(settings, 'TOKEN_CACHE_SHARED_TTL', 300))
+                token_cache.set(key, values)
+                return user, token
+            token_cache.set(key, values)
+
+        user = User.from_db('default', USER_FIELDS, values)
+        token = Token(key=key, user=user)
+        token._state.adding = False
+        return user, token
@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from core.exports import Export
+
+users = Export(
+    lambda: User.objects.order_by('pk'),
+    {
+        'id': 'pk',
+        'username': 'username',
+        'email': 'email',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'hemis_id': 'profile__hemis_id',
+        'is_staff': 'is_staff',
+        'is_active': 'is_active',
+        'date_joined': 'date_joined',
+        'last_login': 'last_login',
+    },
+)
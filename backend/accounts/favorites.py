@@ -0,0 +1,65 @@
+"""
+Batch changes to a profile's favourites.
+
+``profile.favourites.add()``/``remove()`` work one relation manager call at a
+time; these write a whole batch with one INSERT or DELETE on the through
+table and then send the same ``m2m_changed`` actions Django would, with
+``pk_set`` holding only the books that really changed. The receivers in
+accounts.signals therefore keep ``Book.favorite_count``, the profile ETag and
+the popular list in step exactly as for single adds and removes.
+"""
+from django.db import router, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import m2m_changed
+from books.models import Book
+from .models import UserProfile
+
+Favourite = UserProfile.favourites.through
+MAX_BATCH = 500
+
+
+def favourite_state(profile, book_ids):
+    """``{book_id: is_favourite}`` for the ``book_ids`` that exist, in one query."""
+    marked = Favourite.objects.filter(userprofile=profile, book=OuterRef('pk'))
+    return dict(
+        Book.objects.filter(pk__in=book_ids)
+        .annotate(is_favourite=Exists(marked))
+        .values_list('pk', 'is_favourite')
+    )
+
+
+def favourite_ids(profile, book_ids):
+    return set(Favourite.objects.filter(userprofile=profile, book_id__in=book_ids).values_list('book_id', flat=True))
+
+
+def send_changed(profile, action, pk_set):
+    for stage in ('pre', 'post'):
+        m2m_changed.send(
+            sender=Favourite, instance=profile, action=f'{stage}_{action}', reverse=False,
+            model=Book, pk_set=set(pk_set), using=router.db_for_write(Favourite, instance=profile),
+        )
+
+
+def add_favourites(profile, book_ids):
+    """Add existing ``book_ids`` not yet in favourites; returns the ones added."""
+    book_ids = set(book_ids)
+    if not book_ids:
+        return set()
+    with transaction.atomic():
+        # A concurrent request may have added some of them: the unique pair decides
+        Favourite.objects.bulk_create(
+            [Favourite(userprofile=profile, book_id=pk) for pk in book_ids], ignore_conflicts=True
+        )
+        send_changed(profile, 'add', book_ids)
+    return book_ids
+
+
+def remove_favourites(profile, book_ids):
+    """Remove ``book_ids`` from favourites; returns the ones that were there."""
+    book_ids = favourite_ids(profile, book_ids)
+    if not book_ids:
+        return set()
+    with transaction.atomic():
+        Favourite.objects.filter(userprofile=profile, book_id__in=book_ids).delete()
+        send_changed(profile, 'remove', book_ids)
+    return book_ids
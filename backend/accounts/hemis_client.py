@@ -0,0 +1,212 @@
+"""
+Pooled HTTP client for the HEMIS OAuth servers.
+
+The token exchange used to try every (domain, path, auth style) candidate one
+after another with a fresh connection and a 10s timeout each, so a login
+could wait on a dead domain for over a minute. ``HemisClient.exchange`` races
+the candidates instead: at most ``concurrency`` requests are in flight, in
+the given priority order, the first one that returns an access token wins
+and the others are cancelled, and the whole exchange gives up after
+``deadline`` seconds.
+
+All requests share one ``httpx.AsyncClient`` (keep-alive, connection limits)
+running on a background event loop thread, so views stay synchronous and
+the follow-up user info request reuses the winner's connection. The loop is
+recreated in a forked worker.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Compatible; KutubxonaBot/1.0)',
+    'Accept': 'application/json',
+}
+AUTH_STYLES = ('body', 'basic')
+
+
+class Endpoint(namedtuple('Endpoint', 'base path auth')):
+    """One way to exchange a code: ``base`` URL, token ``path``, ``auth`` style."""
+
+    @property
+    def url(self):
+        return f'{self.base}{self.path}'
+
+    @property
+    def domain(self):
+        return urlsplit(self.base).netloc
+
+
+# ``data`` is the token response of a winner; ``error`` says why an attempt lost
+# and ``status`` is the HTTP status it got, if it got one
+Attempt = namedtuple('Attempt', 'endpoint ok data error elapsed status')
+Exchange = namedtuple('Exchange', 'winner attempts')
+
+
+class TokenError(ValueError):
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class HemisClient:
+
+    def __init__(self, timeout=None, max_connections=None):
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.lock = threading.Lock()
+        self.loop = None
+        self.client = None
+        self.pid = None
+
+    # Event loop and connection pool
+
+    def get_loop(self):
+        with self.lock:
+            if self.loop is None or self.pid != os.getpid():
+                # A forked child inherits the object but not the loop thread
+                self.loop = asyncio.new_event_loop()
+                self.client = None
+                self.pid = os.getpid()
+                threading.Thread(target=self.loop.run_forever, name='hemis-client', daemon=True).start()
+            return self.loop
+
+    def get_client(self):
+        # Only called on the loop thread
+        if self.client is None:
+            timeout = self.timeout or getattr(settings, 'HEMIS_HTTP_TIMEOUT', 8)
+            max_connections = self.max_connections or getattr(settings, 'HEMIS_HTTP_MAX_CONNECTIONS', 20)
+            self.client = httpx.AsyncClient(
+                headers=HEADERS,
+                timeout=httpx.Timeout(timeout, connect=min(timeout, 3)),
+                limits=httpx.Limits(max_connections=max_connections, keepalive_expiry=60),
+            )
+        return self.client
+
+    def run(self, coroutine, timeout):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.get_loop())
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        loop, client = self.loop, self.client
+        if loop is None or self.pid != os.getpid():
+            return
+        if client is not None:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        self.loop = self.client = None
+
+    # Token exchange
+
+    def exchange(self, endpoints, code, client_id, client_secret, deadline=None, concurrency=None, head_start=0):
+        """
+        Race ``endpoints`` (in priority order) for the token of ``code``;
+        returns an ``Exchange``. With ``head_start`` the first endpoint runs
+        alone for that many seconds (or until it fails) before the rest join.
+        """
+        deadline = deadline or getattr(settings, 'HEMIS_EXCHANGE_DEADLINE', 20)
+        concurrency = concurrency or getattr(settings, 'HEMIS_EXCHANGE_CONCURRENCY', 4)
+        coroutine = self.race(list(endpoints), code, client_id, client_secret, deadline, concurrency, head_start)
+        # The race stops itself at the deadline; the margin only covers loop scheduling
+        return self.run(coroutine, deadline + 5)
+
+    async def race(self, endpoints, code, client_id, client_secret, deadline, concurrency, head_start=0):
+        semaphore = asyncio.Semaphore(concurrency)
+        attempts = []
+        tasks = []
+
+        async def attempt(endpoint, wait_for_first):
+            if wait_for_first:
+                # The favourite answers alone unless it fails or is slow
+                await asyncio.wait(tasks[:1], timeout=head_start)
+                first = tasks[0]
+                if first.done() and not first.cancelled() and first.result().ok:
+                    # Won already; do not send anything before the race loop cancels us
+                    return Attempt(endpoint, False, None, 'cancelled', 0, None)
+            # Semaphore waiters are woken in order, so priority holds under the bound
+            async with semaphore:
+                started = time.monotonic()
+                try:
+                    data = await self.request_token(endpoint, code, client_id, client_secret)
+                    result = Attempt(endpoint, True, data, '', time.monotonic() - started, 200)
+                except asyncio.CancelledError:
+                    attempts.append(Attempt(endpoint, False, None, 'cancelled', time.monotonic() - started, None))
+                    raise
+                except (httpx.HTTPError, ValueError) as exc:
+                    status = getattr(exc, 'status', None)
+                    result = Attempt(endpoint, False, None, describe(exc), time.monotonic() - started, status)
+                attempts.append(result)
+                return result
+
+        for index, endpoint in enumerate(endpoints):
+            tasks.append(asyncio.create_task(attempt(endpoint, index > 0 and head_start > 0)))
+        winner = None
+        try:
+            async with asyncio.timeout(deadline):
+                for next_done in asyncio.as_completed(tasks):
+                    result = await next_done
+                    if result.ok:
+                        winner = result
+                        break
+                    logger.info("HEMIS token exchange: %s (%s) failed: %s", result.endpoint.url, result.endpoint.auth, result.error)
+        except TimeoutError:
+            logger.warning("HEMIS token exchange: no endpoint answered within %ss", deadline)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        return Exchange(winner, attempts)
+
+    async def request_token(self, endpoint, code, client_id, client_secret):
+        data = {
+            'grant_type': 'authorization_code',
+            'redirect_uri': settings.HEMIS_REDIRECT_URI,
+            'code': code,
+        }
+        auth = None
+        if endpoint.auth == 'body':
+            data.update({'client_id': client_id, 'client_secret': client_secret})
+        else:
+            auth = httpx.BasicAuth(client_id, client_secret)
+        response = await self.get_client().post(endpoint.url, data=data, auth=auth)
+        if response.status_code != 200:
+            raise TokenError(f"HTTP {response.status_code}: {response.text[:100]}", response.status_code)
+        try:
+            token = response.json()
+        except ValueError:
+            token = None
+        if not isinstance(token, dict) or 'access_token' not in token:
+            raise TokenError(f"no access_token in {response.text[:100]!r}", 200)
+        return token
+
+    # Other calls
+
+    def get_json(self, url, access_token, timeout=None):
+        async def fetch():
+            response = await self.get_client().get(url, headers={'Authorization': f'Bearer {access_token}'})
+            response.raise_for_status()
+            return response.json()
+        return self.run(fetch(), timeout or getattr(settings, 'HEMIS_HTTP_TIMEOUT', 8) + 5)
+
+
+def describe(exc):
+    if isinstance(exc, httpx.TimeoutException):
+        return f"timeout ({type(exc).__name__})"
+    return str(exc) or type(exc).__name__
+
+
+hemis_client = HemisClient()
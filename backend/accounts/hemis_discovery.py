@@ -0,0 +1,100 @@
+"""
+Which HEMIS token endpoint to try first.
+
+Every exchange records its outcome per (user type, endpoint) in
+``HemisEndpoint``, so the knowledge survives worker restarts. Candidates are
+then ordered healthy-before-backed-off, last-known-good first, faster
+before slower. The favourite gets a head start of a few times its usual
+latency before the others join the race, so a normal login costs exactly one
+upstream request.
+
+An endpoint that fails is skipped to the back of the queue for
+``HEMIS_ENDPOINT_BACKOFF`` seconds, doubling with each consecutive failure up
+to ``HEMIS_ENDPOINT_BACKOFF_MAX``. A 4xx answer only counts against an
+endpoint when another one won: without a winner it is more likely an expired
+or reused code than a wrong endpoint. Concurrent logins may overwrite each
+other's counters; the stats only steer the order, so that is harmless.
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from .models import HemisEndpoint
+
+LATENCY_WEIGHT = 0.3
+
+
+def endpoint_key(user_type, endpoint):
+    return (user_type, endpoint.base, endpoint.path, endpoint.auth)
+
+
+def load(user_type, endpoints):
+    rows = HemisEndpoint.objects.filter(user_type=user_type, base__in={endpoint.base for endpoint in endpoints})
+    return {(row.user_type, row.base, row.path, row.auth): row for row in rows}
+
+
+def plan(user_type, endpoints):
+    """``(endpoints in the order to try, head start of the first)`` plus the loaded stats."""
+    stats = load(user_type, endpoints)
+    now = timezone.now()
+    priority = {endpoint: index for index, endpoint in enumerate(endpoints)}
+
+    def sort_key(endpoint):
+        row = stats.get(endpoint_key(user_type, endpoint))
+        if row is None:
+            return (False, 1, 0, priority[endpoint])
+        backed_off = row.retry_after is not None and row.retry_after > now
+        proven = 0 if row.last_success_at and row.failures == 0 else 1
+        return (backed_off, proven, row.latency_ms or 0, priority[endpoint])
+
+    ordered = sorted(endpoints, key=sort_key)
+    head_start = 0
+    favourite = stats.get(endpoint_key(user_type, ordered[0])) if ordered else None
+    if favourite is not None and favourite.last_success_at and favourite.failures == 0:
+        low = getattr(settings, 'HEMIS_EXCHANGE_HEAD_START', 1.5)
+        head_start = max(low, 3 * (favourite.latency_ms or 0) / 1000)
+    return ordered, head_start, stats
+
+
+def backoff(failures):
+    base = getattr(settings, 'HEMIS_ENDPOINT_BACKOFF', 30)
+    cap = getattr(settings, 'HEMIS_ENDPOINT_BACKOFF_MAX', 60 * 60)
+    return datetime.timedelta(seconds=min(base * 2 ** (failures - 1), cap))
+
+
+def record(user_type, exchange, stats):
+    """Fold the outcome of an ``Exchange`` into the stats (``stats`` as returned by ``plan``)."""
+    now = timezone.now()
+    changed = []
+    for attempt in exchange.attempts:
+        if attempt.error == 'cancelled':
+            continue
+        if not attempt.ok and exchange.winner is None and attempt.status is not None and attempt.status < 500:
+            continue
+        key = endpoint_key(user_type, attempt.endpoint)
+        row = stats.get(key)
+        if row is None:
+            row, _ = HemisEndpoint.objects.get_or_create(
+                user_type=user_type, base=attempt.endpoint.base,
+                path=attempt.endpoint.path, auth=attempt.endpoint.auth,
+            )
+            stats[key] = row
+        if attempt.ok:
+            elapsed = attempt.elapsed * 1000
+            row.successes += 1
+            row.failures = 0
+            row.retry_after = None
+            row.last_success_at = now
+            row.latency_ms = elapsed if row.latency_ms is None else (
+                LATENCY_WEIGHT * elapsed + (1 - LATENCY_WEIGHT) * row.latency_ms
+            )
+        else:
+            row.failures += 1
+            row.last_failure_at = now
+            row.last_error = attempt.error[:200]
+            row.retry_after = now + backoff(row.failures)
+        changed.append(row)
+    if changed:
+        HemisEndpoint.objects.bulk_update(changed, [
+            'successes', 'failures', 'latency_ms', 'last_success_at', 'last_failure_at', 'last_error', 'retry_after',
+        ])
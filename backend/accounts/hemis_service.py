@@ -1,28 +1,23 @@
-import requests
+import logging
+
+import httpx
 from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
+from . import hemis_discovery
+from .hemis_client import AUTH_STYLES, Endpoint, hemis_client
+
+logger = logging.getLogger(__name__)
 
 class HemisService:
     @staticmethod
-    def exchange_code_for_token(code, user_type_hint='student'):
+    def token_endpoints(user_type_hint='student'):
+        """Candidate (base, path, auth style) endpoints, most likely first."""
         # Default order
         domains = ["student.samduuf.uz", "hemis.samduuf.uz"]
-        
-        # Override order based on hint and select credentials
-        client_id = settings.HEMIS_CLIENT_ID
-        client_secret = settings.HEMIS_CLIENT_SECRET
-        
         if user_type_hint in ['staff', 'employee']:
             domains = ["hemis.samduuf.uz", "student.samduuf.uz"]
-            client_id = settings.HEMIS_STAFF_CLIENT_ID
-            client_secret = settings.HEMIS_STAFF_CLIENT_SECRET
-            print(f"DEBUG: Staff Login detected. Using Staff Credentials. Prioritizing hemis.samduuf.uz")
-        else:
-            print(f"DEBUG: Student Login detected. Prioritizing student.samduuf.uz")
-        
-        paths = ["/oauth/access-token", "/oauth/token"]
-        
+
         try:
             settings_host = settings.HEMIS_API_URL.split("://")[-1].split("/")[0]
             if settings_host not in domains:
@@ -30,56 +25,38 @@ class HemisService:
         except Exception:
             pass
 
-        print(f"DEBUG: Starting Secure Token Exchange. Code: {code[:5]}...")
-        
-        payload_basic = {
-            'grant_type': 'authorization_code',
-            'redirect_uri': settings.HEMIS_REDIRECT_URI,
-            'code': code
-        }
-        
-        payload_body = payload_basic.copy()
-        payload_body.update({
-            'client_id': client_id,
-            'client_secret': client_secret,
-        })
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Compatible; KutubxonaBot/1.0)',
-            'Accept': 'application/json'
-        }
-        
-        auth = requests.auth.HTTPBasicAuth(client_id, client_secret)
+        paths = ["/oauth/access-token", "/oauth/token"]
+        return [
+            Endpoint(f"https://{domain}", path, auth)
+            for domain in domains for path in paths for auth in AUTH_STYLES
+        ]
+
+    @staticmethod
+    def credentials(user_type_hint='student'):
+        if user_type_hint in ['staff', 'employee']:
+            return settings.HEMIS_STAFF_CLIENT_ID, settings.HEMIS_STAFF_CLIENT_SECRET
+        return settings.HEMIS_CLIENT_ID, settings.HEMIS_CLIENT_SECRET
 
-        for domain in domains:
-            for path in paths:
-                url = f"https://{domain}{path}"
-                print(f"DEBUG: Trying {url}...")
-                
-                # Method 1: Body Auth
-                try:
-                    response = requests.post(url, data=payload_body, headers=headers, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        data['found_domain'] = domain
-                        return data
-                    print(f"DEBUG: [POST Body] {url} -> {response.status_code} {response.text[:100]}")
-                except Exception as e:
-                    print(f"DEBUG: Connect error {url}: {e}")
+    @staticmethod
+    def exchange_code_for_token(code, user_type_hint='student', endpoints=None):
+        user_type = 'staff' if user_type_hint in ['staff', 'employee'] else 'student'
+        client_id, client_secret = HemisService.credentials(user_type)
+        endpoints = endpoints or HemisService.token_endpoints(user_type)
+        logger.info("HEMIS token exchange for %s, code %s...", user_type, code[:5])
 
-                # Method 2: Basic Auth
-                try:
-                    response = requests.post(url, data=payload_basic, auth=auth, headers=headers, timeout=10)
-                    if response.status_code == 200:
-                         data = response.json()
-                         data['found_domain'] = domain
-                         return data
-                    print(f"DEBUG: [POST BasicAuth] {url} -> {response.status_code} {response.text[:100]}")
-                except Exception:
-                    pass
-        
-        print("DEBUG: All attempts failed.")
-        return None
+        # Last known good endpoint first and alone for a moment (accounts.hemis_discovery),
+        # then the rest race on the pooled client (accounts.hemis_client)
+        endpoints, head_start, stats = hemis_discovery.plan(user_type, endpoints)
+        exchange = hemis_client.exchange(endpoints, code, client_id, client_secret, head_start=head_start)
+        hemis_discovery.record(user_type, exchange, stats)
+        if exchange.winner is None:
+            logger.warning("HEMIS token exchange: all %d attempts failed", len(exchange.attempts))
+            return None
+        winner = exchange.winner
+        logger.info("HEMIS token exchange: %s (%s) in %.2fs", winner.endpoint.url, winner.endpoint.auth, winner.elapsed)
+        data = dict(winner.data)
+        data['found_domain'] = winner.endpoint.domain
+        return data
 
     @staticmethod
     def get_user_info(access_token, base_domain=None):
@@ -88,17 +65,12 @@ class HemisService:
         else:
             info_url = f"{settings.HEMIS_API_URL}/user"
             
-        print(f"DEBUG: Fetching User Info from {info_url}")
-        headers = {'Authorization': f'Bearer {access_token}'}
-        
+        logger.info("HemisService: fetching user info from %s", info_url)
         try:
-            response = requests.get(info_url, headers=headers)
-            if response.status_code != 200:
-                print(f"HemisService: get_user_info failed. URL: {info_url}, Status: {response.status_code}, Body: {response.text}")
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"HemisService: get_user_info Exception: {e}")
+            # Same pooled client as the exchange: usually reuses its connection
+            return hemis_client.get_json(info_url, access_token)
+        except (httpx.HTTPError, ValueError, TimeoutError) as e:
+            logger.error("HemisService: get_user_info failed. URL: %s, %s", info_url, e)
             return None
 
     @staticmethod
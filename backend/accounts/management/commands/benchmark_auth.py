@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from accounts.authentication import CachedTokenAuthentication, shared_cache, token_cache
+
+
+class Ping(APIView):
+    permission_classes = [IsAuthenticated]
+    # The user throttle's history grows with every request and would skew later rounds
+    throttle_classes = []
+
+    def get(self, request):
+        return Response({'user': request.user.pk})
+
+
+class Command(BaseCommand):
+    help = 'Measures authenticated requests/sec with DRF token authentication and the cached one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--rounds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        cases = [
+            ('TokenAuthentication', TokenAuthentication, None),
+            ('CachedTokenAuthentication', CachedTokenAuthentication, None),
+        ]
+        if shared_cache() is not None:
+            # Every request misses the LRU, as in a worker that has not seen the token yet
+            cases.append(('  shared cache only', CachedTokenAuthentication, token_cache.clear))
+
+        with transaction.atomic():
+            # Throwaway user and token, rolled back at the end
+            user = User.objects.create_user('benchmark-auth', password=None)
+            token = Token.objects.create(user=user)
+            request = RequestFactory().get('/ping/', HTTP_AUTHORIZATION=f'Token {token.key}')
+            self.stdout.write(f"{options['requests']} GET requests, best of {options['rounds']} rounds\n")
+
+            baseline = None
+            for label, authentication, before in cases:
+                view = Ping.as_view(authentication_classes=[authentication])
+                rate, queries = self.measure(view, request, before, options)
+                baseline = baseline or rate
+                self.stdout.write(f"{label:<28} {rate:9.0f} req/s {queries:5.2f} queries/req ({rate / baseline:5.1f}x)")
+            token_cache.clear()
+            transaction.set_rollback(True)
+
+    def measure(self, view, request, before, options):
+        def run(count):
+            for _ in range(count):
+                if before:
+                    before()
+                response = view(request)
+                assert response.status_code == 200, response.status_code
+
+        best = 0
+        for _ in range(options['rounds']):
+            token_cache.clear()
+            started = time.perf_counter()
+            run(options['requests'])
+            best = max(best, options['requests'] / (time.perf_counter() - started))
+        queries = []
+
+        def counter(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            run(100)
+        return best, len(queries) / 100
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+# auth.User is not ours to add Meta.indexes to; same expression indexes by hand
+USER_INDEXES = [
+    ('auth_user_username_lower_idx', 'username'),
+    ('auth_user_first_name_lower_idx', 'first_name'),
+    ('auth_user_last_name_lower_idx', 'last_name'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userprofile_updated_at'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(django.db.models.functions.text.Lower('hemis_id'), name='profile_hemis_id_lower_idx'),
+        ),
+    ] + [
+        migrations.RunSQL(
+            f'CREATE INDEX {name} ON auth_user (LOWER({column}))',
+            f'DROP INDEX {name}',
+        )
+        for name, column in USER_INDEXES
+    ]
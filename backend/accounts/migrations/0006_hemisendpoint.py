@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HemisEndpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_type', models.CharField(max_length=20)),
+                ('base', models.CharField(max_length=200)),
+                ('path', models.CharField(max_length=100)),
+                ('auth', models.CharField(max_length=10)),
+                ('successes', models.PositiveIntegerField(default=0)),
+                ('failures', models.PositiveIntegerField(default=0)),
+                ('latency_ms', models.FloatField(blank=True, null=True)),
+                ('last_success_at', models.DateTimeField(blank=True, null=True)),
+                ('last_failure_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=200)),
+                ('retry_after', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user_type', 'base', 'path', 'auth'), name='hemis_endpoint_unique')],
+            },
+        ),
+    ]
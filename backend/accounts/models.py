@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 
 class UserProfile(models.Model):
@@ -6,6 +7,43 @@ class UserProfile(models.Model):
     avatar_url = models.URLField(max_length=500, blank=True, null=True)
     hemis_id = models.CharField(max_length=100, blank=True, null=True)
     favourites = models.ManyToManyField('books.Book', related_name='favorited_by', blank=True)
-    
+    # Bumped by accounts.signals on user and favourites changes (profile ETag)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Prefix search of the admin user list (core.search.PrefixSearchFilter)
+            models.Index(Lower('hemis_id'), name='profile_hemis_id_lower_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username}'s Profile"
+
+
+class HemisEndpoint(models.Model):
+    """
+    Track record of one way to exchange HEMIS codes for a user type, kept by
+    accounts.hemis_discovery so logins try the endpoint that worked last time
+    first and leave failing ones alone for a while.
+    """
+    user_type = models.CharField(max_length=20)
+    base = models.CharField(max_length=200)
+    path = models.CharField(max_length=100)
+    auth = models.CharField(max_length=10)
+    successes = models.PositiveIntegerField(default=0)
+    # Failures since the last success; drives the backoff
+    failures = models.PositiveIntegerField(default=0)
+    # Moving average of successful exchanges
+    latency_ms = models.FloatField(null=True, blank=True)
+    last_success_at = models.DateTimeField(null=True, blank=True)
+    last_failure_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=200, blank=True)
+    retry_after = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user_type', 'base', 'path', 'auth'], name='hemis_endpoint_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_type}: {self.base}{self.path} ({self.auth})"
@@ -1,6 +1,9 @@
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from rest_framework import serializers
+from books.serializers import BookListSerializer
+from core.serializers import SparseFieldsetMixin
+from .favorites import Favourite, MAX_BATCH
 
 class LoginSerializer(serializers.Serializer):
     username = serializers.CharField()
@@ -28,14 +31,14 @@ class ChangePasswordSerializer(serializers.Serializer):
         # We can add password validators here if needed
         return value
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user_type = serializers.SerializerMethodField()
     avatar = serializers.SerializerMethodField()
-    favourites = serializers.SerializerMethodField()
+    favourites_count = serializers.SerializerMethodField()
     
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'user_type', 'avatar', 'favourites', 'date_joined', 'is_staff', 'is_superuser']
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'user_type', 'avatar', 'favourites_count', 'date_joined', 'is_staff', 'is_superuser']
         
     def get_user_type(self, obj):
         try:
@@ -49,19 +52,43 @@ class UserSerializer(serializers.ModelSerializer):
         except:
             return None
 
-    def get_favourites(self, obj):
-        try:
-            if not hasattr(obj, 'profile'):
-                return []
-            # Return simple list of IDs or basic info
-            return [
-                {
-                    'id': book.id, 
-                    'title': book.title, 
-                    'coverUrl': book.cover_image.url if book.cover_image else None,
-                    'author': book.author
-                } 
-                for book in obj.profile.favourites.all()
-            ]
-        except:
-            return []
+    def get_favourites_count(self, obj):
+        # The list itself is paged by /api/accounts/favorites/
+        if 'favourites_count' in self.context:
+            return self.context['favourites_count']
+        return Favourite.objects.filter(userprofile__user=obj).count()
+
+
+class AdminUserSerializer(serializers.ModelSerializer):
+    """Admin user list row: profile columns only, no favourites (one query per page)."""
+    avatar = serializers.SerializerMethodField()
+    hemis_id = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'hemis_id', 'avatar', 'date_joined', 'is_staff', 'is_superuser']
+
+    def profile(self, obj):
+        # Expects select_related('profile'): a missing profile is cached as None, no query
+        return getattr(obj, 'profile', None)
+
+    def get_avatar(self, obj):
+        profile = self.profile(obj)
+        return profile.avatar_url if profile else None
+
+    def get_hemis_id(self, obj):
+        profile = self.profile(obj)
+        return profile.hemis_id if profile else None
+
+
+class FavouriteSerializer(serializers.BaseSerializer):
+    """A favourites through row rendered as its book card."""
+
+    def to_representation(self, instance):
+        return BookListSerializer(instance.book, context=self.context).data
+
+
+class FavouriteBatchSerializer(serializers.Serializer):
+    books = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=MAX_BATCH
+    )
@@ -0,0 +1,93 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from .authentication import invalidate_token, invalidate_user
+from .models import UserProfile
+from core.cache import invalidate_tags
+from books import stats
+
+
+def touch_profiles(**filters):
+    UserProfile.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User)
+def touch_profile_on_user_save(sender, instance, created, **kwargs):
+    if not created:
+        touch_profiles(user=instance)
+
+
+@receiver(m2m_changed, sender=UserProfile.favourites.through)
+def touch_profile_on_favourites_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # book.favorited_by.clear(): only known before the rows are gone
+        touch_profiles(favourites=instance)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # book.favorited_by.add(...): the profiles are in pk_set
+        if pk_set:
+            touch_profiles(pk__in=pk_set)
+    else:
+        touch_profiles(pk=instance.pk)
+
+
+@receiver(m2m_changed, sender=UserProfile.favourites.through)
+def invalidate_popular_on_favourites_change(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_tags('books:popular')
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    stats.user_deleted(instance)
+    invalidate_tags('stats')
+
+
+@receiver(post_save, sender=User)
+def count_new_user(sender, instance, created, **kwargs):
+    if created:
+        stats.user_created(instance)
+        invalidate_tags('stats')
+
+
+@receiver(m2m_changed, sender=UserProfile.favourites.through)
+def update_favorite_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # book.favorited_by.*: only this book's counter moves
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            stats.refresh_favorite_counts([instance.pk])
+        return
+    if action == 'pre_clear':
+        instance._cleared_favourites = list(instance.favourites.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        stats.refresh_favorite_counts(pk_set)
+    elif action == 'post_clear':
+        stats.refresh_favorite_counts(getattr(instance, '_cleared_favourites', []))
+
+
+@receiver(pre_delete, sender=UserProfile)
+def update_favorite_counts_on_profile_delete(sender, instance, **kwargs):
+    # The cascade deletes the through rows without m2m_changed: recount once they are gone
+    book_ids = list(instance.favourites.values_list('pk', flat=True))
+    if book_ids:
+        def refresh():
+            stats.refresh_favorite_counts(book_ids)
+            invalidate_tags('books:popular')
+        transaction.on_commit(refresh)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_tokens_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    # Password change, deactivation, renames...; login only bumps last_login
+    if not created and update_fields != frozenset({'last_login'}):
+        invalidate_user(instance)
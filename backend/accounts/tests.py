@@ -1,3 +1,367 @@
-from django.test import TestCase
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from books.models import Book
+from .favorites import add_favourites, remove_favourites
+from .hemis_client import Endpoint, HemisClient
+from .hemis_service import HemisService
+from . import hemis_discovery
+from .models import HemisEndpoint, UserProfile
+
+
+class UserListViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        for n in range(60):
+            user = User.objects.create_user(f'talaba{n:02}', first_name=f'Ism{n}', last_name='Familiya')
+            if n % 2:
+                UserProfile.objects.create(user=user, hemis_id=f'3{n:05}', avatar_url=f'https://example.com/{n}.png')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('user-list')
+
+    def count_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data
+
+    @staticmethod
+    def cursor(data):
+        return parse_qs(urlsplit(data['next']).query)['cursor'][0]
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        small, data = self.count_queries(page_size=5)
+        self.assertEqual(len(data['results']), 5)
+        large, data = self.count_queries(page_size=50)
+        self.assertEqual(len(data['results']), 50)
+        self.assertEqual(small, large)
+        self.assertEqual(large, 1)
+
+    def test_query_count_with_search_and_cursor(self):
+        first, data = self.count_queries(page_size=5, search='talaba')
+        second, data = self.count_queries(page_size=50, search='talaba', cursor=self.cursor(data))
+        self.assertEqual(first, second)
+        self.assertEqual(len(data['results']), 50)
+
+    def test_rows_are_compact(self):
+        _, data = self.count_queries(page_size=60)
+        row = next(row for row in data['results'] if row['username'] == 'talaba01')
+        self.assertNotIn('favourites', row)
+        self.assertEqual(row['hemis_id'], '300001')
+        self.assertEqual(row['avatar'], 'https://example.com/1.png')
+        row = next(row for row in data['results'] if row['username'] == 'talaba02')
+        self.assertIsNone(row['hemis_id'])
+
+    def test_pages_follow_newest_first(self):
+        _, first = self.count_queries(page_size=30)
+        _, second = self.count_queries(page_size=30, cursor=self.cursor(first))
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(ids, sorted(User.objects.values_list('id', flat=True), reverse=True)[:60])
+
+    def test_search_matches_word_prefixes(self):
+        def usernames(search):
+            return {row['username'] for row in self.count_queries(search=search)[1]}
+
+        self.assertEqual(usernames('TALABA05'), {'talaba05'})
+        self.assertEqual(usernames('ism1 famil'), {f'talaba{n:02}' for n in [1] + list(range(10, 20))})
+        self.assertEqual(usernames('300003'), {'talaba03'})
+        self.assertEqual(usernames('familiya talaba4'), {f'talaba{n:02}' for n in range(40, 50)})
+        self.assertEqual(usernames('miliya'), set())
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.get(username='talaba00'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class UserProfileConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('talaba', first_name='Ism')
+        UserProfile.objects.create(user=cls.user, hemis_id='300001')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('profile')
+
+    def test_unchanged_profile_is_304(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.user.first_name = 'Boshqa'
+        self.user.save()
+        self.client.force_authenticate(User.objects.get(pk=self.user.pk))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['first_name'], 'Boshqa')
+
+    def test_validator_is_per_user(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.force_authenticate(User.objects.create_user('boshqa'))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 401)
+
+
+class FavouriteCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.books = [Book.objects.create(title=f'Kitob {n}', author='Muallif') for n in range(3)]
+        cls.profiles = [
+            UserProfile.objects.create(user=User.objects.create_user(f'talaba{n}')) for n in range(3)
+        ]
+
+    def counts(self):
+        return [book.favorite_count for book in Book.objects.filter(pk__in=[b.pk for b in self.books]).order_by('pk')]
+
+    def test_counts_follow_adds_removes_and_clears(self):
+        first, second, third = self.profiles
+        first.favourites.add(*self.books)
+        second.favourites.add(self.books[0])
+        self.books[0].favorited_by.add(third)
+        self.assertEqual(self.counts(), [3, 1, 1])
+
+        first.favourites.remove(self.books[1])
+        second.favourites.clear()
+        self.books[2].favorited_by.clear()
+        self.assertEqual(self.counts(), [2, 0, 0])
+
+    def test_batch_changes_count_once(self):
+        profile = self.profiles[0]
+        add_favourites(profile, [book.pk for book in self.books])
+        add_favourites(profile, [self.books[0].pk])
+        self.assertEqual(self.counts(), [1, 1, 1])
+        remove_favourites(profile, [self.books[0].pk, self.books[0].pk])
+        self.assertEqual(self.counts(), [0, 1, 1])
+
+    def test_deleting_a_user_or_profile_gives_back_its_favourites(self):
+        first, second, _ = self.profiles
+        first.favourites.add(*self.books)
+        second.favourites.add(self.books[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            first.user.delete()
+        self.assertEqual(self.counts(), [1, 0, 0])
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.counts(), [0, 0, 0])
+
+    def test_removing_what_is_not_there_changes_nothing(self):
+        profile = self.profiles[0]
+        profile.favourites.add(self.books[0])
+        profile.favourites.remove(self.books[1])
+        self.assertEqual(remove_favourites(profile, [self.books[2].pk]), set())
+        self.assertEqual(self.counts(), [1, 0, 0])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.profiles[1].delete()
+        self.assertEqual(callbacks, [])
+
+
+class StubOAuthHandler(BaseHTTPRequestHandler):
+    """
+    ``/<behaviour>/oauth/token``: ``ok`` issues a token, ``basic`` only with
+    Basic auth, ``fail`` answers 400, ``slow`` answers after ``slow_seconds``,
+    ``html`` answers 200 without a token.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.hits.append(self.path)
+        try:
+            body = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+            behaviour = self.path.split('/')[1]
+            if behaviour == 'slow':
+                time.sleep(server.slow_seconds)
+            if behaviour == 'html':
+                return self.reply(200, b'<html></html>', 'text/html')
+            if behaviour == 'fail' or body.get('code') != ['kod123']:
+                return self.reply(400, b'{"error": "invalid_grant"}')
+            if behaviour == 'basic' and not self.headers.get('Authorization', '').startswith('Basic '):
+                return self.reply(401, b'{"error": "invalid_client"}')
+            self.reply(200, json.dumps({'access_token': f'token-{behaviour}'}).encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client cancelled this attempt
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def reply(self, status, body, content_type='application/json'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubOAuthServerMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubOAuthHandler)
+        cls.server.daemon_threads = True
+        cls.server.lock = threading.Lock()
+        cls.server.slow_seconds = 2
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.in_flight = self.server.max_in_flight = 0
+        self.server.hits = []
+        self.client = HemisClient(timeout=5)
+        self.addCleanup(self.client.close)
+
+    def endpoints(self, *specs):
+        return [Endpoint(f'{self.base}/{behaviour}', '/oauth/token', auth) for behaviour, auth in specs]
+
+    def exchange(self, endpoints, code='kod123', **kwargs):
+        started = time.monotonic()
+        exchange = self.client.exchange(endpoints, code, 'client', 'secret', **kwargs)
+        return exchange, time.monotonic() - started
+
+
+class HemisExchangeTests(StubOAuthServerMixin, SimpleTestCase):
+
+    def test_first_success_wins_and_the_rest_are_cancelled(self):
+        endpoints = self.endpoints(('slow', 'body'), ('fail', 'body'), ('html', 'body'), ('ok', 'body'))
+        exchange, elapsed = self.exchange(endpoints, deadline=10)
+        self.assertEqual(exchange.winner.data, {'access_token': 'token-ok'})
+        self.assertEqual(exchange.winner.endpoint, endpoints[3])
+        self.assertLess(elapsed, self.server.slow_seconds)
+        errors = {attempt.endpoint.base.rsplit('/', 1)[1]: attempt.error for attempt in exchange.attempts if not attempt.ok}
+        self.assertEqual(errors['slow'], 'cancelled')
+        self.assertIn('400', errors['fail'])
+        self.assertTrue(errors['html'])
+
+    def test_auth_styles(self):
+        exchange, _ = self.exchange(self.endpoints(('basic', 'body'), ('basic', 'basic')))
+        self.assertEqual(exchange.winner.endpoint.auth, 'basic')
+
+    def test_deadline_bounds_the_exchange(self):
+        exchange, elapsed = self.exchange(self.endpoints(('slow', 'body'), ('slow', 'basic')), deadline=0.5)
+        self.assertIsNone(exchange.winner)
+        self.assertLess(elapsed, self.server.slow_seconds)
+
+    def test_concurrency_is_bounded_and_ordered(self):
+        endpoints = self.endpoints(*[('fail', 'body')] * 7 + [('ok', 'basic')])
+        exchange, _ = self.exchange(endpoints, concurrency=2)
+        self.assertEqual(exchange.winner.endpoint, endpoints[-1])
+        self.assertLessEqual(self.server.max_in_flight, 2)
+        self.assertEqual(len(self.server.hits), 8)
+
+    def test_unreachable_endpoint_does_not_block(self):
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            dead = Endpoint(f'http://127.0.0.1:{closed.getsockname()[1]}', '/oauth/token', 'body')
+        exchange, _ = self.exchange([dead] + self.endpoints(('ok', 'body')))
+        self.assertEqual(exchange.winner.data['access_token'], 'token-ok')
+
+    def test_all_failing(self):
+        exchange, _ = self.exchange(self.endpoints(('fail', 'body'), ('ok', 'body')), code='eskirgan')
+        self.assertIsNone(exchange.winner)
+        self.assertEqual(len(exchange.attempts), 2)
+
+    def test_head_start_leaves_the_favourite_alone(self):
+        endpoints = self.endpoints(('ok', 'body'), ('fail', 'body'), ('fail', 'basic'))
+        exchange, _ = self.exchange(endpoints, head_start=1)
+        self.assertEqual(exchange.winner.endpoint, endpoints[0])
+        self.assertEqual(len(self.server.hits), 1)
+
+    def test_head_start_ends_when_the_favourite_fails(self):
+        endpoints = self.endpoints(('fail', 'body'), ('ok', 'basic'))
+        exchange, elapsed = self.exchange(endpoints, head_start=5)
+        self.assertEqual(exchange.winner.endpoint, endpoints[1])
+        self.assertLess(elapsed, 5)
+
+
+class HemisDiscoveryTests(StubOAuthServerMixin, TestCase):
+
+    def login(self, *specs, code='kod123'):
+        from . import hemis_service
+
+        self.server.hits = []
+        with mock.patch.object(hemis_service, 'hemis_client', self.client):
+            return HemisService.exchange_code_for_token(code, endpoints=self.endpoints(*specs))
+
+    def test_service_reports_the_winning_domain(self):
+        data = self.login(('fail', 'body'), ('ok', 'basic'))
+        self.assertEqual(data, {'access_token': 'token-ok', 'found_domain': f'127.0.0.1:{self.server.server_port}'})
+
+    def test_known_winner_costs_one_request(self):
+        specs = [('fail', 'body'), ('fail', 'basic'), ('html', 'body'), ('ok', 'basic')]
+        self.login(*specs)
+        winner = HemisEndpoint.objects.get(failures=0, successes=1)
+        self.assertEqual((winner.base, winner.auth), (f'{self.base}/ok', 'basic'))
+        self.assertIsNotNone(winner.latency_ms)
+
+        self.assertEqual(self.login(*specs)['access_token'], 'token-ok')
+        self.assertEqual(self.server.hits, ['/ok/oauth/token'])
+        self.assertEqual(HemisEndpoint.objects.get(pk=winner.pk).successes, 2)
+
+    def test_failing_endpoints_back_off(self):
+        # The winner answers late, so the failure is always in before the race ends
+        self.server.slow_seconds = 0.3
+        self.addCleanup(setattr, self.server, 'slow_seconds', 2)
+        self.login(('fail', 'body'), ('slow', 'body'))
+        loser = HemisEndpoint.objects.get(base=f'{self.base}/fail')
+        self.assertEqual(loser.failures, 1)
+        self.assertIn('400', loser.last_error)
+        first = loser.retry_after - loser.last_failure_at
+
+        endpoints, head_start, stats = hemis_discovery.plan('student', self.endpoints(('fail', 'body'), ('slow', 'body')))
+        self.assertEqual([endpoint.base for endpoint in endpoints], [f'{self.base}/slow', f'{self.base}/fail'])
+        self.assertGreater(head_start, 0)
+
+        # Retry window over, still failing: the wait doubles
+        HemisEndpoint.objects.filter(pk=loser.pk).update(retry_after=None)
+        HemisEndpoint.objects.filter(base=f'{self.base}/slow').delete()
+        self.login(('fail', 'body'), ('slow', 'body'))
+        loser.refresh_from_db()
+        self.assertEqual(loser.failures, 2)
+        self.assertAlmostEqual((loser.retry_after - loser.last_failure_at).total_seconds(), 2 * first.total_seconds())
+
+    def test_rejected_code_does_not_blame_endpoints(self):
+        self.assertIsNone(self.login(('ok', 'body'), ('ok', 'basic'), code='eskirgan'))
+        self.assertFalse(HemisEndpoint.objects.exists())
+
+    def test_unreachable_endpoint_is_blamed_without_a_winner(self):
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            dead = Endpoint(f'http://127.0.0.1:{closed.getsockname()[1]}', '/oauth/token', 'body')
+        from . import hemis_service
+
+        with mock.patch.object(hemis_service, 'hemis_client', self.client):
+            self.assertIsNone(HemisService.exchange_code_for_token('kod123', endpoints=[dead]))
+        self.assertEqual(HemisEndpoint.objects.get().failures, 1)
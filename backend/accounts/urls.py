@@ -1,6 +1,9 @@
 from django.urls import path
 
-from .views import LoginView, ChangePasswordView, UserProfileView, HemisLoginView, HemisCallbackView, ToggleFavoriteView, UserListView
+from .views import (
+    LoginView, ChangePasswordView, UserProfileView, HemisLoginView, HemisCallbackView, ToggleFavoriteView,
+    FavouriteListView, FavouriteCheckView, UserListView,
+)
 
 urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
@@ -9,5 +12,7 @@ urlpatterns = [
     path('change-password/', ChangePasswordView.as_view(), name='change-password'),
     path('profile/', UserProfileView.as_view(), name='profile'),
     path('users/', UserListView.as_view(), name='user-list'),
+    path('favorites/', FavouriteListView.as_view(), name='favorites'),
+    path('favorites/check/', FavouriteCheckView.as_view(), name='favorites-check'),
     path('favorites/<int:book_id>/', ToggleFavoriteView.as_view(), name='toggle-favorite'),
 ]
@@ -1,16 +1,24 @@
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework import status, generics
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
-from .serializers import LoginSerializer, UserSerializer, ChangePasswordSerializer
+from .serializers import (
+    LoginSerializer, UserSerializer, AdminUserSerializer, ChangePasswordSerializer,
+    FavouriteSerializer, FavouriteBatchSerializer,
+)
+from .favorites import Favourite, MAX_BATCH, add_favourites, favourite_state, remove_favourites
 from .hemis_service import HemisService
 from django.conf import settings
 from .models import UserProfile
 from books.models import Book
 from django.shortcuts import get_object_or_404
+from django.db.models import Count
+from core.conditional import make_etag, not_modified, set_validators
+from core.pagination import FavouritePagination, UserPagination
+from core.search import PrefixSearchFilter
 
 class LoginView(APIView):
     permission_classes = [AllowAny]
@@ -36,7 +44,7 @@ class ChangePasswordView(APIView):
             if not user.check_password(serializer.data.get("old_password")):
                 return Response({"old_password": ["Noto'g'ri parol."]}, status=status.HTTP_400_BAD_REQUEST)
             user.set_password(serializer.data.get("new_password"))
-            user.save()
+            user.save()  # accounts.signals drops the cached token with it
             return Response({"message": "Parol muvaffaqiyatli o'zgartirildi."}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -44,8 +52,23 @@ class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        serializer = UserSerializer(request.user)
-        return Response(serializer.data)
+        user = request.user
+        profile = UserProfile.objects.filter(user=user).annotate(
+            favourites_count=Count('favourites'),
+        ).first()
+        favourites_count = profile.favourites_count if profile else 0
+        state = (profile.updated_at, favourites_count) if profile else None
+        etag = make_etag(
+            'profile', user.pk, user.username, user.email, user.first_name,
+            user.last_name, user.is_staff, user.is_superuser, state
+        )
+        last_modified = profile and profile.updated_at
+
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
+        serializer = UserSerializer(user, context={'favourites_count': favourites_count})
+        return set_validators(Response(serializer.data), etag, last_modified)
 
     def patch(self, request):
         user = request.user
@@ -186,8 +209,66 @@ class ToggleFavoriteView(APIView):
             profile.favourites.add(book)
             return Response({'status': 'added', 'message': 'Sevimlilarga qo\'shildi'})
 
+class FavouriteListView(generics.ListAPIView):
+    """
+    ``GET`` pages the user's favourite books, newest first (``?cursor=``,
+    ``?page_size=``). ``PUT``/``DELETE`` with ``{"books": [ids]}`` add or
+    remove a whole batch in one statement; repeating them changes nothing.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = FavouriteSerializer
+    pagination_class = FavouritePagination
+
+    def get_queryset(self):
+        return Favourite.objects.filter(userprofile__user=self.request.user).select_related('book__category')
+
+    def get_book_ids(self, request):
+        serializer = FavouriteBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return set(serializer.validated_data['books'])
+
+    def put(self, request):
+        book_ids = self.get_book_ids(request)
+        profile, _ = UserProfile.objects.get_or_create(user=request.user)
+        state = favourite_state(profile, book_ids)
+        missing = book_ids - set(state)
+        if missing:
+            return Response({'error': 'Kitob topilmadi', 'books': sorted(missing)}, status=status.HTTP_400_BAD_REQUEST)
+        added = add_favourites(profile, [pk for pk, is_favourite in state.items() if not is_favourite])
+        return Response({'added': sorted(added), 'favourites_count': Favourite.objects.filter(userprofile=profile).count()})
+
+    def delete(self, request):
+        book_ids = self.get_book_ids(request)
+        profile = UserProfile.objects.filter(user=request.user).first()
+        removed = remove_favourites(profile, book_ids) if profile else set()
+        count = Favourite.objects.filter(userprofile=profile).count() if profile else 0
+        return Response({'removed': sorted(removed), 'favourites_count': count})
+
+
+class FavouriteCheckView(APIView):
+    """``GET ?books=1,2,3`` -> which of those books are in the user's favourites."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            book_ids = {int(pk) for pk in request.query_params.get('books', '').split(',') if pk.strip()}
+        except ValueError:
+            return Response({'error': "books vergul bilan ajratilgan raqamlar bo'lishi kerak"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(book_ids) > MAX_BATCH:
+            return Response({'error': f"Ko'pi bilan {MAX_BATCH} ta kitob"}, status=status.HTTP_400_BAD_REQUEST)
+        favourites = Favourite.objects.filter(userprofile__user=request.user, book_id__in=book_ids)
+        return Response({'favourites': sorted(favourites.values_list('book_id', flat=True))})
+
 class UserListView(generics.ListAPIView):
-    permission_classes = [IsAuthenticated] # Or IsAdminUser
-    queryset = User.objects.all()
-    serializer_class = UserSerializer
+    """
+    Admin user list: ``?search=`` matches the start of username, names or
+    HEMIS id (indexed, see accounts migration 0005); ``?page_size=`` or
+    ``?cursor=`` switch to keyset pages.
+    """
+    permission_classes = [IsAdminUser]
+    queryset = User.objects.select_related('profile')
+    serializer_class = AdminUserSerializer
+    filter_backends = [PrefixSearchFilter]
+    search_fields = ['username', 'first_name', 'last_name', 'profile__hemis_id']
+    pagination_class = UserPagination
 
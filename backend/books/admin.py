@@ -1,13 +1,20 @@
 from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
-from .models import Book
+from .models import Book, Category
 from django_ckeditor_5.widgets import CKEditor5Widget
 from django.db import models
 
+@admin.register(Category)
+class CategoryAdmin(TranslationAdmin):
+    list_display = ('name', 'slug')
+    search_fields = ('name', 'slug')
+    prepopulated_fields = {'slug': ('name',)}
+
 @admin.register(Book)
 class BookAdmin(TranslationAdmin):
     list_display = ('title', 'author', 'category', 'published_date')
     list_filter = ('category', 'author', 'published_date')
+    list_select_related = ('category',)
     search_fields = ('title', 'author', 'description', 'subjects')
     
     group_fieldsets = True
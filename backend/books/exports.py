@@ -0,0 +1,20 @@
+from core.exports import Export, localized
+from .models import Book
+from .importers import TRANSLATED_FIELDS
+
+# Same columns as `manage.py import_books` reads, so an export can be imported again
+books = Export(
+    lambda: Book.objects.order_by('pk'),
+    {
+        'id': 'pk',
+        **localized(*TRANSLATED_FIELDS),
+        'category': 'category__slug',
+        'page_count': 'page_count',
+        'published_date': 'published_date',
+        'favorite_count': 'favorite_count',
+        'cover': 'cover_image',
+        'file': 'file',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+)
@@ -0,0 +1,168 @@
+"""
+Readers and row validation for ``manage.py import_books``.
+
+Every reader yields plain dicts. Translated fields come either as
+``title_uz``/``title_ru``/``title_en`` columns, as a ``{"uz": ..., "ru": ...}``
+object (JSONL), or as a bare ``title`` meaning the default language.
+``cover`` and ``file`` are paths relative to the media directory, or URLs.
+"""
+import csv
+import datetime
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files import File
+from core.exports import FORMULA_PREFIXES
+from .models import category_slug
+
+TRANSLATED_FIELDS = ('title', 'author', 'description', 'subjects')
+REQUIRED_FIELDS = ('title', 'author')
+FORMATS = ('csv', 'jsonl', 'marc')
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return {'json': 'jsonl', 'ndjson': 'jsonl', 'mrc': 'marc'}.get(ext, ext)
+
+
+def read_rows(path, fmt):
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                yield {key: unquote_formula(value) for key, value in row.items()}
+    elif fmt == 'jsonl':
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif fmt == 'marc':
+        yield from read_marc(path)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+def unquote_formula(value):
+    """Undo the ``'`` core.exports puts before CSV cells that look like formulas."""
+    if isinstance(value, str) and value[:1] == "'" and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+def read_marc(path):
+    # Optional dependency: only MARC imports need it
+    from pymarc import MARCReader
+
+    def first(record, tag, *codes):
+        for field in record.get_fields(tag):
+            values = [value for code in codes for value in field.get_subfields(code)]
+            if values:
+                return ' '.join(value.strip(' /:;,.') for value in values)
+        return ''
+
+    with open(path, 'rb') as f:
+        for record in MARCReader(f, to_unicode=True, force_utf8=True):
+            if record is None:
+                continue
+            pages = re.search(r'\d+', first(record, '300', 'a'))
+            year = re.search(r'\d{4}', first(record, '264', 'c') or first(record, '260', 'c'))
+            yield {
+                'title': first(record, '245', 'a', 'b'),
+                'author': first(record, '100', 'a') or first(record, '110', 'a'),
+                'description': first(record, '520', 'a'),
+                'subjects': ', '.join(field.get_subfields('a')[0] for field in record.get_fields('650') if field.get_subfields('a')),
+                'page_count': pages.group() if pages else '',
+                'published_date': year.group() if year else '',
+            }
+
+
+def translations(row, field):
+    """``{lang: value}`` for a translated field of a raw row."""
+    languages = [lang for lang, _ in settings.LANGUAGES]
+    default = settings.MODELTRANSLATION_DEFAULT_LANGUAGE
+    values = {}
+    base = row.get(field)
+    if isinstance(base, dict):
+        values.update({lang: base.get(lang) for lang in languages})
+    elif base:
+        values[default] = base
+    for lang in languages:
+        if row.get(f'{field}_{lang}'):
+            values[lang] = row[f'{field}_{lang}']
+    values = {lang: str(value).strip() for lang, value in values.items() if value and str(value).strip()}
+    if values and default not in values:
+        # The base column and fallbacks read the default language
+        values[default] = next(iter(values.values()))
+    return values
+
+
+def parse_date(value):
+    value = str(value or '').strip()
+    if not value:
+        return None
+    if re.fullmatch(r'\d{4}', value):
+        return datetime.date(int(value), 1, 1)
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"published_date noto'g'ri: {value!r}")
+
+
+def clean_row(row, categories, default_category=None):
+    """
+    Model field values, cover and file reference of a raw row. ``categories``
+    maps slugs to ids; unknown categories are an error.
+    """
+    values = {}
+    for field in TRANSLATED_FIELDS:
+        texts = translations(row, field)
+        if field in REQUIRED_FIELDS and not texts:
+            raise RowError(f"{field} bo'sh")
+        # modeltranslation fills the base column from the default language
+        texts.setdefault(settings.MODELTRANSLATION_DEFAULT_LANGUAGE, '')
+        for lang, text in texts.items():
+            values[f'{field}_{lang}'] = text
+
+    try:
+        values['page_count'] = int(row.get('page_count') or 0)
+    except (TypeError, ValueError):
+        raise RowError(f"page_count son emas: {row.get('page_count')!r}")
+    if values['page_count'] < 0:
+        raise RowError("page_count manfiy")
+    values['published_date'] = parse_date(row.get('published_date') or row.get('year'))
+
+    category = row.get('category') or default_category
+    if category:
+        slug = category_slug(str(category))
+        if slug not in categories:
+            raise RowError(f"Noma'lum kategoriya: {category!r}")
+        values['category_id'] = categories[slug]
+
+    return values, (row.get('cover') or '').strip(), (row.get('file') or '').strip()
+
+
+@contextmanager
+def open_source(ref, media_dir):
+    """A ``File`` for a local path (relative to ``media_dir``) or an http(s) URL."""
+    if re.match(r'^https?://', ref):
+        import httpx
+
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(ref.split('?')[0])[1]) as tmp:
+            with httpx.stream('GET', ref, follow_redirects=True, timeout=60) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes():
+                    tmp.write(chunk)
+            tmp.flush()
+            tmp.seek(0)
+            yield File(tmp, name=os.path.basename(ref.split('?')[0]) or 'download')
+    else:
+        path = ref if os.path.isabs(ref) else os.path.join(media_dir, ref)
+        with open(path, 'rb') as f:
+            yield File(f, name=os.path.basename(path))
@@ -0,0 +1,76 @@
+import datetime
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from books.models import Book, Category
+from books.serializers import BookSerializer, BookListSerializer
+
+DESCRIPTION = (
+    "<p>O'zbek adabiyotining eng yirik asarlaridan biri. <strong>Roman</strong> "
+    "XIX asr Turkiston hayotini, oila va jamiyat munosabatlarini keng qamrab oladi.</p>"
+) * 12
+
+
+class Command(BaseCommand):
+    help = 'Compares payload size and serialization time of the full and compact book representations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10000)
+        parser.add_argument('--rounds', type=int, default=3)
+
+    def handle(self, *args, **options):
+        # Unsaved instances: measures serialization only, never touches the DB
+        category = Category(pk=1, slug='adabiyotlar', name='Adabiyotlar')
+        books = [self.make_book(i, category) for i in range(1, options['books'] + 1)]
+        self.stdout.write(f"Serializing {len(books)} books, best of {options['rounds']} rounds\n")
+
+        cases = [
+            ('full, all translations', BookSerializer, '?translations=all'),
+            ('full, one language', BookSerializer, ''),
+            ('?omit=description', BookSerializer, '?omit=description'),
+            ('?fields=id,title,author', BookSerializer, '?fields=id,title,author'),
+            ('compact (BookListSerializer)', BookListSerializer, ''),
+        ]
+        baseline = None
+        for label, serializer_class, query in cases:
+            request = Request(RequestFactory().get(f'/api/books/{query}'))
+            request.user = User(is_staff=True)
+            size, elapsed = self.measure(serializer_class, books, request, options['rounds'])
+            baseline = baseline or (size, elapsed)
+            self.stdout.write(
+                f"{label:<32} {size / 1024 / 1024:8.2f} MB {elapsed * 1000:9.1f} ms "
+                f"({size / baseline[0]:6.1%} bytes, {elapsed / baseline[1]:6.1%} time)"
+            )
+
+    def measure(self, serializer_class, books, request, rounds):
+        best = None
+        size = 0
+        for _ in range(rounds):
+            started = time.perf_counter()
+            data = serializer_class(books, many=True, context={'request': request}).data
+            payload = JSONRenderer().render(data)
+            elapsed = time.perf_counter() - started
+            size = len(payload)
+            best = elapsed if best is None else min(best, elapsed)
+        return size, best
+
+    def make_book(self, i, category):
+        book = Book(
+            id=i,
+            title_uz=f"O'tkan kunlar {i}", title_ru=f"Минувшие дни {i}", title_en=f"Bygone Days {i}",
+            author_uz="Abdulla Qodiriy", author_ru="Абдулла Кадыри", author_en="Abdulla Qodiriy",
+            description_uz=DESCRIPTION, description_ru=DESCRIPTION, description_en=DESCRIPTION,
+            subjects_uz="Tarix, Roman", subjects_ru="История, Роман", subjects_en="History, Novel",
+            category=category, page_count=320,
+            published_date=datetime.date(1926, 1, 1),
+            cover_image=f'books/covers/cover_{i}.jpg',
+            qr_code=f'books/qrcodes/qr_book_{i}.png',
+            file=f'books/files/book_{i}.pdf',
+        )
+        book.created_at = timezone.now()
+        return book
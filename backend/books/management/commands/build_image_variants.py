@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from books.models import Book
+from books.tasks import build_cover_variants
+from news.models import News
+from news.tasks import build_image_variants
+from core import images
+from jobs.queue import enqueue
+
+
+class Command(BaseCommand):
+    help = 'Queues WebP/JPEG variants for book covers and news images that have none (or stale ones)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', choices=['books', 'news'])
+        parser.add_argument('--sync', action='store_true', help='Render here instead of queueing for run_jobs')
+
+    def handle(self, *args, **options):
+        targets = {
+            'books': (Book, 'cover_image', 'cover_variants', build_cover_variants, 'book-cover'),
+            'news': (News, 'image', 'image_variants', build_image_variants, 'news-image'),
+        }
+        if options['only']:
+            targets = {options['only']: targets[options['only']]}
+
+        for label, (model, image_field, variants_field, func, key) in targets.items():
+            count = 0
+            rows = model.objects.only('pk', image_field, variants_field).order_by('pk')
+            for obj in rows.iterator(chunk_size=500):
+                if not getattr(obj, image_field) or images.is_current(getattr(obj, image_field), getattr(obj, variants_field)):
+                    continue
+                if options['sync']:
+                    func(obj.pk)
+                else:
+                    enqueue(func.task_name, obj.pk, key=f'{key}:{obj.pk}')
+                count += 1
+            verb = 'built' if options['sync'] else 'queued'
+            self.stdout.write(self.style.SUCCESS(f"{label}: {verb} variants for {count} images"))
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+from core import exports
+
+
+class Command(BaseCommand):
+    help = 'Writes books, news or users to a CSV/JSONL file (optionally gzipped), streaming in constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(exports.EXPORTS))
+        parser.add_argument('--format', choices=list(exports.FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', '-o', help="File to write (default: <name>-<date>.<format>; '-' for stdout)")
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        name, fmt, compress = options['name'], options['format'], options['gzip']
+        output = options['output'] or exports.filename(name, fmt, compress)
+        blocks = exports.stream(exports.get_export(name), fmt, compress, chunk_size=options['chunk_size'])
+
+        started = time.perf_counter()
+        written = 0
+        if output == '-':
+            for block in blocks:
+                sys.stdout.buffer.write(block)
+            return
+        tmp = f"{output}.tmp"
+        with open(tmp, 'wb') as f:
+            for block in blocks:
+                f.write(block)
+                written += len(block)
+        # A reader never sees a half-written export
+        os.replace(tmp, output)
+        elapsed = time.perf_counter() - started
+        self.stderr.write(self.style.SUCCESS(
+            f"{name}: {written / 1024 / 1024:.1f} MB written to {output} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,251 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+from books import stats
+from books.importers import FORMATS, RowError, clean_row, detect_format, open_source, read_rows
+from books.models import Book, Category, ImportCheckpoint, category_slug
+from books.search import book_index
+from core import images
+from core.cache import invalidate_tags
+from uploads.signals import adjust
+
+# Books waiting for their cover/file, one JSON line each; in PROGRESS_DIR unless --media-list
+MEDIA_LIST_NAME = 'import_books-{digest}.media'
+MAX_REPORTED_ERRORS = 50
+
+
+def store_media(args):
+    """Runs in a pool process: store one book's cover (with its variants) and file."""
+    book_id, cover, file, media_dir = args
+    book = Book(pk=book_id)
+    result = {'pk': book_id, 'cover_image': '', 'file': '', 'cover_variants': {}, 'error': ''}
+    try:
+        if cover:
+            field = Book._meta.get_field('cover_image')
+            with open_source(cover, media_dir) as f:
+                book.cover_image.name = field.storage.save(field.upload_to + f.name, f)
+            result['cover_image'] = book.cover_image.name
+            result['cover_variants'] = images.build_variants(book.cover_image)
+        if file:
+            field = Book._meta.get_field('file')
+            with open_source(file, media_dir) as f:
+                result['file'] = field.storage.save(field.upload_to + f.name, f)
+    except Exception as exc:
+        result['error'] = f"{type(exc).__name__}: {exc}"
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports books from a CSV, JSONL or MARC (needs pymarc) file in bulk_create batches; '
+        'covers and files are attached afterwards by a process pool. Progress is kept in '
+        'ImportCheckpoint, committed with each batch'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per transaction')
+        parser.add_argument('--category', help='Category slug for rows without one')
+        parser.add_argument('--create-categories', action='store_true', help='Create unknown categories')
+        parser.add_argument('--media-dir', help='Base of relative cover/file paths (default: next to the file)')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Media stage processes')
+        parser.add_argument('--skip-media', action='store_true', help='Import the rows only')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only, write nothing')
+        parser.add_argument('--resume', action='store_true', help='Continue an interrupted import')
+        parser.add_argument('--media-list', help=f'Default: PROGRESS_DIR/{MEDIA_LIST_NAME}')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['path'])
+        fmt = options['format'] or detect_format(path)
+        if fmt not in FORMATS:
+            raise CommandError(f"Unknown format {fmt!r}; pass --format")
+        if fmt == 'marc':
+            try:
+                import pymarc  # noqa: F401
+            except ImportError:
+                raise CommandError("MARC import needs pymarc: pip install pymarc")
+        options['media_dir'] = options['media_dir'] or os.path.dirname(path)
+
+        digest = hashlib.sha1(path.encode()).hexdigest()[:12]
+        self.media_file = options['media_list'] or os.path.join(
+            settings.PROGRESS_DIR, MEDIA_LIST_NAME.format(digest=digest),
+        )
+        if options['resume']:
+            checkpoint = ImportCheckpoint.objects.filter(source=path).first()
+            if checkpoint is None:
+                raise CommandError(f"No interrupted import of {path}; run without --resume")
+            self.truncate_media_list(checkpoint.media_lines)
+            self.stdout.write(f"Resuming after row {checkpoint.rows} ({checkpoint.stage} stage)")
+        else:
+            checkpoint = ImportCheckpoint(source=path)
+            if not options['dry_run']:
+                ImportCheckpoint.objects.filter(source=path).delete()
+                checkpoint.save()
+                self.truncate_media_list(0)
+
+        if checkpoint.stage == 'rows':
+            self.import_rows(path, fmt, checkpoint, options)
+            if options['dry_run']:
+                return
+            checkpoint.stage = 'media'
+            checkpoint.save(update_fields=['stage', 'updated_at'])
+        if not options['skip_media']:
+            self.attach_media(checkpoint, options)
+
+        checkpoint.delete()
+        if os.path.exists(self.media_file):
+            os.remove(self.media_file)
+        self.stdout.write(self.style.SUCCESS(f"Imported {checkpoint.imported} books from {path}"))
+        self.stdout.write(
+            "QR codes are rendered on request; `manage.py regenerate_qr_codes --missing` stores copies if needed"
+        )
+
+    def categories(self, options):
+        categories = dict(Category.objects.values_list('slug', 'pk'))
+        if options['category'] and options['category'] not in categories:
+            raise CommandError(f"Unknown category: {options['category']}")
+        return categories
+
+    def import_rows(self, path, fmt, checkpoint, options):
+        categories = self.categories(options)
+        size = options['batch_size']
+        started = time.perf_counter()
+        rows = errors = 0
+        consumed = checkpoint.rows
+        batch = []
+        media = []
+        for index, raw in enumerate(read_rows(path, fmt)):
+            if index < checkpoint.rows:
+                continue
+            rows += 1
+            consumed = index + 1
+            try:
+                if options['create_categories'] and raw.get('category'):
+                    self.ensure_category(raw['category'], categories, options['dry_run'])
+                values, cover, file = clean_row(raw, categories, options['category'])
+            except RowError as exc:
+                errors += 1
+                if errors <= MAX_REPORTED_ERRORS:
+                    self.stderr.write(f"  row {index + 1}: {exc}")
+                continue
+            book = Book(**values)
+            book.search_key = book.get_search_key()
+            batch.append(book)
+            media.append((cover, file))
+            if len(batch) >= size:
+                self.write_batch(batch, media, consumed, checkpoint, options)
+                batch, media = [], []
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {consumed} rows ({rows / elapsed:.0f} rows/s, {errors} skipped)")
+
+        self.write_batch(batch, media, consumed, checkpoint, options)
+        elapsed = time.perf_counter() - started
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {rows - errors} of {rows} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f} rows/s), "
+            f"{errors} skipped"
+        ))
+        if not options['dry_run']:
+            # bulk_create skips the per-book counters: recount once
+            stats.reconcile()
+            invalidate_tags('books:list', 'books:popular', 'stats')
+
+    def ensure_category(self, value, categories, dry_run=False):
+        slug = category_slug(str(value))
+        if slug and slug not in categories:
+            if dry_run:
+                # Later rows of the category validate; nothing is written
+                categories[slug] = None
+                return
+            category = Category.objects.create(name=str(value), slug=slug)
+            categories[slug] = category.pk
+
+    def write_batch(self, batch, media, rows_done, checkpoint, options):
+        if options['dry_run']:
+            return
+        with transaction.atomic():
+            if batch:
+                # One INSERT per batch; post_save receivers do not run, so index here
+                Book.objects.bulk_create(batch, batch_size=len(batch))
+                book_index.update_many(batch)
+                lines = [
+                    json.dumps([book.pk, cover, file]) + '\n'
+                    for book, (cover, file) in zip(batch, media) if cover or file
+                ]
+                # Written before the commit; lines of a batch that never committed
+                # are past media_lines and cut off on --resume
+                with open(self.media_file, 'a') as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                checkpoint.imported += len(batch)
+                checkpoint.media_lines += len(lines)
+            checkpoint.rows = rows_done
+            checkpoint.save()
+
+    def truncate_media_list(self, lines):
+        """Keep the first ``lines`` lines of the media list (creating it if needed)."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.media_file)), exist_ok=True)
+        with open(self.media_file, 'ab+') as f:
+            f.seek(0)
+            for _ in range(lines):
+                f.readline()
+            f.truncate(f.tell())
+
+    def attach_media(self, checkpoint, options):
+        with open(self.media_file) as f:
+            pending = [json.loads(line) for line in f][checkpoint.media_done:checkpoint.media_lines]
+        if not pending:
+            return
+        self.stdout.write(f"Attaching covers and files of {len(pending)} books with {options['processes']} processes")
+
+        size = options['batch_size']
+        work = [(pk, cover, file, options['media_dir']) for pk, cover, file in pending]
+        # Forked children inherit settings but must not share the DB connection
+        connections.close_all()
+        started = time.perf_counter()
+        done = failed = 0
+        results = []
+        with multiprocessing.get_context('fork').Pool(options['processes']) as pool:
+            # imap keeps the input order, so media_done is always a finished prefix
+            for result in pool.imap(store_media, work, chunksize=8):
+                results.append(result)
+                if len(results) < size and done + len(results) < len(work):
+                    continue
+                failed += self.save_media(results, checkpoint)
+                done += len(results)
+                results = []
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {done}/{len(work)} ({done / elapsed:.0f} books/s, {failed} failed)")
+
+    def save_media(self, results, checkpoint):
+        failed = 0
+        for result in results:
+            if result['error']:
+                failed += 1
+                self.stderr.write(f"  book #{result['pk']}: {result['error']}")
+        stored = [result for result in results if result['cover_image'] or result['file']]
+        books = []
+        now = timezone.now()
+        for result in stored:
+            book = Book(pk=result['pk'], cover_image=result['cover_image'], file=result['file'] or None,
+                        cover_variants=result['cover_variants'], updated_at=now)
+            books.append(book)
+        with transaction.atomic():
+            # bulk_update skips save() and signals: one UPDATE per batch, refcounts by hand
+            Book.objects.bulk_update(books, ['cover_image', 'file', 'cover_variants', 'updated_at'])
+            for result in stored:
+                adjust(result['cover_image'], 1)
+                adjust(result['file'], 1)
+            invalidate_tags('books:list', 'books:popular', *[f"book:{result['pk']}" for result in stored])
+            checkpoint.media_done += len(results)
+            checkpoint.save(update_fields=['media_done', 'updated_at'])
+        return failed
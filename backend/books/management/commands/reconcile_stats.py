@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from books.stats import reconcile, NEW_BOOKS_WINDOW_DAYS
+
+
+class Command(BaseCommand):
+    help = 'Recounts the library statistics row and the daily rollup from the books and users tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=NEW_BOOKS_WINDOW_DAYS,
+            help='How many recent days of the daily rollup to rebuild'
+        )
+
+    def handle(self, *args, **options):
+        stats = reconcile(days=max(options['days'], NEW_BOOKS_WINDOW_DAYS))
+        self.stdout.write(self.style.SUCCESS(
+            f"Books: {stats.total_books}, users: {stats.total_users}, "
+            f"categories: {len(stats.categories)}, new books (30d): {stats.new_books_30d}, "
+            f"new users today: {stats.new_users_today}"
+        ))
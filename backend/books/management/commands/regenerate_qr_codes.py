@@ -0,0 +1,137 @@
+import json
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from books.models import Book
+from books.qr import render_png, store_png
+from core.cache import invalidate_tags
+
+PROGRESS_FILE_NAME = 'regenerate_qr_codes.json'
+
+
+def render_batch(args):
+    """Runs in a pool process: write (or, dry, only render) the images of one batch."""
+    book_ids, dry_run = args
+    results = []
+    for book_id in book_ids:
+        if dry_run:
+            results.append((book_id, None, len(render_png(book_id))))
+        else:
+            name = store_png(book_id)
+            results.append((book_id, name, None))
+    return results
+
+
+class Command(BaseCommand):
+    help = 'Re-renders QR code images (e.g. after BOOK_PUBLIC_URL changed) across a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Only these books (default: all)')
+        parser.add_argument('--missing', action='store_true', help='Only books without a QR code')
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=200, help='Books per bulk_update')
+        parser.add_argument('--dry-run', action='store_true', help='Render in memory, write nothing')
+        parser.add_argument('--resume', action='store_true', help='Continue after the last finished batch')
+        parser.add_argument('--progress-file', help=f'Default: PROGRESS_DIR/{PROGRESS_FILE_NAME}')
+
+    def handle(self, *args, **options):
+        books = Book.objects.order_by('pk')
+        if options['ids']:
+            books = books.filter(pk__in=options['ids'])
+        if options['missing']:
+            books = books.filter(Q(qr_code='') | Q(qr_code__isnull=True))
+
+        progress_file = options['progress_file'] or os.path.join(settings.PROGRESS_DIR, PROGRESS_FILE_NAME)
+        if options['resume']:
+            last_pk = self.load_progress(progress_file)
+            books = books.filter(pk__gt=last_pk)
+            self.stdout.write(f"Resuming after book #{last_pk}")
+
+        book_ids = list(books.values_list('pk', flat=True))
+        if not book_ids:
+            self.stdout.write("Nothing to do")
+            return
+        # Pool work units: a batch spread over every process
+        size = options['batch_size']
+        step = max(1, -(-size // options['processes']))
+        chunks = [(book_ids[i:i + step], options['dry_run']) for i in range(0, len(book_ids), step)]
+        self.stdout.write(
+            f"{'Rendering' if options['dry_run'] else 'Regenerating'} {len(book_ids)} QR codes "
+            f"with {options['processes']} processes"
+        )
+
+        # Forked children inherit settings but must not share the DB connection
+        connections.close_all()
+        started = time.perf_counter()
+        done = 0
+        total_bytes = 0
+        pending = []
+        with multiprocessing.get_context('fork').Pool(options['processes']) as pool:
+            # imap keeps every process busy while this one writes batches, and
+            # yields in pk order, so the checkpoint is always a finished prefix
+            for rows in pool.imap(render_batch, chunks):
+                pending.extend(rows)
+                if len(pending) < size and done + len(pending) < len(book_ids):
+                    continue
+                if options['dry_run']:
+                    total_bytes += sum(row[2] for row in pending)
+                else:
+                    total_bytes += self.save_batch(pending)
+                    self.save_progress(progress_file, pending[-1][0])
+                done += len(pending)
+                pending = []
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"  {done}/{len(book_ids)} ({done / elapsed:.0f} books/s)")
+
+        elapsed = time.perf_counter() - started
+        if not options['dry_run'] and os.path.exists(progress_file):
+            os.remove(progress_file)
+        self.stdout.write(self.style.SUCCESS(
+            f"{done} QR codes in {elapsed:.1f}s: {done / elapsed:.0f} books/s, "
+            f"{total_bytes / 1024 / 1024:.1f} MB{' (dry run, nothing written)' if options['dry_run'] else ''}"
+        ))
+
+    def save_batch(self, results):
+        new_names = {book_id: name for book_id, name, _ in results}
+        storage = Book._meta.get_field('qr_code').storage
+        now = timezone.now()
+        with transaction.atomic():
+            books = list(Book.objects.filter(pk__in=new_names).only('pk', 'qr_code'))
+            old_names = [book.qr_code.name for book in books]
+            for book in books:
+                book.qr_code = new_names[book.pk]
+                book.updated_at = now
+            # bulk_update skips save() and signals: one UPDATE per batch
+            Book.objects.bulk_update(books, ['qr_code', 'updated_at'])
+            invalidate_tags('books:list', *[f'book:{book.pk}' for book in books])
+
+        written = 0
+        for book in books:
+            written += storage.size(book.qr_code.name)
+        for old_name, book in zip(old_names, books):
+            if old_name and old_name != book.qr_code.name:
+                storage.delete(old_name)
+        # Books deleted while rendering: drop their fresh files
+        for book_id in set(new_names) - {book.pk for book in books}:
+            storage.delete(new_names[book_id])
+        return written
+
+    def load_progress(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)['last_pk']
+        except FileNotFoundError:
+            raise CommandError(f"No progress file at {path}; run without --resume")
+
+    def save_progress(self, path, last_pk):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'last_pk': last_pk}, f)
+        os.replace(tmp, path)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from books.models import Book
+from books.stats import refresh_favorite_counts
+from core.cache import invalidate_tags
+
+
+class Command(BaseCommand):
+    help = 'Recounts Book.favorite_count from user favourites (run periodically to repair drift)'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            drifted = [
+                book_id for book_id, stored, actual in
+                Book.objects.annotate(actual=Count('favorited_by'))
+                .values_list('pk', 'favorite_count', 'actual').order_by().iterator(chunk_size=2000)
+                if stored != actual
+            ]
+            if drifted:
+                refresh_favorite_counts(drifted)
+                invalidate_tags('books:popular')
+
+        self.stdout.write(self.style.SUCCESS(f"Repaired {len(drifted)} favourite counters"))
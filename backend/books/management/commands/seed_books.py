@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from books.models import Book
+from books.models import Book, Category, category_slug
 from django.core.files.base import ContentFile
 from django.utils import timezone
 import random
@@ -21,7 +21,6 @@ class Command(BaseCommand):
                     "en": "The first novel of Uzbek literature. The tragic love story of Otabek and Kumush."
                 },
                 "category": {"uz": "Badiiy", "ru": "Художественная", "en": "Fiction"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Tarix, Sevgi, Klassika", "ru": "История, Любовь, Классика", "en": "History, Love, Classic"},
                 "page_count": 450
             },
@@ -34,7 +33,6 @@ class Command(BaseCommand):
                     "en": "An adventure story, interesting events for children."
                 },
                 "category": {"uz": "Bolalar", "ru": "Детская", "en": "Children"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Sarguzasht, Bolalar, Sehr", "ru": "Приключения, Дети, Магия", "en": "Adventure, Children, Magic"},
                 "page_count": 320
             },
@@ -47,7 +45,6 @@ class Command(BaseCommand):
                     "en": "A great guide/manual for learning programming."
                 },
                 "category": {"uz": "Texnologiya", "ru": "Технологии", "en": "Technology"},
-                "resource_type": {"uz": "O'quv qo'llanma", "ru": "Учебное пособие", "en": "Textbook"},
                 "subjects": {"uz": "Dasturlash, IT, Python", "ru": "Программирование, IT, Python", "en": "Programming, IT, Python"},
                 "page_count": 280
             },
@@ -60,7 +57,6 @@ class Command(BaseCommand):
                     "en": "A philosophical work about a shepherd boy searching for his destiny."
                 },
                 "category": {"uz": "Jahon", "ru": "Мировая", "en": "World"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Falsafa, Sayohat, Orzu", "ru": "Философия, Путешествие, Мечта", "en": "Philosophy, Travel, Dream"},
                 "page_count": 200
             },
@@ -73,7 +69,6 @@ class Command(BaseCommand):
                     "en": "Destinies of people during and after the war."
                 },
                 "category": {"uz": "Badiiy", "ru": "Художественная", "en": "Fiction"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Urush, Taqdir, Hayaot", "ru": "Война, Судьба, Жизнь", "en": "War, Destiny, Life"},
                 "page_count": 510
             },
@@ -86,7 +81,6 @@ class Command(BaseCommand):
                     "en": "The official biography of Steve Jobs, founder of Apple."
                 },
                 "category": {"uz": "Ilmiy", "ru": "Научная", "en": "Scientific"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Biografiya, Biznes, Texnologiya", "ru": "Биография, Бизнес, Технологии", "en": "Biography, Business, Technology"},
                 "page_count": 650
             },
@@ -99,7 +93,6 @@ class Command(BaseCommand):
                     "en": "Historical novel about the life and activities of Babur Mirzo."
                 },
                 "category": {"uz": "Tarixiy", "ru": "Историческая", "en": "Historical"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Tarix, Boburiylar, Sarkarda", "ru": "История, Бабуриды, Полководец", "en": "History, Baburids, Commander"},
                 "page_count": 580
             },
@@ -112,7 +105,6 @@ class Command(BaseCommand):
                     "en": "A guide to building good habits and breaking bad ones."
                 },
                 "category": {"uz": "Psixologiya", "ru": "Психология", "en": "Psychology"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Odat, Rivojlanish, Psixologiya", "ru": "Привычка, Развитие, Психология", "en": "Habit, Development, Psychology"},
                 "page_count": 300
             },
@@ -125,7 +117,6 @@ class Command(BaseCommand):
                     "en": "Life of the Uzbek people during the war years."
                 },
                 "category": {"uz": "Badiiy", "ru": "Художественная", "en": "Fiction"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Urush, Sadoqat, Oila", "ru": "Война, Верность, Семья", "en": "War, Loyalty, Family"},
                 "page_count": 420
             },
@@ -138,7 +129,6 @@ class Command(BaseCommand):
                     "en": "World famous book on financial literacy."
                 },
                 "category": {"uz": "Biznes", "ru": "Бизнес", "en": "Business"},
-                "resource_type": {"uz": "Kitob", "ru": "Книга", "en": "Book"},
                 "subjects": {"uz": "Pul, Moliya, Investitsiya", "ru": "Деньги, Финансы, Инвестиции", "en": "Money, Finance, Investment"},
                 "page_count": 280
             }
@@ -155,8 +145,6 @@ class Command(BaseCommand):
                 setattr(book, f'title_{lang}', data['title'][lang])
                 setattr(book, f'author_{lang}', data['author'][lang])
                 setattr(book, f'description_{lang}', data['description'][lang])
-                setattr(book, f'category_{lang}', data['category'][lang])
-                setattr(book, f'resource_type_{lang}', data['resource_type'][lang])
                 setattr(book, f'subjects_{lang}', data['subjects'][lang])
             
             # Set common fields (using 'uz' as default for base fields if needed, but modeltranslation handles accessing .title by current language)
@@ -165,8 +153,10 @@ class Command(BaseCommand):
             book.title = data['title']['uz']
             book.author = data['author']['uz']
             book.description = data['description']['uz']
-            book.category = data['category']['uz']
-            book.resource_type = data['resource_type']['uz']
+            book.category, _ = Category.objects.get_or_create(
+                slug=category_slug(data['category']['uz']),
+                defaults={'name': data['category']['uz'], **{f'name_{lang}': name for lang, name in data['category'].items()}}
+            )
             book.subjects = data['subjects']['uz']
             
             book.page_count = data['page_count']
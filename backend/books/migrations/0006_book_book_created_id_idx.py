@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-18 09:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_alter_book_category_alter_book_category_en_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-created_at', 'id'], name='book_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:20
+
+from django.db import migrations
+
+# Frozen copy of the table books.search.book_index describes; a later change
+# to the live index needs its own migration.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_book_fts USING fts5("
+    "title, author, subjects, description, tokenize='unicode61 remove_diacritics 2')"
+)
+DROP_SQL = "DROP TABLE IF EXISTS books_book_fts"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_book_book_created_id_idx'),
+    ]
+
+    operations = [
+        # Filled by signals on save/delete and by `manage.py rebuild_search_index`
+        migrations.RunPython(create_index, drop_index),
+    ]
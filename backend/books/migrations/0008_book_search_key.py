@@ -0,0 +1,99 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:45
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of core.translit.build_search_key as of this migration, so that
+# later changes to the live key function do not rewrite history; run
+# `manage.py rebuild_search_index` after such a change instead.
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': "g'", 'д': 'd', 'е': 'e',
+    'ё': 'yo', 'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'қ': 'q',
+    'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's',
+    'т': 't', 'у': 'u', 'ў': "o'", 'ф': 'f', 'х': 'x', 'ҳ': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': "'", 'ы': 'i', 'ь': '', 'э': 'e',
+    'ю': 'yu', 'я': 'ya',
+}
+APOSTROPHE_RE = re.compile("[" + re.escape("'`´ʻʼʹ‘’′") + "]")
+PHONETIC_FOLDS = (('q', 'k'), ('x', 'h'), ('w', 'v'), ('y', 'i'))
+NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+REPEAT_RE = re.compile(r'(.)\1+')
+
+TRIGRAM_TABLE = 'books_book_trigram'
+
+
+def normalize(text):
+    if not text:
+        return ''
+    text = ''.join(CYRILLIC_TO_LATIN.get(char, char) for char in text.lower())
+    text = APOSTROPHE_RE.sub('', text)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    for source, target in PHONETIC_FOLDS:
+        text = text.replace(source, target)
+    text = REPEAT_RE.sub(r'\1', text)
+    return ' '.join(NON_WORD_RE.sub(' ', text).split())
+
+
+def build_search_key(*values):
+    words = []
+    for value in values:
+        for word in normalize(value).split():
+            if word not in words:
+                words.append(word)
+    return ' '.join(words)
+
+
+def fill_search_keys(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    languages = [code for code, _ in settings.LANGUAGES]
+    batch = []
+    for book in Book.objects.order_by('pk').iterator(chunk_size=500):
+        book.search_key = build_search_key(*[
+            getattr(book, f'{field}_{lang}') for field in ('title', 'author') for lang in languages
+        ])
+        batch.append(book)
+        if len(batch) >= 500:
+            Book.objects.bulk_update(batch, ['search_key'])
+            batch = []
+    if batch:
+        Book.objects.bulk_update(batch, ['search_key'])
+
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} USING fts5(key, tokenize='trigram')")
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {TRIGRAM_TABLE} (rowid, key) VALUES (%s, %s)",
+                list(Book.objects.values_list('pk', 'search_key')),
+            )
+    elif vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {TRIGRAM_TABLE} ON books_book USING gin (search_key gin_trgm_ops)")
+
+
+def drop_trigram_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TRIGRAM_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_book_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='search_key',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_keys, drop_trigram_index),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0009_book_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('new_books', models.IntegerField(default=0)),
+                ('new_users', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='LibraryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_books', models.PositiveIntegerField(default=0)),
+                ('total_users', models.PositiveIntegerField(default=0)),
+                ('categories', models.JSONField(default=dict)),
+                ('new_books_30d', models.PositiveIntegerField(default=0)),
+                ('new_users_today', models.PositiveIntegerField(default=0)),
+                ('rolled_up_on', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Statistika',
+                'verbose_name_plural': 'Statistika',
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_favorite_counts(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    through = Book.favorited_by.through
+    counts = (
+        through.objects.filter(book_id=OuterRef('pk'))
+        .values('book_id').annotate(total=Count('pk')).values('total')
+    )
+    Book.objects.update(favorite_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userprofile_updated_at'),
+        ('books', '0010_librarystats_dailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='favorite_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-favorite_count', '-created_at'], name='book_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['category_uz', '-favorite_count', '-created_at'], name='book_cat_popular_idx'),
+        ),
+        migrations.RunPython(fill_favorite_counts, migrations.RunPython.noop),
+    ]
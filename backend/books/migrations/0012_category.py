@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0011_book_favorite_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Nomi')),
+                ('name_uz', models.CharField(max_length=100, null=True, verbose_name='Nomi')),
+                ('name_ru', models.CharField(max_length=100, null=True, verbose_name='Nomi')),
+                ('name_en', models.CharField(max_length=100, null=True, verbose_name='Nomi')),
+                ('slug', models.SlugField(max_length=100, unique=True, verbose_name='Slug')),
+            ],
+            options={
+                'verbose_name': 'Kategoriya',
+                'verbose_name_plural': 'Kategoriyalar',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='category_ref',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='books.category'),
+        ),
+    ]
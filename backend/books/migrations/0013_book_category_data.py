@@ -0,0 +1,105 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:12
+
+from django.db import migrations
+from django.utils.text import slugify
+
+BATCH_SIZE = 1000
+
+# Frozen copy of core.translit.transliterate, which books.models.category_slug uses
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': "g'", 'д': 'd', 'е': 'e',
+    'ё': 'yo', 'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'қ': 'q',
+    'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's',
+    'т': 't', 'у': 'u', 'ў': "o'", 'ф': 'f', 'х': 'x', 'ҳ': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': "'", 'ы': 'i', 'ь': '', 'э': 'e',
+    'ю': 'yu', 'я': 'ya',
+}
+
+
+def transliterate(text):
+    return ''.join(CYRILLIC_TO_LATIN.get(char, char) for char in text.lower())
+
+# The values the admin form and the catalog filter have always used
+KNOWN_CATEGORIES = [
+    ('adabiyotlar', {'uz': 'Adabiyotlar', 'ru': 'Литература', 'en': 'Literature'}),
+    ('darslik', {'uz': 'Darslik', 'ru': 'Учебник', 'en': 'Textbook'}),
+    ('ilmiy', {'uz': 'Ilmiy adabiyot', 'ru': 'Научная литература', 'en': 'Scientific literature'}),
+    ('oquv', {'uz': "O'quv adabiyotlar", 'ru': 'Учебная литература', 'en': 'Educational literature'}),
+]
+
+# "All" was a filter value that leaked into the column, not a category
+NOT_A_CATEGORY = {'', 'barchasi'}
+
+
+def slug_for(value):
+    return slugify(transliterate(value or ''))
+
+
+def book_label(book):
+    # Same precedence as the old fix_categories.py script
+    return book.category_uz or book.category or book.category_ru or book.category_en
+
+
+def category_for(Category, categories, book):
+    label = book_label(book)
+    slug = slug_for(label)
+    if slug in NOT_A_CATEGORY:
+        return None
+    if slug not in categories:
+        names = {
+            'uz': book.category_uz or label,
+            'ru': book.category_ru or label,
+            'en': book.category_en or label,
+        }
+        categories[slug] = Category.objects.create(
+            slug=slug, name=names['uz'], name_uz=names['uz'], name_ru=names['ru'], name_en=names['en']
+        )
+    return categories[slug]
+
+
+def forwards(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Category = apps.get_model('books', 'Category')
+
+    for slug, names in KNOWN_CATEGORIES:
+        Category.objects.get_or_create(slug=slug, defaults={
+            'name': names['uz'], 'name_uz': names['uz'], 'name_ru': names['ru'], 'name_en': names['en'],
+        })
+    categories = {category.slug: category for category in Category.objects.all()}
+
+    books = Book.objects.only('pk', 'category', 'category_uz', 'category_ru', 'category_en').order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(books.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        for book in batch:
+            book.category_ref = category_for(Category, categories, book)
+        Book.objects.bulk_update(batch, ['category_ref'])
+        last_pk = batch[-1].pk
+
+    # Category counts were keyed by label; books.stats rebuilds the row on next read
+    apps.get_model('books', 'LibraryStats').objects.all().delete()
+
+
+def backwards(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Category = apps.get_model('books', 'Category')
+    for category in Category.objects.all():
+        Book.objects.filter(category_ref=category).update(
+            category=category.name_uz or category.name,
+            category_uz=category.name_uz or category.name,
+            category_ru=category.name_ru or category.name,
+            category_en=category.name_en or category.name,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0012_category'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
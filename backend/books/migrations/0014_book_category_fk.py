@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-18 13:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0013_book_category_data'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='book',
+            name='book_cat_popular_idx',
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='category',
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='category_en',
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='category_ru',
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='category_uz',
+        ),
+        migrations.RenameField(
+            model_name='book',
+            old_name='category_ref',
+            new_name='category',
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='category',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='books', to='books.category', verbose_name='Kategoriya'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['category', '-favorite_count', '-created_at'], name='book_cat_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['category', '-created_at', 'id'], name='book_cat_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:40
+
+import uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0015_book_cover_variants'),
+        ('uploads', '0002_blob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='cover_image',
+            field=models.ImageField(storage=uploads.storage.ContentAddressedStorage(), upload_to='books/covers/', verbose_name='Muqova Rasmi'),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=uploads.storage.ContentAddressedStorage(), upload_to='books/files/', verbose_name='Kitob Fayli (PDF/EPUB)'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0016_alter_book_cover_image_file'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='book',
+            name='resource_type',
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='resource_type_en',
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='resource_type_ru',
+        ),
+        migrations.RemoveField(
+            model_name='book',
+            name='resource_type_uz',
+        ),
+    ]
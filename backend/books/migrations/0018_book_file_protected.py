@@ -0,0 +1,75 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:40
+
+import os
+import shutil
+from collections import Counter
+
+import uploads.storage
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def transfer(source, target, copy=False):
+    if not os.path.exists(source):
+        return
+    if os.path.exists(target):
+        # Same name means same content (blobs) or an earlier, interrupted run
+        if not copy:
+            os.remove(source)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if copy:
+        shutil.copy2(source, target)
+    else:
+        shutil.move(source, target)
+
+
+def relocate(apps, source_root, target_root, source_prefix, target_prefix):
+    """Move every book file from ``source_root`` to ``target_root``, renaming blobs and their rows."""
+    Book = apps.get_model('books', 'Book')
+    Blob = apps.get_model('uploads', 'Blob')
+    uses = Counter(Book.objects.exclude(file='').exclude(file__isnull=True).values_list('file', flat=True))
+    for name, count in uses.items():
+        new_name = name
+        if name.startswith(f'{source_prefix}/'):
+            new_name = f'{target_prefix}/{name[len(source_prefix) + 1:]}'
+        elif name.startswith(f'{target_prefix}/'):
+            continue
+        blob = Blob.objects.filter(name=name).first()
+        # A cover or news image with the same bytes keeps its public copy
+        shared = blob is not None and blob.refcount > count
+        transfer(os.path.join(source_root, name), os.path.join(target_root, new_name), copy=shared)
+        if blob is not None and new_name != name:
+            target, _ = Blob.objects.get_or_create(name=new_name, defaults={'sha256': blob.sha256, 'size': blob.size})
+            Blob.objects.filter(pk=target.pk).update(refcount=F('refcount') + count)
+            if shared:
+                Blob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - count)
+            else:
+                blob.delete()
+        Book.objects.filter(file=name).update(file=new_name)
+
+
+def protect_files(apps, schema_editor):
+    relocate(apps, str(settings.MEDIA_ROOT), str(settings.PROTECTED_MEDIA_ROOT), 'blobs', 'files')
+
+
+def publish_files(apps, schema_editor):
+    relocate(apps, str(settings.PROTECTED_MEDIA_ROOT), str(settings.MEDIA_ROOT), 'files', 'blobs')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0017_remove_book_resource_type'),
+        ('uploads', '0002_blob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=uploads.storage.ProtectedStorage(), upload_to='books/files/', verbose_name='Kitob Fayli (PDF/EPUB)'),
+        ),
+        migrations.RunPython(protect_files, publish_files),
+    ]
@@ -1,5 +1,29 @@
+from django.conf import settings
 from django.db import models
+from django.utils.text import slugify
 from django_ckeditor_5.fields import CKEditor5Field
+from modeltranslation.utils import build_localized_fieldname
+from core.translit import build_search_key, transliterate
+from uploads.storage import blob_storage, protected_storage
+
+
+def category_slug(value):
+    """Slug for a category label in any script: "O'quv", "Darslik", "Учебник"."""
+    return slugify(transliterate(value or ''))
+
+
+class Category(models.Model):
+    name = models.CharField("Nomi", max_length=100)
+    slug = models.SlugField("Slug", max_length=100, unique=True)
+
+    class Meta:
+        verbose_name = "Kategoriya"
+        verbose_name_plural = "Kategoriyalar"
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
 
 class Book(models.Model):
     # Core Info
@@ -7,69 +31,114 @@ class Book(models.Model):
     author = models.CharField("Muallif(lar)", max_length=255)
     description = CKEditor5Field("Annotatsiya", config_name='extends')
     
-    # Categorization
-    CATEGORY_CHOICES = [
-        ('Adabiyotlar', 'Adabiyotlar'),
-        ('Darslik', 'Darslik'),
-        ('Ilmiy', 'Ilmiy Adabiyot'),
-        ('Oquv', 'O\'quv adabiyotlar'),
-        ('Barchasi', 'Barchasi'),
-    ]
-    category = models.CharField("Kategoriya", max_length=50, choices=CATEGORY_CHOICES, default='Adabiyotlar')
+    # Categorization (indexed through the composite indexes in Meta)
+    category = models.ForeignKey(
+        Category, verbose_name="Kategoriya", related_name='books',
+        on_delete=models.PROTECT, null=True, blank=True, db_index=False
+    )
     
     # Metadata
     page_count = models.IntegerField("Betlar Soni", default=0)
     published_date = models.DateField("Chop Etilgan Sana", null=True, blank=True)
     subjects = models.TextField("Mavzular (Teglar)", help_text="Vergul bilan ajratib yozing: Tarix, Roman, Klassika")
     
-    # Media
-    cover_image = models.ImageField("Muqova Rasmi", upload_to='books/covers/')
+    # Media; cover and file are stored once per content (uploads.storage), so
+    # upload_to only names the files uploaded before that
+    cover_image = models.ImageField("Muqova Rasmi", upload_to='books/covers/', storage=blob_storage)
+    # Resized WebP/JPEG copies of cover_image, see core.images
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Optional stored copy (manage.py regenerate_qr_codes); the API serves /api/books/<id>/qr.svg
     qr_code = models.ImageField("QR Kod (Rasm)", upload_to='books/qrcodes/', null=True, blank=True)
-    file = models.FileField("Kitob Fayli (PDF/EPUB)", upload_to='books/files/', null=True, blank=True)
+    file = models.FileField("Kitob Fayli (PDF/EPUB)", upload_to='books/files/', storage=protected_storage, null=True, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Number of profiles with this book in favourites; see books.stats.refresh_favorite_counts
+    favorite_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Transliterated, apostrophe- and case-folded title/author words in every
+    # language; the trigram index in books.search is built over this.
+    search_key = models.TextField(editable=False, blank=True, default='')
 
     class Meta:
         verbose_name = "Kitob"
         verbose_name_plural = "Kitoblar"
         ordering = ['-created_at']
+        indexes = [
+            # Backs keyset pagination in core.pagination.BookPagination
+            models.Index(fields=['-created_at', 'id'], name='book_created_id_idx'),
+            # Top-N popular reads, global and per category
+            models.Index(fields=['-favorite_count', '-created_at'], name='book_popular_idx'),
+            models.Index(fields=['category', '-favorite_count', '-created_at'], name='book_cat_popular_idx'),
+            # ?category= lists, paged like book_created_id_idx
+            models.Index(fields=['category', '-created_at', 'id'], name='book_cat_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def get_search_key(self):
+        values = [
+            getattr(self, build_localized_fieldname(field, lang), None)
+            for field in ('title', 'author')
+            for lang, _ in settings.LANGUAGES
+        ]
+        return build_search_key(*values)
+
     def save(self, *args, **kwargs):
-        # 1. Save first to ensure we have an ID
-        is_new = self._state.adding
+        self.search_key = self.get_search_key()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'search_key' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'search_key']
         super().save(*args, **kwargs)
 
-        # 2. Generate QR Code if it's new or doesn't exist (or always if you want to ensure it matches)
-        if is_new or not self.qr_code:
-            import qrcode
-            from io import BytesIO
-            from django.core.files import File
-
-            # Public URL for the book
-            # Ensure this matches your frontend route
-            url = f"https://e-library.samduuf.uz/books/{self.id}"
-            
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(url)
-            qr.make(fit=True)
-
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Save to buffer
-            buffer = BytesIO()
-            img.save(buffer, format="PNG")
-            
-            # Save to model field
-            filename = f"qr_book_{self.id}.png"
-            self.qr_code.save(filename, File(buffer), save=False)
-            
-            # Save again to persist the image field change
-            super().save(update_fields=['qr_code'])
+
+class LibraryStats(models.Model):
+    """Single row (pk=1) of counters maintained by books.stats."""
+    total_books = models.PositiveIntegerField(default=0)
+    total_users = models.PositiveIntegerField(default=0)
+    # {category: book count} for categories that have at least one book
+    categories = models.JSONField(default=dict)
+    new_books_30d = models.PositiveIntegerField(default=0)
+    new_users_today = models.PositiveIntegerField(default=0)
+    # Day the date-dependent counters above were last derived from DailyStat
+    rolled_up_on = models.DateField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Statistika"
+        verbose_name_plural = "Statistika"
+
+    def __str__(self):
+        return f"{self.total_books} kitob, {self.total_users} foydalanuvchi"
+
+
+class DailyStat(models.Model):
+    """Per-day rollup behind the rolling "new books" window and "new users today"."""
+    date = models.DateField(unique=True)
+    new_books = models.IntegerField(default=0)
+    new_users = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"{self.date}: +{self.new_books} kitob, +{self.new_users} foydalanuvchi"
+
+
+class ImportCheckpoint(models.Model):
+    """
+    How far ``manage.py import_books`` got in a source file. Saved in the
+    same transaction as each batch of rows (and of attached media), so
+    ``--resume`` never inserts or attaches anything twice.
+    """
+    source = models.CharField(max_length=500, unique=True)
+    stage = models.CharField(max_length=10, default='rows')
+    rows = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    # Committed lines of the media list, and how many of them are attached
+    media_lines = models.PositiveIntegerField(default=0)
+    media_done = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.rows} rows ({self.stage})"
@@ -0,0 +1,68 @@
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.files.base import ContentFile
+
+BOX_SIZE = 10
+BORDER = 4
+# Rendered images kept per process; a code is a few hundred bytes (SVG) to a few KB (PNG)
+CACHE_SIZE = 1024
+
+
+def book_url(book_id):
+    """Public URL a printed code points to; must match the frontend route."""
+    return settings.BOOK_PUBLIC_URL.format(id=book_id)
+
+
+def make_qr(url):
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=BOX_SIZE,
+        border=BORDER,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _render(url, fmt, size):
+    qr = make_qr(url)
+    buffer = BytesIO()
+    if fmt == 'svg':
+        # Vector, scales to any size: one path instead of a rect per module
+        qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).save(buffer)
+    else:
+        if size:
+            qr.box_size = max(1, size // (qr.modules_count + 2 * BORDER))
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def render_svg(book_id):
+    return _render(book_url(book_id), 'svg', None)
+
+
+def render_png(book_id, size=None):
+    """PNG bytes of the book's QR code, about ``size`` pixels wide (default 10px modules)."""
+    return _render(book_url(book_id), 'png', size)
+
+
+def qr_filename(book_id):
+    return f"qr_book_{book_id}.png"
+
+
+def store_png(book_id):
+    """
+    Render and write the QR image; returns the storage name for ``Book.qr_code``.
+    Never overwrites: the row keeps pointing at the old file until it is updated.
+    """
+    from .models import Book
+
+    field = Book._meta.get_field('qr_code')
+    name = field.generate_filename(None, qr_filename(book_id))
+    return field.storage.save(name, ContentFile(render_png(book_id)))
@@ -0,0 +1,16 @@
+from core.search import SearchIndex, TrigramIndex
+from .models import Book
+
+book_index = SearchIndex(
+    Book,
+    table='books_book_fts',
+    columns={
+        'title': ['title'],
+        'author': ['author'],
+        'subjects': ['subjects'],
+        'description': ['description'],
+    },
+    weights=(10.0, 5.0, 3.0, 1.0),
+    html_fields=('description',),
+    fuzzy=TrigramIndex(Book, table='books_book_trigram', key_field='search_key'),
+)
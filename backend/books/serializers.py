@@ -1,10 +1,21 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Book
+from .models import Book, Category
+from core import images
+from core.serializers import SparseFieldsetMixin, TranslatedFieldsMixin, force_https
+
+class BookSerializer(SparseFieldsetMixin, TranslatedFieldsMixin, serializers.ModelSerializer):
+    category = serializers.SlugRelatedField(
+        slug_field='slug', queryset=Category.objects.all(), required=False, allow_null=True
+    )
+    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
+    # Rendered on demand by BookQRCodeView; the stored image is no longer needed
+    qr_code = serializers.SerializerMethodField()
+    cover_srcset = serializers.SerializerMethodField()
 
-class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
-        fields = '__all__'
+        exclude = ['search_key', 'favorite_count', 'cover_variants']
         extra_kwargs = {
             'title': {'required': False},
             'author': {'required': False},
@@ -12,24 +23,45 @@ class BookSerializer(serializers.ModelSerializer):
             'subjects': {'required': False}
         }
 
+    def get_cover_srcset(self, obj):
+        return images.srcset(obj.cover_image, obj.cover_variants, self.context.get('request'))
+
+    def get_qr_code(self, obj):
+        if obj.pk is None:
+            return None
+        url = reverse('book-qr', kwargs={'pk': obj.pk, 'fmt': 'svg'})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        # Force HTTPS for cover_image if it exists and starts with http:
-        if representation.get('cover_image'):
-            url = representation['cover_image']
-            if url.startswith('http:'):
-                representation['cover_image'] = url.replace('http:', 'https:', 1)
-        
-        # Force HTTPS for file_url if it exists
         if representation.get('file'):
-            url = representation['file']
-            if url.startswith('http:'):
-                representation['file'] = url.replace('http:', 'https:', 1)
+            # Served by BookFileView (auth + Range), not straight from MEDIA_URL
+            url = reverse('book-file', kwargs={'pk': instance.pk})
+            request = self.context.get('request')
+            representation['file'] = request.build_absolute_uri(url) if request else url
+        # Force HTTPS for media URLs (cover_image, file, qr_code)
+        return force_https(representation, 'cover_image', 'file', 'qr_code')
 
-        # Force HTTPS for qr_code if it exists
-        if representation.get('qr_code'):
-            url = representation['qr_code']
-            if url.startswith('http:'):
-                representation['qr_code'] = url.replace('http:', 'https:', 1)
 
-        return representation
+class BookListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Compact card representation for catalog, popular and favourites lists."""
+    category = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True, allow_null=True)
+    year = serializers.SerializerMethodField()
+    cover_srcset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Book
+        fields = ['id', 'title', 'author', 'cover_image', 'cover_srcset', 'category', 'category_name', 'year']
+        read_only_fields = fields
+
+    def get_year(self, obj):
+        return obj.published_date.year if obj.published_date else None
+
+    def get_cover_srcset(self, obj):
+        return images.srcset(obj.cover_image, obj.cover_variants, self.context.get('request'))
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        return force_https(representation, 'cover_image')
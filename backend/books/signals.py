@@ -0,0 +1,70 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Book, Category
+from .search import book_index
+from . import stats
+from core import images
+from core.cache import invalidate_tags
+from jobs.queue import enqueue_on_commit
+
+# remember_category did not look: unlike None ("had no category"), nothing to compare
+MISSING = object()
+
+
+@receiver(post_save, sender=Book)
+def index_book(sender, instance, **kwargs):
+    book_index.update(instance)
+
+
+@receiver(post_save, sender=Book)
+def queue_cover_variants(sender, instance, **kwargs):
+    if instance.cover_image and not images.is_current(instance.cover_image, instance.cover_variants):
+        enqueue_on_commit('books.cover_variants', instance.pk, key=f'book-cover:{instance.pk}')
+
+
+@receiver(post_delete, sender=Book)
+def unindex_book(sender, instance, **kwargs):
+    book_index.delete(instance.pk)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_responses(sender, instance, **kwargs):
+    invalidate_tags(f'book:{instance.pk}', 'books:list', 'books:popular', 'stats')
+
+
+@receiver(pre_save, sender=Book)
+def remember_category(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (update_fields is not None and 'category' not in update_fields):
+        return
+    instance._stats_old_category = (
+        Book.objects.filter(pk=instance.pk).values_list(stats.CATEGORY_FIELD, flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Book)
+def count_book(sender, instance, created, **kwargs):
+    if created:
+        stats.book_created(instance)
+        return
+    old = getattr(instance, '_stats_old_category', MISSING)
+    new = stats.book_category(instance)
+    if old is not MISSING and old != new:
+        stats.book_category_changed(old, new)
+    instance._stats_old_category = new
+
+
+@receiver(post_delete, sender=Book)
+def uncount_book(sender, instance, **kwargs):
+    stats.book_deleted(instance)
+
+
+@receiver(post_save, sender=Category)
+def touch_category_books(sender, instance, created, **kwargs):
+    if created:
+        return
+    # Book payloads embed the category name: move their validators and cached copies
+    book_ids = list(instance.books.values_list('pk', flat=True))
+    Book.objects.filter(pk__in=book_ids).update(updated_at=timezone.now())
+    invalidate_tags(*[f'book:{pk}' for pk in book_ids], 'books:list', 'books:popular', 'stats')
@@ -0,0 +1,192 @@
+"""
+Library counters kept current by signals instead of COUNT queries per request.
+
+``LibraryStats`` is a single row read by both stats endpoints. Book and user
+signals adjust it (and the per-day ``DailyStat`` rollup) with ``F()``
+UPDATEs, so concurrent changes add up instead of overwriting each other. The
+counter UPDATE is the first statement of each change and so also queues the
+rest of it (the category JSON) behind any other change in flight, on SQLite
+as well as on row-locking databases. The rolling 30-day ``new_books_30d``
+and ``new_users_today`` are re-derived from ``DailyStat`` the first time the
+row is read on a new day. ``manage.py reconcile_stats`` rebuilds everything
+from the source tables.
+"""
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, F, Func, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Book, DailyStat, LibraryStats
+from core.cache import invalidate_tags
+
+NEW_BOOKS_WINDOW_DAYS = 30
+
+# Stats group on the category id (as a string: the counts live in a JSON object)
+CATEGORY_FIELD = 'category_id'
+
+
+def book_category(book):
+    return getattr(book, CATEGORY_FIELD)
+
+
+def window_start(today):
+    return today - datetime.timedelta(days=NEW_BOOKS_WINDOW_DAYS - 1)
+
+
+def roll_over(today):
+    """Re-derive the date-dependent counters unless already done today; one UPDATE."""
+    window = DailyStat.objects.filter(date__gte=window_start(today), date__lte=today)
+    new_books = window.order_by().annotate(total=Func(F('new_books'), function='SUM')).values('total')
+    new_users = window.filter(date=today).values('new_users')[:1]
+    return LibraryStats.objects.filter(pk=1).exclude(rolled_up_on=today).update(
+        new_books_30d=Coalesce(Subquery(new_books), 0),
+        new_users_today=Coalesce(Subquery(new_users), 0),
+        rolled_up_on=today,
+    )
+
+
+def _bump_day(date, **deltas):
+    DailyStat.objects.get_or_create(date=date)
+    DailyStat.objects.filter(date=date).update(**{name: F(name) + delta for name, delta in deltas.items()})
+
+
+def _update(counters, days=None, categories=()):
+    """
+    Add ``counters`` (``{field: delta}``, floored at 0) to the stats row,
+    ``days`` (``{date: {field: delta}}``) to DailyStat and ``categories``
+    (``(category, delta)`` pairs) to the category counts.
+    """
+    with transaction.atomic():
+        updated = LibraryStats.objects.filter(pk=1).update(
+            **{name: Greatest(F(name) + delta, 0) for name, delta in counters.items()}
+        )
+        if not updated:
+            # First event ever: build the row from the tables (already includes this change)
+            reconcile()
+            return
+        for date, deltas in (days or {}).items():
+            _bump_day(date, **deltas)
+        categories = [(str(category), delta) for category, delta in categories if category is not None]
+        if categories:
+            # Safe read-modify-write: the UPDATE above holds the write lock until commit
+            counts = dict(LibraryStats.objects.values_list('categories', flat=True).get(pk=1))
+            for category, delta in categories:
+                count = counts.get(category, 0) + delta
+                if count > 0:
+                    counts[category] = count
+                else:
+                    counts.pop(category, None)
+            LibraryStats.objects.filter(pk=1).update(categories=counts)
+
+
+def book_created(book):
+    today = timezone.localdate()
+    created = timezone.localdate(book.created_at)
+    counters = {'total_books': 1}
+    if created >= window_start(today):
+        counters['new_books_30d'] = 1
+    _update(counters, {created: {'new_books': 1}}, [(book_category(book), 1)])
+
+
+def book_deleted(book):
+    today = timezone.localdate()
+    created = timezone.localdate(book.created_at)
+    counters, days = {'total_books': -1}, {}
+    if created >= window_start(today):
+        # Days outside the window no longer feed any counter
+        counters['new_books_30d'] = -1
+        days[created] = {'new_books': -1}
+    _update(counters, days, [(book_category(book), -1)])
+
+
+def book_category_changed(old, new):
+    _update({}, categories=[(old, -1), (new, 1)])
+
+
+def user_created(user):
+    joined = timezone.localdate(user.date_joined)
+    counters = {'total_users': 1}
+    if joined == timezone.localdate():
+        counters['new_users_today'] = 1
+    _update(counters, {joined: {'new_users': 1}})
+
+
+def user_deleted(user):
+    today = timezone.localdate()
+    joined = timezone.localdate(user.date_joined)
+    counters, days = {'total_users': -1}, {}
+    if joined >= window_start(today):
+        days[joined] = {'new_users': -1}
+    if joined == today:
+        counters['new_users_today'] = -1
+    _update(counters, days)
+
+
+def get_stats():
+    """The stats row, rolled up for today. One SELECT in the common case."""
+    stats = LibraryStats.objects.filter(pk=1).first()
+    if stats is None:
+        return reconcile()
+    if stats.rolled_up_on != timezone.localdate():
+        roll_over(timezone.localdate())
+        stats.refresh_from_db()
+    return stats
+
+
+def reconcile(days=NEW_BOOKS_WINDOW_DAYS):
+    """Recount everything from Book and User, rewriting the last ``days`` of DailyStat."""
+    today = timezone.localdate()
+    since = today - datetime.timedelta(days=days - 1)
+    with transaction.atomic():
+        LibraryStats.objects.get_or_create(pk=1)
+        # Holds the write lock through the recount, like the increments in _update
+        LibraryStats.objects.filter(pk=1).update(rolled_up_on=None)
+
+        books = (
+            Book.objects.filter(created_at__date__gte=since)
+            .annotate(day=TruncDate('created_at')).values('day').annotate(count=Count('id')).order_by()
+        )
+        users = (
+            User.objects.filter(date_joined__date__gte=since)
+            .annotate(day=TruncDate('date_joined')).values('day').annotate(count=Count('id')).order_by()
+        )
+        days_seen = {}
+        for row in books:
+            days_seen.setdefault(row['day'], {})['new_books'] = row['count']
+        for row in users:
+            days_seen.setdefault(row['day'], {})['new_users'] = row['count']
+        DailyStat.objects.filter(date__gte=since).delete()
+        DailyStat.objects.bulk_create([
+            DailyStat(date=day, new_books=counts.get('new_books', 0), new_users=counts.get('new_users', 0))
+            for day, counts in days_seen.items()
+        ])
+
+        LibraryStats.objects.filter(pk=1).update(
+            total_books=Book.objects.count(),
+            total_users=User.objects.count(),
+            categories={
+                str(row[CATEGORY_FIELD]): row['count']
+                for row in Book.objects.values(CATEGORY_FIELD).annotate(count=Count('id')).order_by()
+                if row[CATEGORY_FIELD] is not None
+            },
+        )
+        roll_over(today)
+    invalidate_tags('stats')
+    return LibraryStats.objects.get(pk=1)
+
+
+def refresh_favorite_counts(book_ids=None):
+    """
+    Recount ``Book.favorite_count`` from the favourites through table, for
+    ``book_ids`` or every book. Returns the number of rows updated.
+    """
+    through = Book.favorited_by.through
+    counts = (
+        through.objects.filter(book_id=OuterRef('pk'))
+        .values('book_id').annotate(total=Count('pk')).values('total')
+    )
+    books = Book.objects.all() if book_ids is None else Book.objects.filter(pk__in=book_ids)
+    return books.update(favorite_count=Coalesce(Subquery(counts), 0))
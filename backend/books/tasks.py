@@ -0,0 +1,23 @@
+from django.utils import timezone
+from jobs.queue import task
+from .models import Book
+from core import images
+from core.cache import invalidate_tags
+
+
+@task('books.cover_variants')
+def build_cover_variants(book_id):
+    book = Book.objects.filter(pk=book_id).only('pk', 'cover_image', 'cover_variants').first()
+    if book is None or not book.cover_image or images.is_current(book.cover_image, book.cover_variants):
+        return
+
+    manifest = images.build_variants(book.cover_image)
+    # Only if the cover was not replaced again while rendering
+    updated = Book.objects.filter(pk=book.pk, cover_image=book.cover_image.name).update(
+        cover_variants=manifest, updated_at=timezone.now()
+    )
+    if updated:
+        images.delete_variants(book.cover_variants)
+        invalidate_tags(f'book:{book.pk}', 'books:list', 'books:popular')
+    else:
+        images.delete_variants(manifest)
@@ -1,3 +1,944 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from rest_framework.test import APIClient
+
+from jobs.models import Job
+from uploads.models import Blob
+from . import qr, stats
+from .search import book_index
+from .models import Book, Category, DailyStat, ImportCheckpoint, LibraryStats
+from .tasks import build_cover_variants
+
+
+def make_book(**fields):
+    fields.setdefault('title', 'Kitob')
+    fields.setdefault('author', 'Muallif')
+    return Book.objects.create(**fields)
+
+
+def cursor(link):
+    return parse_qs(urlsplit(link).query)['cursor'][0]
+
+
+# Anonymous reads go through the shared response cache; keep it per test
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class APITestCase(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+
+
+class BookPaginationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        start = timezone.now() - datetime.timedelta(days=30)
+        for n in range(7):
+            book = make_book(title=f'Kitob {n}')
+            # Two books share a timestamp so the id tie-breaker is exercised
+            Book.objects.filter(pk=book.pk).update(created_at=start + datetime.timedelta(days=n // 2 * 2))
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('book-list')
+        self.expected = list(Book.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+
+    def test_plain_list_without_paging_params(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data], self.expected)
+
+    def test_cursor_walks_forward_and_back(self):
+        seen = []
+        pages = []
+        params = {'page_size': 3}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            params = {'page_size': 3, 'cursor': cursor(response.data['next'])}
+        self.assertEqual(seen, self.expected)
+        self.assertIsNone(pages[0]['previous'])
+
+        response = self.client.get(self.url, {'page_size': 3, 'cursor': cursor(pages[-1]['previous'])})
+        self.assertEqual(response.data['results'], pages[-2]['results'])
+
+    def test_count_on_request(self):
+        response = self.client.get(self.url, {'page_size': 2, 'count': 1})
+        self.assertEqual(response.data['count'], 7)
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertNotIn('count', response.data)
+
+    def test_invalid_cursor_is_404(self):
+        for value in ('bm9wZQ', 'not-base64!', 'eyJ2IjpbMV0sInIiOjB9'):
+            response = self.client.get(self.url, {'cursor': value})
+            self.assertEqual(response.status_code, 404, value)
+
+
+class BookSearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.in_title = make_book(title='Fizika asoslari', author='Karimov')
+        cls.in_description = make_book(title='Mexanika', author='Usmonov', description='<p>Umumiy <b>fizika</b> kursi</p>')
+        cls.translated = make_book(title_uz='Kimyo', title_ru='Химия', title_en='Chemistry', author='Aliyev')
+        make_book(title='Tarix', author='Rahimov')
+
+    def search(self, terms, **params):
+        response = self.client.get(reverse('book-list'), {'search': terms, **params})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [row['id'] for row in (data['results'] if 'results' in data else data)]
+
+    def test_title_match_ranks_above_description(self):
+        self.assertEqual(self.search('fizika'), [self.in_title.pk, self.in_description.pk])
+
+    def test_every_language_is_indexed_and_prefixes_match(self):
+        self.assertEqual(self.search('chem'), [self.translated.pk])
+        self.assertEqual(self.search('химия'), [self.translated.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.in_title.title = 'Optika'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_title.save()
+        self.assertEqual(self.search('optika'), [self.in_title.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.in_title.delete()
+        self.assertEqual(self.search('optika'), [])
+
+    def test_search_is_paged_by_offset(self):
+        response = self.client.get(reverse('book-list'), {'search': 'fizika', 'page_size': 1})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.in_title.pk])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([row['id'] for row in response.data['results']], [self.in_description.pk])
+        self.assertIsNone(response.data['next'])
+
+    def test_query_syntax_is_not_interpreted(self):
+        # Quotes, operators and brackets are plain words, never FTS5 syntax errors
+        self.assertEqual(self.search('"fizika"'), self.search('fizika'))
+        self.search('fizika) AND (NEAR "')
+        self.assertEqual(self.search('*"'), [])
+
+    def test_fallback_without_fts5(self):
+        from .search import book_index
+
+        results = book_index._search_fallback(Book.objects.all(), 'FIZIKA kurs')
+        self.assertEqual(list(results.values_list('pk', flat=True)), [self.in_description.pk])
+        self.assertFalse(book_index._search_fallback(Book.objects.all(), 'yoq').exists())
+
+
+class BookFuzzySearchTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(title="O'tkan kunlar", author='Abdulla Qodiriy')
+        make_book(title='Mexanika', author='Usmonov')
+
+    def search(self, terms):
+        response = self.client.get(reverse('book-list'), {'search': terms})
+        return [row['id'] for row in response.json()]
+
+    def test_search_key_is_kept_current(self):
+        self.assertEqual(self.book.search_key, 'otkan kunlar abdula kodiri')
+        Book.objects.get(pk=self.book.pk).save(update_fields=['author'])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.search_key, 'otkan kunlar abdula kodiri')
+
+    def test_other_script_and_typos_find_the_book(self):
+        for terms in ('Ўткан кунлар', 'Кодирий', 'otkan kunar', 'Qodiri'):
+            self.assertEqual(self.search(terms), [self.book.pk], terms)
+
+    def test_unrelated_terms_find_nothing(self):
+        self.assertEqual(self.search('zzzqqq'), [])
+        # Too short for a trigram and no word starts with it
+        self.assertEqual(self.search('q1'), [])
+
+
+class BookRepresentationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(title='Kimyo', author='Aliyev', description='<p>Uzun matn</p>', subjects='Fan')
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_list_rows_are_cards(self):
+        row = self.get(reverse('book-list'))[0]
+        self.assertEqual(set(row), {'id', 'title', 'author', 'cover_image', 'cover_srcset', 'category', 'category_name', 'year'})
+        self.assertIn('description', self.get(reverse('book-detail', args=[self.book.pk])))
+
+    def test_fields_and_omit(self):
+        row = self.get(reverse('book-list'), fields='id,subjects')[0]
+        self.assertEqual(row, {'id': self.book.pk, 'subjects': 'Fan'})
+        row = self.get(reverse('book-detail', args=[self.book.pk]), omit='description,file')
+        self.assertNotIn('description', row)
+        self.assertNotIn('file', row)
+        self.assertIn('subjects', row)
+
+    def test_unknown_field_names_are_ignored(self):
+        row = self.get(reverse('book-detail', args=[self.book.pk]), fields='id, title ,nope,')
+        self.assertEqual(row, {'id': self.book.pk, 'title': 'Kimyo'})
+        self.assertEqual(self.get(reverse('book-list'), fields='nope')[0], {})
+
+
+class BookTranslationTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(title_uz='Kimyo', title_ru='Химия', author='Aliyev')
+        cls.staff = User.objects.create_user('kutubxonachi', is_staff=True)
+        cls.reader = User.objects.create_user('talaba')
+
+    def get(self, **params):
+        response = self.client.get(reverse('book-detail', args=[self.book.pk]), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_one_value_per_field_in_the_requested_language(self):
+        data = self.get(lang='ru').json()
+        self.assertEqual(data['title'], 'Химия')
+        self.assertNotIn('title_ru', data)
+        self.assertNotIn('title_uz', data)
+        self.assertEqual(self.get(lang='ru')['Content-Language'], 'ru')
+        self.assertEqual(self.get(lang='uz').json()['title'], 'Kimyo')
+
+    def test_missing_translation_falls_back_to_uzbek(self):
+        self.assertEqual(self.get(lang='en').json()['title'], 'Kimyo')
+
+    def test_unknown_language_is_ignored(self):
+        self.assertEqual(self.get(lang='de').json()['title'], 'Kimyo')
+
+    def test_all_translations_for_staff_only(self):
+        self.client.force_authenticate(self.reader)
+        self.assertNotIn('title_ru', self.get(translations='all').json())
+        self.client.force_authenticate(self.staff)
+        data = self.get(translations='all').json()
+        self.assertEqual((data['title_uz'], data['title_ru'], data['title_en']), ('Kimyo', 'Химия', None))
+
+
+class BookConditionalGetTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(title='Kimyo')
+        make_book(title='Fizika')
+
+    def test_detail_revalidates_with_304(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        self.book.title = 'Kimyo 2'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_validator_covers_count_and_variant(self):
+        url = reverse('book-list')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(url, {'lang': 'ru'})['ETag'], etag)
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.exclude(pk=self.book.pk).get().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_mismatched_or_malformed_validators_get_the_body(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        for value in ('"nope"', 'garbage', ''):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=value)
+            self.assertEqual(response.status_code, 200, value)
+            self.assertEqual(response.json()['title'], 'Kimyo')
+        self.assertEqual(self.client.get(reverse('book-detail', args=[0])).status_code, 404)
+
+
+class BookResponseCacheTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book(title='Kimyo')
+        cls.user = User.objects.create_user('talaba')
+
+    def test_anonymous_reads_are_cached_until_a_tag_moves(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.json()['title'], 'Kimyo')
+        self.assertEqual(self.client.get(reverse('book-list'))['X-Cache'], 'MISS')
+
+        self.book.title = 'Fizika'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json()['title'], 'Fizika')
+        self.assertEqual(self.client.get(reverse('book-list'))['X-Cache'], 'MISS')
+
+    def test_other_books_keep_their_entries(self):
+        other = make_book(title='Tarix')
+        url = reverse('book-detail', args=[other.pk])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.save()
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+    def test_cached_copy_answers_revalidation(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['X-Cache']), (304, 'HIT'))
+
+    def test_errors_and_signed_in_readers_are_not_cached(self):
+        url = reverse('book-detail', args=[0])
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+        self.client.force_authenticate(self.user)
+        url = reverse('book-detail', args=[self.book.pk])
+        self.client.get(url)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_rolled_back_change_keeps_the_entries(self):
+        url = reverse('book-detail', args=[self.book.pk])
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.book.save()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+
+class LibraryStatsTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tarix = Category.objects.create(name='Tarix', slug='tarix')
+        cls.fizika = Category.objects.create(name='Fizika', slug='fizika')
+
+    def stats(self):
+        return stats.get_stats()
+
+    def test_counters_follow_books_and_users(self):
+        book = make_book(category=self.tarix)
+        make_book(category=self.tarix)
+        make_book()
+        User.objects.create_user('talaba')
+        row = self.stats()
+        self.assertEqual((row.total_books, row.new_books_30d, row.total_users, row.new_users_today), (3, 3, 1, 1))
+        self.assertEqual(row.categories, {str(self.tarix.pk): 2})
+
+        book.category = self.fizika
+        book.save()
+        book.delete()
+        row = self.stats()
+        self.assertEqual((row.total_books, row.new_books_30d), (2, 2))
+        self.assertEqual(row.categories, {str(self.tarix.pk): 1})
+        self.assertEqual(DailyStat.objects.get(date=timezone.localdate()).new_books, 2)
+
+    def test_book_gets_a_category_later(self):
+        book = make_book()
+        book.category = self.tarix
+        book.save()
+        self.assertEqual(self.stats().categories, {str(self.tarix.pk): 1})
+        self.assertEqual(self.stats().categories, stats.reconcile().categories)
+
+    def test_book_loses_its_category(self):
+        book = make_book(category=self.tarix)
+        book.category = None
+        book.save()
+        self.assertEqual(self.stats().categories, {})
+        self.assertEqual(self.stats().categories, stats.reconcile().categories)
+
+    def test_saves_that_skip_the_category_change_nothing(self):
+        book = make_book(category=self.tarix)
+        book = Book.objects.get(pk=book.pk)
+        book.title = 'Yangi'
+        book.save(update_fields=['title'])
+        self.assertEqual(self.stats().categories, {str(self.tarix.pk): 1})
+
+    def test_counts_match_a_recount(self):
+        for n in range(4):
+            make_book(category=self.fizika if n % 2 else None)
+        Book.objects.first().delete()
+        User.objects.create_user('talaba').delete()
+        counted = self.stats()
+        recounted = stats.reconcile()
+        for name in ('total_books', 'total_users', 'categories', 'new_books_30d', 'new_users_today'):
+            self.assertEqual(getattr(counted, name), getattr(recounted, name), name)
+
+    def test_increments_are_not_read_modify_write(self):
+        make_book()
+        held = self.stats()
+        make_book()
+        # A stale copy in memory never goes back to the row
+        held.save()
+        self.assertEqual(stats.get_stats().total_books, 1)
+        stats.book_created(make_book())
+        self.assertEqual(stats.get_stats().total_books, 3)
+
+    def test_counters_never_go_negative(self):
+        book = make_book(category=self.tarix)
+        LibraryStats.objects.update(total_books=0, new_books_30d=0, categories={})
+        book.delete()
+        row = self.stats()
+        self.assertEqual((row.total_books, row.new_books_30d, row.categories), (0, 0, {}))
+
+    def test_window_rolls_over_across_the_year(self):
+        make_book()
+        DailyStat.objects.all().delete()
+        DailyStat.objects.create(date=datetime.date(2025, 12, 1), new_books=7)
+        DailyStat.objects.create(date=datetime.date(2025, 12, 31), new_books=2, new_users=5)
+        DailyStat.objects.create(date=datetime.date(2026, 1, 2), new_books=3, new_users=4)
+        self.assertEqual(stats.roll_over(datetime.date(2026, 1, 2)), 1)
+        row = LibraryStats.objects.get(pk=1)
+        self.assertEqual((row.new_books_30d, row.new_users_today), (5, 4))
+        self.assertEqual(stats.roll_over(datetime.date(2026, 1, 2)), 0)
+        stats.roll_over(datetime.date(2026, 3, 1))
+        row.refresh_from_db()
+        self.assertEqual((row.new_books_30d, row.new_users_today), (0, 0))
+
+    def test_endpoint(self):
+        make_book(category=self.tarix)
+        response = self.client.get(reverse('library-stats'))
+        self.assertEqual(response.json(), {'totalBooks': 1, 'categories': 1, 'users': 0, 'newBooks': 1})
+        self.assertEqual(self.client.get(reverse('admin-stats')).status_code, 401)
+
+
+class PopularBooksTests(APITestCase):
+
+    def test_most_favourited_first_per_category(self):
+        fizika = Category.objects.create(name='Fizika', slug='fizika')
+        books = [make_book(title=f'Kitob {n}', category=fizika if n < 2 else None) for n in range(8)]
+        Book.objects.filter(pk=books[1].pk).update(favorite_count=5)
+        Book.objects.filter(pk=books[6].pk).update(favorite_count=9)
+        ids = [row['id'] for row in self.client.get(reverse('popular-books')).json()]
+        self.assertEqual(len(ids), 6)
+        self.assertEqual(ids[:2], [books[6].pk, books[1].pk])
+
+        response = self.client.get(reverse('popular-books'), {'category': 'Fizika'})
+        self.assertEqual([row['id'] for row in response.json()], [books[1].pk, books[0].pk])
+        self.assertEqual(self.client.get(reverse('popular-books'), {'category': 'yoq'}).json(), [])
+
+
+class CategoryFilterTests(APITestCase):
+
+    def test_slug_or_legacy_label(self):
+        darslik = Category.objects.get(slug='darslik')
+        book = make_book(category=darslik)
+        make_book()
+        for value in ('darslik', 'Darslik', 'Дарслик'):
+            response = self.client.get(reverse('book-list'), {'category': value})
+            self.assertEqual([row['id'] for row in response.json()], [book.pk], value)
+        self.assertEqual(self.client.get(reverse('book-list'), {'category': 'yoq'}).json(), [])
+
+
+class CategoryMigrationTests(TransactionTestCase):
+    """0013 turns the free-text category columns into Category rows."""
+    before = [('books', '0012_category')]
+    after = [('books', '0013_book_category_data')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_labels_in_any_script_share_a_category(self):
+        apps = self.migrate(self.before)
+        OldBook = apps.get_model('books', 'Book')
+
+        def old_book(**categories):
+            categories = {'category_uz': None, 'category_ru': None, 'category_en': None, **categories}
+            return OldBook.objects.create(title='Kitob', author='Muallif', description='', subjects='', **categories).pk
+
+        darslik = old_book(category='Darslik', category_uz='Darslik', category_ru='Учебник')
+        cyrillic = old_book(category='', category_uz='Дарслик')
+        new = old_book(category='Badiiy', category_uz='Badiiy', category_ru='Художественная')
+        everything = old_book(category='Barchasi', category_uz='Barchasi')
+        empty = old_book(category='')
+        choice = old_book(category='Ilmiy')
+
+        apps = self.migrate(self.after)
+        Book = apps.get_model('books', 'Book')
+        Category = apps.get_model('books', 'Category')
+        slugs = dict(Book.objects.values_list('pk', 'category_ref__slug'))
+        self.assertEqual(slugs[darslik], 'darslik')
+        self.assertEqual(slugs[cyrillic], 'darslik')
+        self.assertEqual(slugs[new], 'badiiy')
+        self.assertIsNone(slugs[everything])
+        self.assertIsNone(slugs[empty])
+        self.assertEqual(slugs[choice], 'ilmiy')
+        badiiy = Category.objects.get(slug='badiiy')
+        self.assertEqual((badiiy.name_uz, badiiy.name_ru, badiiy.name_en), ('Badiiy', 'Художественная', 'Badiiy'))
+        self.assertEqual(Category.objects.filter(slug='darslik').count(), 1)
+
+    def test_backwards_restores_the_labels(self):
+        apps = self.migrate(self.before)
+        OldBook = apps.get_model('books', 'Book')
+        pk = OldBook.objects.create(
+            title='Kitob', author='Muallif', description='', subjects='',
+            category='Ilmiy', category_uz='Ilmiy', category_ru=None, category_en=None,
+        ).pk
+        self.migrate(self.after)
+        apps = self.migrate(self.before)
+        book = apps.get_model('books', 'Book').objects.get(pk=pk)
+        self.assertEqual((book.category_uz, book.category_ru), ('Ilmiy adabiyot', 'Научная литература'))
+
+
+class TemporaryMediaMixin:
+    """MEDIA_ROOT (and PROTECTED_MEDIA_ROOT, PROGRESS_DIR) in a throwaway directory for the test."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.protected_root = os.path.join(self.media_root, 'protected')
+        settings = override_settings(
+            MEDIA_ROOT=self.media_root, PROTECTED_MEDIA_ROOT=self.protected_root,
+            PROGRESS_DIR=os.path.join(self.media_root, 'progress'),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class RegenerateQRCodesTests(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.books = [make_book(title=f'Kitob {n}') for n in range(5)]
+
+    def run_command(self, *args, **options):
+        call_command('regenerate_qr_codes', *args, processes=2, batch_size=2, stdout=io.StringIO(), **options)
+
+    def test_every_book_gets_a_code(self):
+        self.run_command()
+        for book in Book.objects.all():
+            self.assertEqual(book.qr_code.name, f'books/qrcodes/qr_book_{book.pk}.png')
+            with book.qr_code.open('rb') as f:
+                self.assertEqual(f.read(), qr.render_png(book.pk))
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'progress')), [])
+
+    def test_resume_continues_after_the_checkpoint(self):
+        os.makedirs(os.path.join(self.media_root, 'progress'))
+        with open(os.path.join(self.media_root, 'progress', 'regenerate_qr_codes.json'), 'w') as f:
+            json.dump({'last_pk': self.books[2].pk}, f)
+        self.run_command(resume=True)
+        done = set(Book.objects.exclude(qr_code='').exclude(qr_code=None).values_list('pk', flat=True))
+        self.assertEqual(done, {self.books[3].pk, self.books[4].pk})
+
+    def test_resume_without_a_checkpoint_fails(self):
+        with self.assertRaisesMessage(CommandError, 'No progress file'):
+            self.run_command(resume=True)
+
+    def test_dry_run_writes_nothing(self):
+        self.run_command(dry_run=True)
+        self.assertFalse(Book.objects.exclude(qr_code='').exclude(qr_code=None).exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'books')))
+
+
+class BookQRCodeViewTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.book = make_book()
+
+    def url(self, fmt='svg', pk=None):
+        return reverse('book-qr', kwargs={'pk': pk or self.book.pk, 'fmt': fmt})
+
+    def test_svg_and_png(self):
+        response = self.client.get(self.url())
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertIn(b'<svg', response.content)
+        self.assertIn('max-age=604800', response['Cache-Control'])
+        response = self.client.get(self.url('png'), {'size': 300})
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response.content, qr.render_png(self.book.pk, 300))
+
+    def test_revalidation_skips_the_database(self):
+        etag = self.client.get(self.url())['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get(self.url('png'))['ETag'], etag)
+
+    def test_code_follows_the_public_url(self):
+        etag = self.client.get(self.url())['ETag']
+        with self.settings(BOOK_PUBLIC_URL='https://kutubxona.samduuf.uz/kitob/{id}'):
+            response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_sizes_are_clamped_or_rejected(self):
+        self.assertEqual(
+            self.client.get(self.url('png'), {'size': 10 ** 6}).content, qr.render_png(self.book.pk, 2048)
+        )
+        self.assertEqual(self.client.get(self.url('png'), {'size': 'katta'}).status_code, 400)
+
+    def test_unknown_book_is_404(self):
+        self.assertEqual(self.client.get(self.url(pk=10 ** 6)).status_code, 404)
+
+
+def image_file(name='muqova.png', size=(1000, 1500), color='navy'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+class CoverVariantTests(TemporaryMediaMixin, APITestCase):
+
+    def make_book(self, cover):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_book(cover_image=cover)
+
+    def test_upload_queues_variants_and_the_api_lists_them(self):
+        book = self.make_book(image_file())
+        self.assertEqual(Job.objects.get().args, [book.pk])
+        build_cover_variants(book.pk)
+        book.refresh_from_db()
+
+        variants = book.cover_variants
+        self.assertEqual(variants['source'], book.cover_image.name)
+        self.assertEqual(sorted(variants['webp'], key=int), ['160', '320', '640', '960'])
+        with default_storage.open(variants['webp']['320']) as f:
+            self.assertEqual(Image.open(f).size, (320, 480))
+
+        srcset = self.client.get(reverse('book-list')).json()[0]['cover_srcset']
+        self.assertIn('__320w.webp 320w', srcset['webp'])
+        self.assertTrue(srcset['jpeg'].endswith(' 1000w'))
+
+    def test_small_cover_is_never_upscaled(self):
+        book = self.make_book(image_file(size=(200, 300)))
+        build_cover_variants(book.pk)
+        book.refresh_from_db()
+        self.assertEqual(list(book.cover_variants['webp']), ['160'])
+
+    def test_replaced_cover_drops_stale_variants(self):
+        book = self.make_book(image_file())
+        build_cover_variants(book.pk)
+        book.refresh_from_db()
+        old = book.cover_variants['webp']['160']
+
+        book.cover_image = image_file('yangi.png', color='red')
+        with self.captureOnCommitCallbacks(execute=True):
+            book.save()
+        self.assertIsNone(self.client.get(reverse('book-detail', args=[book.pk])).json()['cover_srcset'])
+        build_cover_variants(book.pk)
+        self.assertFalse(default_storage.exists(old))
+
+    def test_broken_image_fails_the_job(self):
+        book = self.make_book(SimpleUploadedFile('buzuq.png', b'rasm emas'))
+        with self.assertRaises(UnidentifiedImageError):
+            build_cover_variants(book.pk)
+        book.refresh_from_db()
+        self.assertEqual(book.cover_variants, {})
+
+
+class BookFileTests(TemporaryMediaMixin, APITestCase):
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.book = make_book(title='Kitob', file=SimpleUploadedFile('kitob.pdf', self.content))
+        self.url = reverse('book-file', args=[self.book.pk])
+        self.user = User.objects.create_user('oquvchi', password='parol')
+
+    def get(self, url=None, **headers):
+        self.client.force_authenticate(self.user)
+        return self.client.get(url or self.url, **headers)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_files_are_stored_outside_media_root(self):
+        self.assertTrue(self.book.file.name.startswith('files/'))
+        self.assertTrue(os.path.isfile(os.path.join(self.protected_root, self.book.file.name)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.book.file.name)))
+        self.assertEqual(Blob.objects.get(name=self.book.file.name).refcount, 1)
+
+    def test_anonymous_readers_need_a_signed_link(self):
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.assertEqual(self.client.get(self.url, {'token': 'soxta'}).status_code, 401)
+
+        link = self.get(reverse('book-file-link', args=[self.book.pk])).json()['url']
+        self.client.force_authenticate(None)
+        response = self.client.get(link)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+
+        other = make_book(file=SimpleUploadedFile('boshqa.pdf', b'%PDF'))
+        token = parse_qs(urlsplit(link).query)['token'][0]
+        self.assertEqual(self.client.get(reverse('book-file', args=[other.pk]), {'token': token}).status_code, 401)
+
+    def test_ranges(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(self.body(response), self.content[10:20])
+
+        response = self.get(HTTP_RANGE='bytes=-4')
+        self.assertEqual(self.body(response), self.content[-4:])
+
+        response = self.get(HTTP_RANGE='bytes=0-1,100-101')
+        self.assertEqual(response.status_code, 206)
+        body = self.body(response)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(f'Content-Range: bytes 100-101/{len(self.content)}'.encode(), body)
+        self.assertIn(b'\r\n' + self.content[100:102] + b'\r\n--', body)
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag).status_code, 206)
+        response = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"eskisi"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+
+    def test_unsatisfiable_range(self):
+        response = self.get(HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_missing_file_is_not_found(self):
+        os.remove(self.book.file.path)
+        self.assertEqual(self.get().status_code, 404)
+        self.assertEqual(self.get(reverse('book-file', args=[self.book.pk + 1])).status_code, 404)
+
+    def test_title_with_line_breaks_is_a_safe_filename(self):
+        Book.objects.filter(pk=self.book.pk).update(title='Birinchi\r\nSet-Cookie: x=1 "Ōtkan"')
+        response = self.get(self.url + '?download=1')
+        self.assertEqual(response.status_code, 200)
+        disposition = response['Content-Disposition']
+        self.assertNotIn('\r', disposition)
+        self.assertNotIn('\n', disposition)
+        self.assertTrue(disposition.startswith('attachment; filename="BirinchiSet-Cookie: x=1 tkan.pdf"'))
+        self.assertIn("filename*=UTF-8''BirinchiSet-Cookie%3A%20x%3D1%20%22%C5%8Ctkan%22.pdf", disposition)
+
+    @override_settings(PROTECTED_MEDIA_OFFLOAD='x-accel', PROTECTED_MEDIA_PREFIX='/protected-media/')
+    def test_offload_names_the_protected_file(self):
+        response = self.get()
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.book.file.name}')
+        self.assertEqual(response.content, b'')
+
+
+class BookFileMigrationTests(TemporaryMediaMixin, TransactionTestCase):
+    """0018 moves book files out of MEDIA_ROOT."""
+    before = [('books', '0017_remove_book_resource_type')]
+    after = [('books', '0018_book_file_protected')]
+    migrate = CategoryMigrationTests.migrate
+    tearDown = CategoryMigrationTests.tearDown
+
+    def write(self, root, name, content=b'%PDF'):
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+    def test_files_move_and_blobs_follow(self):
+        apps = self.migrate(self.before)
+        OldBook = apps.get_model('books', 'Book')
+        OldBlob = apps.get_model('uploads', 'Blob')
+        own, shared, legacy = 'blobs/aa/bb/aabb.pdf', 'blobs/cc/dd/ccdd.pdf', 'books/files/eski.pdf'
+        for name in (own, shared, legacy):
+            self.write(self.media_root, name)
+        OldBlob.objects.create(name=own, sha256='aabb', size=4, refcount=2)
+        # Also the cover of another book
+        OldBlob.objects.create(name=shared, sha256='ccdd', size=4, refcount=2)
+
+        def old_book(**fields):
+            return OldBook.objects.create(title='Kitob', author='Muallif', description='', subjects='', **fields).pk
+
+        first, second = old_book(file=own), old_book(file=own)
+        cover = old_book(file=shared, cover_image=shared)
+        old = old_book(file=legacy)
+
+        self.migrate(self.after)
+        files = dict(Book.objects.values_list('pk', 'file'))
+        self.assertEqual(files[first], 'files/aa/bb/aabb.pdf')
+        self.assertEqual(files[second], 'files/aa/bb/aabb.pdf')
+        self.assertEqual(files[cover], 'files/cc/dd/ccdd.pdf')
+        self.assertEqual(files[old], legacy)
+        self.assertEqual(Book.objects.get(pk=cover).cover_image.name, shared)
+
+        for name in ('files/aa/bb/aabb.pdf', 'files/cc/dd/ccdd.pdf', legacy):
+            self.assertTrue(os.path.isfile(os.path.join(self.protected_root, name)), name)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, own)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, legacy)))
+        self.assertTrue(os.path.isfile(os.path.join(self.media_root, shared)))
+        self.assertEqual(dict(Blob.objects.values_list('name', 'refcount')), {
+            'files/aa/bb/aabb.pdf': 2, 'files/cc/dd/ccdd.pdf': 1, shared: 1,
+        })
+
+        self.migrate(self.before)
+        self.assertEqual(set(OldBook.objects.values_list('file', flat=True)), {own, shared, legacy})
+        self.assertTrue(os.path.isfile(os.path.join(self.media_root, own)))
+        self.assertFalse(os.path.exists(os.path.join(self.protected_root, 'files/aa/bb/aabb.pdf')))
+        self.assertEqual(dict(OldBlob.objects.values_list('name', 'refcount')), {own: 2, shared: 2})
+
+
+class ImportBooksTests(TemporaryMediaMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.source = os.path.join(self.media_root, 'katalog.csv')
+        self.rows = [
+            {'title': f'Kitob {n}', 'author': 'Muallif', 'category': 'Tarix', 'cover': '', 'file': ''}
+            for n in range(5)
+        ]
+
+    def write_source(self, rows):
+        with open(self.source, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def run_command(self, **options):
+        output, errors = io.StringIO(), io.StringIO()
+        call_command(
+            'import_books', self.source, batch_size=2, processes=1, create_categories=True,
+            stdout=output, stderr=errors, **options,
+        )
+        return output.getvalue(), errors.getvalue()
+
+    def test_rows_and_media_are_imported(self):
+        Image.new('RGB', (400, 600), 'navy').save(os.path.join(self.media_root, 'muqova.png'))
+        with open(os.path.join(self.media_root, 'kitob.pdf'), 'wb') as f:
+            f.write(b'%PDF')
+        self.rows[0].update(cover='muqova.png', file='kitob.pdf')
+        self.write_source(self.rows)
+        output, errors = self.run_command()
+        self.assertEqual(errors, '')
+
+        self.assertIn('Imported 5 books', output)
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list('title', 'category__slug')),
+            [(f'Kitob {n}', 'tarix') for n in range(5)],
+        )
+        book = Book.objects.order_by('pk').first()
+        self.assertTrue(book.cover_image.name.startswith('blobs/'))
+        self.assertEqual(list(book.cover_variants['webp']), ['160', '320'])
+        with book.file.open('rb') as f:
+            self.assertEqual(f.read(), b'%PDF')
+        self.assertEqual(stats.get_stats().total_books, 5)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'progress')), [])
+
+    def test_bad_rows_are_skipped(self):
+        self.rows[1]['author'] = ''
+        self.rows[2]['category'] = ''
+        self.write_source(self.rows + [{'title': 'X', 'author': 'Y', 'category': '', 'cover': '', 'file': ''}])
+        with self.assertRaisesMessage(CommandError, 'Unknown category: yoq'):
+            self.run_command(category='yoq')
+        _, errors = self.run_command(skip_media=True)
+        self.assertIn("row 2: author bo'sh", errors)
+        self.assertEqual(Book.objects.count(), 5)
+
+    def test_dry_run_writes_nothing(self):
+        self.write_source(self.rows)
+        output, errors = self.run_command(dry_run=True)
+        self.assertIn('Validated 5 of 5 rows', output)
+        self.assertEqual(errors, '')
+        self.assertFalse(Category.objects.filter(slug='tarix').exists())
+        self.assertFalse(Book.objects.exists())
+        self.assertFalse(ImportCheckpoint.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, 'progress')))
+
+    def test_resume_after_a_failed_batch_inserts_nothing_twice(self):
+        self.write_source(self.rows)
+        update_many = book_index.update_many
+        calls = []
+
+        def fail_second_batch(books):
+            calls.append(len(books))
+            if len(calls) == 2:
+                raise ConnectionError('uzildi')
+            update_many(books)
+
+        with mock.patch.object(book_index, 'update_many', side_effect=fail_second_batch):
+            with self.assertRaises(ConnectionError):
+                self.run_command(skip_media=True)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get().rows, 2)
+
+        output, _ = self.run_command(resume=True, skip_media=True)
+        self.assertIn('Resuming after row 2', output)
+        self.assertEqual(sorted(Book.objects.values_list('title', flat=True)), [f'Kitob {n}' for n in range(5)])
+
+    def test_media_of_an_uncommitted_batch_is_dropped_on_resume(self):
+        with open(os.path.join(self.media_root, 'kitob.pdf'), 'wb') as f:
+            f.write(b'%PDF')
+        for row in self.rows:
+            row['file'] = 'kitob.pdf'
+        self.write_source(self.rows)
+        save = ImportCheckpoint.save
+        calls = []
+
+        def fail_second_batch(checkpoint, *args, **kwargs):
+            calls.append(checkpoint.rows)
+            if len(calls) == 3:
+                # The batch's media lines are on disk, its rows roll back
+                raise ConnectionError('uzildi')
+            save(checkpoint, *args, **kwargs)
+
+        with mock.patch.object(ImportCheckpoint, 'save', autospec=True, side_effect=fail_second_batch):
+            with self.assertRaises(ConnectionError):
+                self.run_command()
+        checkpoint = ImportCheckpoint.objects.get()
+        self.assertEqual((checkpoint.rows, checkpoint.media_lines), (2, 2))
+
+        self.run_command(resume=True)
+        self.assertEqual(Book.objects.count(), 5)
+        self.assertEqual(Book.objects.exclude(file='').exclude(file=None).count(), 5)
+
+    def test_resume_without_a_checkpoint_fails(self):
+        self.write_source(self.rows)
+        with self.assertRaisesMessage(CommandError, 'No interrupted import'):
+            self.run_command(resume=True)
+
+    def test_an_export_imports_again(self):
+        make_book(title='=1+1', author='@muallif', category=Category.objects.create(name='Tarix', slug='tarix'))
+        call_command('export_catalog', 'books', output=self.source, stderr=io.StringIO())
+        Book.objects.all().delete()
+        self.run_command(skip_media=True)
+        book = Book.objects.get()
+        self.assertEqual((book.title, book.author, book.category.slug), ('=1+1', '@muallif', 'tarix'))
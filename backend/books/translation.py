@@ -1,6 +1,10 @@
 from modeltranslation.translator import register, TranslationOptions
-from .models import Book
+from .models import Book, Category
+
+@register(Category)
+class CategoryTranslationOptions(TranslationOptions):
+    fields = ('name',)
 
 @register(Book)
 class BookTranslationOptions(TranslationOptions):
-    fields = ('title', 'description', 'author', 'category', 'subjects')
+    fields = ('title', 'description', 'author', 'subjects')
@@ -1,6 +1,9 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookViewSet, LibraryStatsView, PopularBooksView, AdminDashboardStatsView
+from .views import (
+    BookViewSet, LibraryStatsView, PopularBooksView, AdminDashboardStatsView, BookQRCodeView,
+    BookFileView, BookFileLinkView,
+)
 
 router = DefaultRouter()
 router.register(r'books', BookViewSet)
@@ -9,5 +12,8 @@ urlpatterns = [
     path('books/stats/', LibraryStatsView.as_view(), name='library-stats'),
     path('books/admin/stats/', AdminDashboardStatsView.as_view(), name='admin-stats'),
     path('books/popular/', PopularBooksView.as_view(), name='popular-books'),
+    re_path(r'^books/(?P<pk>\d+)/qr\.(?P<fmt>svg|png)$', BookQRCodeView.as_view(), name='book-qr'),
+    path('books/<int:pk>/file/', BookFileView.as_view(), name='book-file'),
+    path('books/<int:pk>/file/link/', BookFileLinkView.as_view(), name='book-file-link'),
     path('', include(router.urls)),
 ]
@@ -1,53 +1,78 @@
+import os
+
+from django.conf import settings
+from django.core import signing
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from rest_framework import viewsets
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from django.contrib.auth.models import User
-from django.utils import timezone
-from .models import Book
-from .serializers import BookSerializer
-import datetime
-from django.db.models import Count
-
-class BookViewSet(viewsets.ModelViewSet):
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from .models import Book, Category, category_slug
+from .serializers import BookSerializer, BookListSerializer
+from .search import book_index
+from . import stats as library_stats
+from . import qr
+from core.cache import TaggedResponseCacheMixin
+from core.conditional import ConditionalGetMixin, make_etag
+from core.downloads import file_response
+from core.pagination import BookPagination
+from core.search import FullTextSearchFilter
+
+def filter_by_category(queryset, value):
+    """
+    ``?category=`` as one equality on the indexed FK. Accepts the slug or the
+    label clients used before categories had slugs (``?category=Darslik``).
+    """
+    category_id = Category.objects.filter(slug=category_slug(value)).values_list('pk', flat=True).first()
+    if category_id is None:
+        return queryset.none()
+    return queryset.filter(category_id=category_id)
+
+
+class BookViewSet(TaggedResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    pagination_class = BookPagination
+    filter_backends = [FullTextSearchFilter]
+    search_index = book_index
+
+    def get_cache_tags(self, request, *args, **kwargs):
+        if 'pk' in kwargs:
+            return [f"book:{kwargs['pk']}"]
+        return ['books:list']
 
     def get_queryset(self):
-        queryset = Book.objects.all()
+        queryset = Book.objects.select_related('category')
         category = self.request.query_params.get('category')
         if category:
-            from django.db.models import Q
-            queryset = queryset.filter(
-                Q(category_uz=category) | 
-                Q(category_ru=category) | 
-                Q(category_en=category)
-            )
+            queryset = filter_by_category(queryset, category)
         return queryset
 
-class LibraryStatsView(APIView):
+    def get_serializer_class(self):
+        # Lists get the compact card shape unless the client picks fields itself
+        if self.action == 'list' and 'fields' not in self.request.query_params:
+            return BookListSerializer
+        return BookSerializer
+
+class LibraryStatsView(TaggedResponseCacheMixin, APIView):
     permission_classes = [AllowAny]
+    cache_tags = ['stats']
 
     def get(self, request):
-        total_books = Book.objects.count()
-        # Count distinct categories actually in use
-        categories = Book.objects.values('category').distinct().count()
-        # Ensure at least non-zero if we have books but no categories set (default is 'Badiiy')
-        if total_books > 0 and categories == 0:
+        # Single-row read; kept current by books.signals (see books.stats)
+        stats = library_stats.get_stats()
+        categories = len(stats.categories)
+        # Ensure at least non-zero if we have books but no categories set
+        if stats.total_books > 0 and categories == 0:
             categories = 1
-            
-        users = User.objects.count()
-        
-        # New books in last 30 days
-        month_ago = timezone.now() - datetime.timedelta(days=30)
-        new_books = Book.objects.filter(created_at__gte=month_ago).count()
-        new_books = Book.objects.filter(created_at__gte=month_ago).count()
-        
+
         return Response({
-            "totalBooks": total_books,
+            "totalBooks": stats.total_books,
             "categories": categories,
-            "users": users,
-            "newBooks": new_books
+            "users": stats.total_users,
+            "newBooks": stats.new_books_30d
         })
 
 from rest_framework.permissions import IsAdminUser
@@ -55,26 +80,118 @@ class AdminDashboardStatsView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        total_books = Book.objects.count()
-        total_users = User.objects.count()
-        new_users_today = User.objects.filter(date_joined__date=timezone.now().date()).count()
-        
-        # Books by category distribution
-        category_stats = Book.objects.values('category').annotate(count=Count('id')).order_by('-count')
-        
+        stats = library_stats.get_stats()
+
+        # Books by category distribution (stats are keyed by category id)
+        names = {str(category.pk): category.name for category in Category.objects.all()}
+        category_stats = [
+            {'category': names.get(category, category), 'count': count}
+            for category, count in sorted(stats.categories.items(), key=lambda item: -item[1])
+        ]
+
         return Response({
-            "totalBooks": total_books,
-            "totalUsers": total_users,
-            "newUsersToday": new_users_today,
+            "totalBooks": stats.total_books,
+            "totalUsers": stats.total_users,
+            "newUsersToday": stats.new_users_today,
             "categoryStats": category_stats
         })
 
 
-class PopularBooksView(APIView):
+class PopularBooksView(TaggedResponseCacheMixin, APIView):
     permission_classes = [AllowAny]
+    cache_tags = ['books:popular']
 
     def get(self, request):
-        # Top 6 books by favorite count
-        books = Book.objects.annotate(like_count=Count('favorited_by')).order_by('-like_count')[:6]
-        serializer = BookSerializer(books, many=True, context={'request': request})
+        # Top 6 books by favorite count: an index scan on the denormalized counter
+        books = Book.objects.select_related('category')
+        category = request.query_params.get('category')
+        if category:
+            books = filter_by_category(books, category)
+        books = books.order_by('-favorite_count', '-created_at')[:6]
+        serializer_class = BookSerializer if 'fields' in request.query_params else BookListSerializer
+        serializer = serializer_class(books, many=True, context={'request': request})
         return Response(serializer.data)
+
+
+class BookQRCodeView(APIView):
+    """
+    ``/api/books/<id>/qr.svg`` and ``qr.png?size=``, rendered on demand.
+
+    The image depends only on the book id and BOOK_PUBLIC_URL, so the ETag is
+    derived from those and a revalidation is answered before touching the DB.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    max_age = 7 * 24 * 60 * 60
+    min_size, max_size = 64, 2048
+    content_types = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+    def get(self, request, pk, fmt):
+        size = None
+        if fmt == 'png' and request.query_params.get('size'):
+            try:
+                size = min(max(int(request.query_params['size']), self.min_size), self.max_size)
+            except ValueError:
+                return Response({'error': "size butun son bo'lishi kerak"}, status=400)
+
+        url = qr.book_url(pk)
+        etag = make_etag('qr', url, fmt, size)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            if not Book.objects.filter(pk=pk).exists():
+                raise Http404
+            content = qr.render_svg(pk) if fmt == 'svg' else qr.render_png(pk, size)
+            response = HttpResponse(content, content_type=self.content_types[fmt])
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=self.max_age)
+        return response
+
+
+download_signer = signing.TimestampSigner(salt='books.file')
+
+
+class BookFileView(APIView):
+    """
+    ``/api/books/<id>/file/``: the book's PDF/EPUB, with Range support.
+
+    Readers are either authenticated (token/session) or carry the ``?token=``
+    of a link from BookFileLinkView, since a new tab or an embedded PDF viewer
+    cannot send the Authorization header. ``?download=1`` asks for an
+    attachment instead of inline display.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, pk):
+        if not request.user.is_authenticated and not self.has_valid_token(request, pk):
+            return Response({'error': "Yuklab olish uchun tizimga kiring"}, status=401)
+        book = Book.objects.filter(pk=pk).only('pk', 'file', 'title').first()
+        if book is None or not book.file:
+            raise Http404
+        # Stored files are named by their digest; readers save them under the title
+        filename = f"{book.title or 'kitob'}{os.path.splitext(book.file.name)[1]}"
+        try:
+            return file_response(
+                request, book.file.path, relative_name=book.file.name, filename=filename,
+                as_attachment=request.query_params.get('download') == '1',
+            )
+        except FileNotFoundError:
+            raise Http404
+
+    def has_valid_token(self, request, pk):
+        try:
+            value = download_signer.unsign(request.query_params.get('token', ''), max_age=settings.DOWNLOAD_LINK_MAX_AGE)
+        except signing.BadSignature:
+            return False
+        return value.split(':')[0] == str(pk)
+
+
+class BookFileLinkView(APIView):
+    """Short-lived signed URL of the book file for the current user."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        if not Book.objects.filter(pk=pk).exclude(file='').exists():
+            raise Http404
+        token = download_signer.sign(f'{pk}:{request.user.pk}')
+        url = request.build_absolute_uri(f"{reverse('book-file', kwargs={'pk': pk})}?token={token}")
+        return Response({'url': url, 'expires_in': settings.DOWNLOAD_LINK_MAX_AGE})
@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import get_conditional_response
+
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Cache-Control', 'Content-Language', 'Vary')
+STAT_EVENTS = ('hits', 'misses', 'stores', 'invalidations')
+
+
+def response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _tag_key(tag):
+    return f'response-cache:tag:{tag}'
+
+
+def tag_versions(tags):
+    """
+    Current version token of each tag. A missing tag gets a fresh token, never
+    a reused one, so an evicted tag can not resurrect entries stored under it.
+    """
+    cache = response_cache()
+    keys = {tag: _tag_key(tag) for tag in tags}
+    found = cache.get_many(keys.values())
+    versions = []
+    for tag, key in keys.items():
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        versions.append(found[key])
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Drop every cached response tagged with any of ``tags`` once the transaction commits."""
+    def bump():
+        cache = response_cache()
+        cache.set_many({_tag_key(tag): time.time_ns() for tag in tags}, None)
+        count('invalidations', len(tags))
+    transaction.on_commit(bump)
+
+
+class StatsCounter:
+    """
+    Hit/miss counters of this process, added to the shared totals in the
+    response cache at most every ``RESPONSE_CACHE_STATS_INTERVAL`` seconds
+    instead of one cache write per request.
+    """
+
+    def __init__(self):
+        self.pending = Counter()
+        self.lock = threading.Lock()
+        self.flushed_at = time.monotonic()
+
+    def add(self, event, amount=1):
+        interval = getattr(settings, 'RESPONSE_CACHE_STATS_INTERVAL', 10)
+        with self.lock:
+            self.pending[event] += amount
+            if time.monotonic() - self.flushed_at < interval:
+                return
+        self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.flushed_at = time.monotonic()
+        cache = response_cache()
+        for event, amount in pending.items():
+            key = f'response-cache:stats:{event}'
+            if not cache.add(key, amount, None):
+                try:
+                    cache.incr(key, amount)
+                except ValueError:
+                    cache.set(key, amount, None)
+
+
+stats_counter = StatsCounter()
+
+
+def count(event, amount=1):
+    stats_counter.add(event, amount)
+
+
+def cache_stats():
+    """Totals of all processes; the others' last ``RESPONSE_CACHE_STATS_INTERVAL`` is not in yet."""
+    stats_counter.flush()
+    cache = response_cache()
+    values = cache.get_many([f'response-cache:stats:{event}' for event in STAT_EVENTS])
+    stats = {event: values.get(f'response-cache:stats:{event}', 0) for event in STAT_EVENTS}
+    lookups = stats['hits'] + stats['misses']
+    stats['hitRatio'] = round(stats['hits'] / lookups, 4) if lookups else None
+    return stats
+
+
+class TaggedResponseCacheMixin:
+    """
+    Caches rendered GET responses for anonymous visitors.
+
+    The key covers the path, query string, active language and Accept header,
+    plus the current version of every tag from ``get_cache_tags``. Signals call
+    ``invalidate_tags`` when the underlying rows change, which moves the tag to
+    a new version and so orphans exactly the entries built from it.
+    """
+    cache_tags = ()
+    cache_timeout = 300
+
+    def get_cache_tags(self, request, *args, **kwargs):
+        return self.cache_tags
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = response_cache()
+        tags = list(self.get_cache_tags(request, *args, **kwargs))
+        key = self.get_cache_key(request, tags)
+        cached = cache.get(key)
+        if cached is not None:
+            count('hits')
+            return self.restore(request, cached)
+
+        count('misses')
+        response = super().dispatch(request, *args, **kwargs)
+        # DRF may still have authenticated the request (e.g. a session it accepts)
+        authenticated = getattr(getattr(self, 'request', None), 'user', None)
+        if authenticated is not None and authenticated.is_authenticated:
+            return response
+        if response.status_code == 200 and not response.streaming:
+            def store(rendered):
+                headers = {name: rendered[name] for name in CACHED_HEADERS if rendered.has_header(name)}
+                cache.set(key, (rendered.content, rendered['Content-Type'], headers), self.cache_timeout)
+                count('stores')
+            if hasattr(response, 'add_post_render_callback'):
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def is_cacheable(self, request):
+        # Token clients never show up on request.user before DRF runs, so check the header too
+        return (
+            request.method in ('GET', 'HEAD')
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and not request.user.is_authenticated
+        )
+
+    def get_cache_key(self, request, tags):
+        parts = [
+            request.path,
+            sorted(request.GET.lists()),
+            translation.get_language(),
+            request.META.get('HTTP_ACCEPT', ''),
+            tag_versions(tags),
+        ]
+        digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+        return f'response-cache:{type(self).__name__}:{digest}'
+
+    def restore(self, request, cached):
+        content, content_type, headers = cached
+        etag = headers.get('ETag')
+        response = etag and get_conditional_response(request, etag=etag)
+        if not response:
+            response = HttpResponse(content, content_type=content_type)
+        for name, value in headers.items():
+            response[name] = value
+        response['X-Cache'] = 'HIT'
+        return response
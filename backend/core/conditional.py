@@ -0,0 +1,74 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import translation
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.sha1(repr(parts).encode()).hexdigest())
+
+
+def request_variant(request):
+    """Everything besides the rows that changes the body: query, language and staff projection."""
+    params = sorted(
+        (key, value) for key, values in request.query_params.lists() for value in values
+    )
+    return params, translation.get_language(), bool(getattr(request.user, 'is_staff', False))
+
+
+def not_modified(request, etag, last_modified=None):
+    """The 304 (or 412) response for a satisfied precondition, else ``None``."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Clients and the proxy may store it, but must revalidate every time
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified for ``list`` and ``retrieve``.
+
+    A collection's validator is derived from ``max(updated_at)``, the row
+    count and the request variant, i.e. one aggregate query; if the client
+    already holds that version it gets a 304 before anything is serialized.
+    """
+    updated_field = 'updated_at'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        state = queryset.order_by().aggregate(latest=Max(self.updated_field), count=Count('pk'))
+        etag = make_etag(
+            queryset.model._meta.label, 'list', state['latest'], state['count'], *request_variant(request)
+        )
+
+        response = not_modified(request, etag, state['latest'])
+        if response is not None:
+            return response
+        response = super().list(request, *args, **kwargs)
+        return set_validators(response, etag, state['latest'])
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        latest = getattr(instance, self.updated_field)
+        etag = make_etag(instance._meta.label, instance.pk, latest, *request_variant(request))
+
+        response = not_modified(request, etag, latest)
+        if response is not None:
+            return response
+        serializer = self.get_serializer(instance)
+        return set_validators(Response(serializer.data), etag, latest)
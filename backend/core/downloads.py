@@ -0,0 +1,173 @@
+"""
+File responses with HTTP ``Range`` support and optional proxy offload.
+
+Whole files go out through ``FileResponse``, which the WSGI server can pass
+to ``sendfile()``. A single range is streamed from an offset, several ranges
+as ``multipart/byteranges``. With ``settings.PROTECTED_MEDIA_OFFLOAD`` set,
+the response only names the file (``X-Accel-Redirect`` for nginx,
+``X-Sendfile`` for Apache/lighttpd) and the proxy does the transfer,
+including ranges, without Python reading a byte.
+"""
+import mimetypes
+import os
+import re
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .conditional import make_etag
+
+RANGE_RE = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+# Control characters (CR/LF above all) cannot go into a header
+CONTROL_RE = re.compile(r'[\x00-\x1f\x7f]')
+CHUNK_SIZE = 64 * 1024
+# More ranges than this is a scan, not a reader: answer with the whole file
+MAX_RANGES = 16
+
+
+def parse_range(header, size):
+    """
+    ``[(start, end), ...]`` (inclusive, sorted, merged) for a ``bytes=`` header;
+    ``None`` to ignore the header; ``[]`` when no range is satisfiable.
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    ranges = []
+    for spec in header[len('bytes='):].split(','):
+        match = RANGE_RE.match(spec)
+        if not match or match.groups() == ('', ''):
+            return None
+        first, last = match.groups()
+        if first == '':
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+            if last and int(last) < start:
+                return None
+            if start >= size:
+                continue
+        ranges.append((start, end))
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def read_range(f, start, end):
+    f.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = f.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def stream_range(path, start, end):
+    # The response closes this generator, which closes the file
+    with open(path, 'rb') as f:
+        yield from read_range(f, start, end)
+
+
+def content_disposition(filename, as_attachment):
+    kind = 'attachment' if as_attachment else 'inline'
+    filename = CONTROL_RE.sub('', filename).strip() or 'download'
+    ascii_name = filename.encode('ascii', 'ignore').decode().replace('"', '').replace('\\', '') or 'download'
+    return f"{kind}; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def offload_response(path, relative_name, content_type):
+    mode = getattr(settings, 'PROTECTED_MEDIA_OFFLOAD', '')
+    response = HttpResponse(content_type=content_type)
+    if mode == 'x-accel':
+        # nginx: an `internal` location serving PROTECTED_MEDIA_ROOT under this prefix
+        response['X-Accel-Redirect'] = quote(settings.PROTECTED_MEDIA_PREFIX + relative_name)
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def file_response(request, path, relative_name=None, filename=None, as_attachment=False):
+    """Serve ``path`` honouring Range, If-Range and conditional GET."""
+    stat = os.stat(path)
+    size = stat.st_size
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    filename = filename or os.path.basename(path)
+    etag = make_etag(path, size, stat.st_mtime_ns)
+
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None and getattr(settings, 'PROTECTED_MEDIA_OFFLOAD', '') and relative_name:
+        response = offload_response(path, relative_name, content_type)
+    if response is None:
+        ranges = parse_range(request.META.get('HTTP_RANGE'), size)
+        if ranges is not None and not if_range_matches(request, etag, stat.st_mtime):
+            ranges = None
+        if ranges is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        elif not ranges:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            response = StreamingHttpResponse(stream_range(path, start, end), status=206, content_type=content_type)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = end - start + 1
+        else:
+            response = multipart_response(path, ranges, size, content_type)
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition(filename, as_attachment)
+    return response
+
+
+def if_range_matches(request, etag, mtime):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def multipart_response(path, ranges, size, content_type):
+    boundary = uuid.uuid4().hex
+    headers = [
+        (f'--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: bytes {start}-{end}/{size}\r\n\r\n'
+         .encode(), start, end)
+        for start, end in ranges
+    ]
+    closing = f'\r\n--{boundary}--\r\n'.encode()
+    length = sum(len(head) + end - start + 1 for head, start, end in headers)
+    length += 2 * (len(headers) - 1) + len(closing)
+
+    def body():
+        with open(path, 'rb') as f:
+            for index, (head, start, end) in enumerate(headers):
+                yield (b'\r\n' if index else b'') + head
+                yield from read_range(f, start, end)
+            yield closing
+
+    response = StreamingHttpResponse(
+        body(), status=206, content_type=f'multipart/byteranges; boundary={boundary}'
+    )
+    response['Content-Length'] = length
+    return response
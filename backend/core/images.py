@@ -0,0 +1,104 @@
+"""
+Resized WebP/JPEG copies of uploaded images, written next to the original.
+
+``build_variants`` renders every configured width below the original's and
+returns the manifest stored on the model (``Book.cover_variants``,
+``News.image_variants``)::
+
+    {'source': 'books/covers/a.jpg', 'width': 1600,
+     'webp': {'320': 'books/covers/a__320w.webp', ...}, 'jpeg': {...}}
+
+``srcset`` turns a manifest into ``{'webp': 'url 320w, ...', 'jpeg': ...}``
+for ``<picture>``/``<img srcset>``. A manifest whose ``source`` is not the
+current file is stale (the image was replaced) and is ignored until the
+background job rebuilds it.
+
+Variants always go to the default storage, even when the original lives in
+the content-addressed one: they belong to a single manifest and are deleted
+with it, so they must never be shared.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def variant_widths():
+    return getattr(settings, 'IMAGE_VARIANT_WIDTHS', (160, 320, 640, 960))
+
+
+def variant_name(name, width, fmt):
+    stem, _ = os.path.splitext(name)
+    return f"{stem}__{width}w.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def _encode(image, fmt):
+    options = dict(FORMATS[fmt])
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha: flatten transparent PNGs onto white
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def build_variants(field_file):
+    """Render and store the variants of ``field_file``; returns the manifest."""
+    with field_file.storage.open(field_file.name, 'rb') as f:
+        original = Image.open(f)
+        original = ImageOps.exif_transpose(original)
+        original = original.convert('RGBA' if 'A' in original.getbands() or 'transparency' in original.info else 'RGB')
+
+    manifest = {'source': field_file.name, 'width': original.width}
+    for fmt in FORMATS:
+        manifest[fmt] = {}
+    for width in sorted(variant_widths()):
+        if width >= original.width:
+            break  # never upscale; the original covers the largest slot
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.LANCZOS)
+        for fmt in FORMATS:
+            name = default_storage.save(variant_name(field_file.name, width, fmt), ContentFile(_encode(resized, fmt)))
+            manifest[fmt][str(width)] = name
+    return manifest
+
+
+def delete_variants(manifest):
+    for fmt in FORMATS:
+        for name in (manifest or {}).get(fmt, {}).values():
+            default_storage.delete(name)
+
+
+def is_current(field_file, manifest):
+    return bool(field_file) and bool(manifest) and manifest.get('source') == field_file.name
+
+
+def srcset(field_file, manifest, request=None):
+    """``{'webp': ..., 'jpeg': ...}`` srcset strings, or ``None`` without usable variants."""
+    if not is_current(field_file, manifest):
+        return None
+
+    def absolute(url):
+        url = request.build_absolute_uri(url) if request else url
+        return url.replace('http:', 'https:', 1) if url.startswith('http:') else url
+
+    original = f"{absolute(field_file.url)} {manifest['width']}w"
+    result = {}
+    for fmt in FORMATS:
+        entries = [
+            f"{absolute(default_storage.url(name))} {width}w"
+            for width, name in sorted(manifest.get(fmt, {}).items(), key=lambda item: int(item[0]))
+        ]
+        # The original closes every list so wide slots never get a blurry copy
+        result[fmt] = ', '.join([*entries, original])
+    return result
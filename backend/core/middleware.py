@@ -1,3 +1,7 @@
+from django.conf import settings
+from django.utils import translation
+
+
 class ForceHttpsMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -12,3 +16,22 @@ class ForceHttpsMiddleware:
         request.META['wsgi.url_scheme'] = 'https'
         
         return self.get_response(request)
+
+
+class QueryLanguageMiddleware:
+    """
+    Lets API clients pick the response language with ``?lang=ru`` instead of
+    Accept-Language. Must sit after LocaleMiddleware, which then reports the
+    chosen language in Content-Language.
+    """
+    query_param = 'lang'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        language = request.GET.get(self.query_param)
+        if language in dict(settings.LANGUAGES):
+            translation.activate(language)
+            request.LANGUAGE_CODE = language
+        return self.get_response(request)
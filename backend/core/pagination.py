@@ -0,0 +1,222 @@
+import base64
+import binascii
+import hashlib
+import json
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in keyset (seek) pagination.
+
+    Old clients that send neither ``cursor`` nor ``page_size`` keep getting the
+    plain list; endpoints without such clients set ``always = True``. Everyone
+    else gets pages fetched with a WHERE on the ordering key instead of an
+    OFFSET, so every page costs the same at any depth as long as ``ordering``
+    is backed by an index and ends with a unique field.
+
+    Search results keep the relevance order set by the search filter and are
+    paged by offset instead, since a float rank makes a poor seek key.
+    Subclasses whose search only filters set ``search_query_param = None``.
+    """
+    ordering = ('-created_at', 'id')
+    always = False
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    search_query_param = 'search'
+    count_cache_timeout = 60
+    invalid_cursor_message = "Noto'g'ri cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if not self.always and self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset, request)
+
+        cursor = self.decode_cursor(request)
+        if self.search_query_param and params.get(self.search_query_param, '').strip():
+            return self.paginate_ranked(queryset, cursor)
+        if cursor and 'v' not in cursor:
+            raise NotFound(self.invalid_cursor_message)
+
+        reverse = bool(cursor and cursor['r'])
+        ordering = self.reverse_ordering(self.ordering) if reverse else self.ordering
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self.seek_filter(queryset.model, ordering, cursor['v']))
+
+        # One extra row tells us whether there is anything beyond this page.
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.page = results
+        return results
+
+    def paginate_ranked(self, queryset, cursor):
+        self.offset = cursor.get('o', 0) if cursor else 0
+        results = list(queryset[self.offset:self.offset + self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.has_previous = self.offset > 0
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        payload = OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+        ])
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_count(self, queryset, request):
+        """Total row count, only when asked for with ``?count=1`` and cached briefly."""
+        if request.query_params.get(self.count_query_param) not in ('1', 'true'):
+            return None
+
+        ignored = (self.cursor_query_param, self.page_size_query_param, self.count_query_param)
+        params = sorted(
+            (key, value) for key, values in request.query_params.lists()
+            if key not in ignored for value in values
+        )
+        digest = hashlib.md5(json.dumps(params).encode()).hexdigest()
+        key = f"keyset-count:{queryset.model._meta.label_lower}:{digest}"
+        return cache.get_or_set(key, queryset.count, self.count_cache_timeout)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        if hasattr(self, 'offset'):
+            return self.build_offset_link(self.offset + self.page_size)
+        return self.build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if hasattr(self, 'offset'):
+            return self.build_offset_link(max(self.offset - self.page_size, 0))
+        if not self.page:
+            # Ran past the end: step back from wherever the client came from.
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.build_link(self.page[0], reverse=True)
+
+    def build_link(self, obj, reverse):
+        values = [self.dump_value(getattr(obj, name.lstrip('-'))) for name in self.ordering]
+        return replace_query_param(self.base_url, self.cursor_query_param, self.encode_cursor(values, reverse))
+
+    def build_offset_link(self, offset):
+        return replace_query_param(self.base_url, self.cursor_query_param, self.dump_cursor({'o': offset}))
+
+    # Cursor helpers
+
+    def encode_cursor(self, values, reverse):
+        return self.dump_cursor({'v': values, 'r': int(reverse)})
+
+    @staticmethod
+    def dump_cursor(payload):
+        raw = json.dumps(payload, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if 'o' in cursor:
+                return {'o': _positive_int(cursor['o'])}
+            if len(cursor['v']) != len(self.ordering):
+                raise ValueError
+            return {'v': cursor['v'], 'r': bool(cursor.get('r'))}
+        except (TypeError, KeyError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def dump_value(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def reverse_ordering(ordering):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+
+    def seek_filter(self, model, ordering, raw_values):
+        """
+        Row-value comparison ``(a, b) > (x, y)`` spelled out as
+        ``a > x OR (a = x AND b > y)`` so it works with mixed directions.
+        """
+        try:
+            values = [
+                model._meta.get_field(name.lstrip('-')).to_python(raw)
+                for name, raw in zip(ordering, raw_values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = Q()
+        equal_prefix = Q()
+        for name, value in zip(ordering, values):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition |= equal_prefix & Q(**{f'{field}__{lookup}': value})
+            equal_prefix &= Q(**{field: value})
+        return condition
+
+
+class BookPagination(KeysetPagination):
+    ordering = ('-created_at', 'id')
+
+
+class NewsPagination(KeysetPagination):
+    ordering = ('-date', 'id')
+
+
+class UserPagination(KeysetPagination):
+    # Newest accounts first; prefix search keeps this order, so it seeks too
+    ordering = ('-id',)
+    page_size = 50
+    search_query_param = None
+
+
+class FavouritePagination(KeysetPagination):
+    # Through-table rows, most recently added first
+    ordering = ('-id',)
+    always = True
+    search_query_param = None
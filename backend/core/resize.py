@@ -0,0 +1,186 @@
+"""
+Resized copies of media files for ``/media-resized/<w>x<h>/<path>``.
+
+Variants live under RESIZED_MEDIA_ROOT as ``<w>x<h>/<path>`` and are served
+from disk once rendered. Rendering a variant holds an exclusive ``flock`` on
+its lock file, so concurrent requests (threads or worker processes) for the
+same variant wait for one render instead of all doing it. Every hit bumps
+the file's access time. Each render adds its size to a running total kept
+in ``.size``; only when that total passes RESIZED_MEDIA_MAX_BYTES (or is
+unknown) does ``evict`` walk the directory, delete the least recently used
+variants and store the real total again.
+"""
+import fcntl
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+FORMATS = {
+    '.jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    '.jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+    '.png': ('PNG', {'optimize': True}),
+    '.webp': ('WEBP', {'quality': 80, 'method': 4}),
+    '.gif': ('GIF', {}),
+}
+# Evict down to this share of the cap, so a full cache does not evict on every render
+EVICT_TO = 0.9
+SIZE_FILE = '.size'
+
+
+def cache_root():
+    return str(settings.RESIZED_MEDIA_ROOT)
+
+
+def max_bytes():
+    return settings.RESIZED_MEDIA_MAX_BYTES
+
+
+def allowed_size(width, height):
+    """Each side is 0 (free) or one of RESIZED_MEDIA_SIZES, and not both free."""
+    sizes = settings.RESIZED_MEDIA_SIZES
+    return bool(width or height) and all(side == 0 or side in sizes for side in (width, height))
+
+
+def source_path(path):
+    """Absolute path of a media file, or ``None`` if it is outside MEDIA_ROOT or unsupported."""
+    root = os.path.realpath(settings.MEDIA_ROOT)
+    full = os.path.realpath(os.path.join(root, path))
+    if not full.startswith(root + os.sep) or os.path.splitext(full)[1].lower() not in FORMATS:
+        return None
+    return full if os.path.isfile(full) else None
+
+
+def variant_path(width, height, path):
+    return os.path.join(cache_root(), f'{width}x{height}', os.path.normpath(path))
+
+
+def is_fresh(variant, source):
+    try:
+        return os.stat(variant).st_mtime >= os.stat(source).st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def touch(variant):
+    # Explicit atime, so LRU order holds on noatime mounts too
+    stat = os.stat(variant)
+    os.utime(variant, (time.time(), stat.st_mtime))
+
+
+def get_variant(width, height, path):
+    """Path of the rendered variant, rendering it first if needed; ``None`` for a bad source."""
+    source = source_path(path)
+    if source is None:
+        return None
+    # Name the variant after the resolved source, so ``..`` cannot steer where it is written
+    variant = variant_path(width, height, os.path.relpath(source, os.path.realpath(settings.MEDIA_ROOT)))
+    if is_fresh(variant, source):
+        touch(variant)
+        return variant
+
+    os.makedirs(os.path.dirname(variant), exist_ok=True)
+    rendered = False
+    with open(f'{variant}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # Whoever held the lock before us may have rendered it already
+            if not is_fresh(variant, source):
+                render(source, variant, width, height)
+                rendered = True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    if rendered:
+        total = add_to_total(os.path.getsize(variant))
+        if total is None or total > max_bytes():
+            evict()
+    return variant
+
+
+def render(source, variant, width, height):
+    image_format, options = FORMATS[os.path.splitext(source)[1].lower()]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        # Fit inside the box keeping the aspect ratio; 0 leaves a side free. Never upscales.
+        image.thumbnail((width or image.width, height or image.height), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(variant), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, image_format, **options)
+            os.replace(tmp, variant)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def add_to_total(amount):
+    """
+    Add ``amount`` bytes to the running total in ``SIZE_FILE``; returns the
+    new total, or ``None`` (nothing written) when there is no usable total.
+    """
+    path = os.path.join(cache_root(), SIZE_FILE)
+    with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT), 'r+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            total = int(f.read()) + amount
+        except ValueError:
+            return None  # new or damaged: evict() counts and writes it
+        f.seek(0)
+        f.truncate()
+        f.write(str(total))
+    return total
+
+
+def evict():
+    """Recount the cache and delete least recently used variants while it is over its cap."""
+    root = cache_root()
+    with open(os.path.join(root, '.evict.lock'), 'w') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return  # another process is already at it
+        # Renders finishing during the walk add to the old total; carry that over
+        counted_from = add_to_total(0)
+        files = []
+        total = 0
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(('.lock', '.tmp')) or name == SIZE_FILE:
+                    continue
+                full = os.path.join(directory, name)
+                try:
+                    stat = os.stat(full)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_atime, stat.st_size, full))
+                total += stat.st_size
+        if total > max_bytes():
+            target = max_bytes() * EVICT_TO
+            for _, size, full in sorted(files):
+                for stale in (full, f'{full}.lock'):
+                    try:
+                        os.remove(stale)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                if total <= target:
+                    break
+        write_total(total, counted_from)
+
+
+def write_total(total, counted_from=None):
+    # Keep what renders added since ``counted_from`` was read, on top of the recount
+    path = os.path.join(cache_root(), SIZE_FILE)
+    with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT), 'r+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            since = int(f.read()) - counted_from if counted_from is not None else 0
+        except ValueError:
+            since = 0
+        f.seek(0)
+        f.truncate()
+        f.write(str(total + max(since, 0)))
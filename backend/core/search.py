@@ -0,0 +1,400 @@
+import html
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Lower
+from django.utils.html import strip_tags
+from modeltranslation.utils import build_localized_fieldname
+from rest_framework.filters import BaseFilterBackend
+
+from .translit import normalize, trigrams
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_QUERY_TOKENS = 8
+
+
+def plain_text(value):
+    """CKEditor HTML -> the words a reader actually sees."""
+    if not value:
+        return ''
+    return ' '.join(html.unescape(strip_tags(value)).split())
+
+
+class SearchIndex:
+    """
+    Full-text index over the translated columns of one model.
+
+    On SQLite the rows live in an FTS5 virtual table (rowid = model pk) and
+    results are ranked with BM25. On PostgreSQL the same columns are searched
+    with a weighted ``SearchVector``; any other backend falls back to
+    ``icontains``. ``columns`` maps an index column to the model fields whose
+    uz/ru/en values are folded into it, in descending ``weights`` order.
+    """
+
+    def __init__(self, model, table, columns, weights, html_fields=(), fuzzy=None):
+        self.model = model
+        self.table = table
+        self.columns = columns
+        self.weights = weights
+        self.html_fields = set(html_fields)
+        # Optional TrigramIndex consulted when the word index finds nothing
+        self.fuzzy = fuzzy
+
+    @property
+    def languages(self):
+        return [code for code, _ in settings.LANGUAGES]
+
+    def localized_fields(self, field):
+        return [build_localized_fieldname(field, lang) for lang in self.languages]
+
+    def is_fts5(self, conn=None):
+        return (conn or connection).vendor == 'sqlite'
+
+    # Schema
+
+    def create_table(self, schema_editor):
+        if not self.is_fts5(schema_editor.connection):
+            return
+        columns = ', '.join(self.columns)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"{columns}, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def drop_table(self, schema_editor):
+        if self.is_fts5(schema_editor.connection):
+            schema_editor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    # Writing
+
+    def document(self, instance):
+        row = []
+        for fields in self.columns.values():
+            parts = []
+            for field in fields:
+                for name in self.localized_fields(field):
+                    value = getattr(instance, name, None) or ''
+                    if field in self.html_fields:
+                        value = plain_text(value)
+                    if value and value not in parts:
+                        parts.append(value)
+            row.append(' '.join(parts))
+        return row
+
+    def update(self, instance):
+        if self.fuzzy is not None:
+            self.fuzzy.update(instance)
+        if not self.is_fts5():
+            return
+        row = self.document(instance)
+        placeholders = ', '.join(['%s'] * (len(row) + 1))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [instance.pk])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, {', '.join(self.columns)}) VALUES ({placeholders})",
+                [instance.pk, *row]
+            )
+
+    def update_many(self, instances):
+        """``update`` for a batch (e.g. after ``bulk_create``), in two statements."""
+        if self.fuzzy is not None:
+            self.fuzzy.update_many(instances)
+        if not self.is_fts5() or not instances:
+            return
+        placeholders = ', '.join(['%s'] * (len(self.columns) + 1))
+        pks = [instance.pk for instance in instances]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks)
+            cursor.executemany(
+                f"INSERT INTO {self.table} (rowid, {', '.join(self.columns)}) VALUES ({placeholders})",
+                [[instance.pk, *self.document(instance)] for instance in instances]
+            )
+
+    def delete(self, pk):
+        if self.fuzzy is not None:
+            self.fuzzy.delete(pk)
+        if not self.is_fts5():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [pk])
+
+    def rebuild(self, batch_size=500):
+        """Re-index every row; returns the number of documents written."""
+        if self.fuzzy is not None:
+            self.fuzzy.rebuild(batch_size=batch_size)
+        if not self.is_fts5():
+            return 0
+        placeholders = ', '.join(['%s'] * (len(self.columns) + 1))
+        insert = f"INSERT INTO {self.table} (rowid, {', '.join(self.columns)}) VALUES ({placeholders})"
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            batch = []
+            for instance in self.model.objects.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append([instance.pk, *self.document(instance)])
+                if len(batch) >= batch_size:
+                    cursor.executemany(insert, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert, batch)
+                total += len(batch)
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('optimize')")
+        return total
+
+    # Querying
+
+    @staticmethod
+    def tokens(terms):
+        return TOKEN_RE.findall(terms.lower())[:MAX_QUERY_TOKENS]
+
+    def match_expression(self, terms):
+        # Every token is quoted so user input can never be parsed as FTS5 syntax,
+        # and prefix-matched so results show up while the user is still typing.
+        return ' '.join(f'"{token}"*' for token in self.tokens(terms))
+
+    def search(self, queryset, terms):
+        """Restrict ``queryset`` to matches, best first (annotated as ``search_rank``)."""
+        if not self.tokens(terms):
+            return queryset.none()
+        if self.is_fts5():
+            results = self._search_fts5(queryset, terms)
+        elif connection.vendor == 'postgresql':
+            results = self._search_postgres(queryset, terms)
+        else:
+            results = self._search_fallback(queryset, terms)
+
+        if self.fuzzy is not None and not results.exists():
+            return self.fuzzy.search(queryset, terms)
+        return results
+
+    def _search_fts5(self, queryset, terms):
+        db_table = self.model._meta.db_table
+        pk = self.model._meta.pk.column
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.extra(
+            tables=[self.table],
+            where=[f'{self.table}.rowid = {db_table}.{pk}', f'{self.table} MATCH %s'],
+            params=[self.match_expression(terms)],
+            select={'search_rank': f'bm25({self.table}, {weights})'},
+            order_by=['search_rank', 'pk'],
+        )
+
+    def _search_postgres(self, queryset, terms):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = None
+        for (column, fields), weight in zip(self.columns.items(), 'ABCD'):
+            for field in fields:
+                for name in self.localized_fields(field):
+                    part = SearchVector(name, weight=weight, config='simple')
+                    vector = part if vector is None else vector + part
+        query = SearchQuery(
+            ' & '.join(f'{token}:*' for token in self.tokens(terms)),
+            search_type='raw',
+            config='simple'
+        )
+        return (
+            queryset.annotate(search_rank=SearchRank(vector, query))
+            .filter(search_rank__gt=0)
+            .order_by('-search_rank', 'pk')
+        )
+
+    def _search_fallback(self, queryset, terms):
+        for token in self.tokens(terms):
+            condition = Q()
+            for fields in self.columns.values():
+                for field in fields:
+                    for name in self.localized_fields(field):
+                        condition |= Q(**{f'{name}__icontains': token})
+            queryset = queryset.filter(condition)
+        return queryset
+
+
+class TrigramIndex:
+    """
+    Typo-tolerant, script-agnostic lookup over a precomputed ``key_field``
+    (see ``core.translit.build_search_key``).
+
+    SQLite keeps the keys in an FTS5 table with the trigram tokenizer; the
+    candidates sharing the most trigrams with the query are then scored by
+    trigram overlap. PostgreSQL uses a ``pg_trgm`` GIN index on the column.
+    """
+    candidate_limit = 200
+
+    def __init__(self, model, table, key_field='search_key', threshold=0.3):
+        self.model = model
+        self.table = table
+        self.key_field = key_field
+        self.threshold = threshold
+
+    def create_table(self, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor == 'sqlite':
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5(key, tokenize='trigram')"
+            )
+        elif vendor == 'postgresql':
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table} ON {self.model._meta.db_table} "
+                f"USING gin ({self.key_field} gin_trgm_ops)"
+            )
+
+    def drop_table(self, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor == 'sqlite':
+            schema_editor.execute(f"DROP TABLE IF EXISTS {self.table}")
+        elif vendor == 'postgresql':
+            schema_editor.execute(f"DROP INDEX IF EXISTS {self.table}")
+
+    def fill(self, cursor, rows):
+        """Write ``(pk, key)`` rows into the SQLite trigram table."""
+        cursor.executemany(f"INSERT INTO {self.table} (rowid, key) VALUES (%s, %s)", rows)
+
+    def update(self, instance):
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [instance.pk])
+            self.fill(cursor, [(instance.pk, getattr(instance, self.key_field))])
+
+    def update_many(self, instances):
+        if connection.vendor != 'sqlite' or not instances:
+            return
+        pks = [instance.pk for instance in instances]
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({', '.join(['%s'] * len(pks))})", pks)
+            self.fill(cursor, [(instance.pk, getattr(instance, self.key_field)) for instance in instances])
+
+    def delete(self, pk):
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [pk])
+
+    def rebuild(self, batch_size=500):
+        if connection.vendor != 'sqlite':
+            return 0
+        rows = self.model.objects.order_by('pk').values_list('pk', self.key_field)
+        total = 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    self.fill(cursor, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                self.fill(cursor, batch)
+                total += len(batch)
+        return total
+
+    def search(self, queryset, terms):
+        query = normalize(terms)
+        if connection.vendor == 'sqlite':
+            return self._search_fts5(queryset, query)
+        if connection.vendor == 'postgresql':
+            return self._search_postgres(queryset, query)
+        return queryset.none()
+
+    def _search_fts5(self, queryset, query):
+        wanted = trigrams(query)
+        if not wanted:
+            return queryset.none()
+
+        match = ' OR '.join(f'"{gram}"' for gram in sorted(wanted))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, key FROM {self.table} WHERE {self.table} MATCH %s ORDER BY rank LIMIT %s",
+                [match, self.candidate_limit]
+            )
+            candidates = cursor.fetchall()
+
+        scored = []
+        for pk, key in candidates:
+            score = len(wanted & trigrams(key)) / len(wanted)
+            if score >= self.threshold:
+                scored.append((-score, pk))
+        if not scored:
+            return queryset.none()
+
+        ranked = [pk for _, pk in sorted(scored)]
+        return (
+            queryset.filter(pk__in=ranked)
+            .annotate(search_rank=Case(
+                *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ranked)],
+                output_field=IntegerField()
+            ))
+            .order_by('search_rank')
+        )
+
+    def _search_postgres(self, queryset, query):
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        # `<%` (word similarity above pg_trgm's threshold) can use the gin_trgm_ops index
+        return (
+            queryset.extra(where=[f'%s <%% {self.key_field}'], params=[query])
+            .annotate(search_rank=TrigramWordSimilarity(Value(query), self.key_field))
+            .order_by('-search_rank', 'pk')
+        )
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """``?search=`` backed by the view's ``search_index``."""
+    search_param = 'search'
+
+    def get_search_terms(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        index = getattr(view, 'search_index', None)
+        if not terms or index is None:
+            return queryset
+        return index.search(queryset, terms)
+
+
+class PrefixSearchFilter(BaseFilterBackend):
+    """
+    ``?search=`` as case-insensitive prefix matches on the view's
+    ``search_fields``: every word has to start one of them. Each match is a
+    range on ``LOWER(field)`` (not ``LIKE``), so an index on that expression
+    serves it and the queryset keeps its own ordering. A field across a
+    reverse relation (``profile__hemis_id``) becomes a ``pk IN (...)`` on the
+    related table, which keeps the OR of the branches index-only.
+    """
+    search_param = 'search'
+
+    def get_search_terms(self, request):
+        return TOKEN_RE.findall(request.query_params.get(self.search_param, ''))[:MAX_QUERY_TOKENS]
+
+    @staticmethod
+    def prefix(key, term):
+        # Both sides lowered by the database, so they agree on non-ASCII letters
+        return Q(**{f'{key}__gte': Lower(Value(term)), f'{key}__lt': Lower(Value(term + '\U0010ffff'))})
+
+    def match(self, model, field, term):
+        if '__' not in field:
+            return self.prefix(f'search_{field}', term)
+        relation, rest = field.split('__', 1)
+        remote = model._meta.get_field(relation)
+        related = remote.related_model.objects.alias(search_key=Lower(rest))
+        return Q(pk__in=related.filter(self.prefix('search_key', term)).values(remote.field.attname))
+
+    def filter_queryset(self, request, queryset, view):
+        fields = getattr(view, 'search_fields', ())
+        terms = self.get_search_terms(request)
+        if not terms or not fields:
+            return queryset
+        queryset = queryset.alias(**{f'search_{field}': Lower(field) for field in fields if '__' not in field})
+        for term in terms:
+            condition = Q()
+            for field in fields:
+                condition |= self.match(queryset.model, field, term)
+            queryset = queryset.filter(condition)
+        return queryset
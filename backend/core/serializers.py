@@ -0,0 +1,80 @@
+from modeltranslation.translator import NotRegistered, translator
+
+
+def force_https(representation, *fields):
+    """Rewrite absolute ``http:`` media URLs to ``https:`` (the app sits behind a TLS proxy)."""
+    for field in fields:
+        url = representation.get(field)
+        if url and url.startswith('http:'):
+            representation[field] = url.replace('http:', 'https:', 1)
+    return representation
+
+
+class SparseFieldsetMixin:
+    """
+    Lets GET clients trim the payload: ``?fields=id,title`` keeps only the
+    listed fields and ``?omit=description`` drops fields. Unknown names are
+    ignored. Needs the request in the serializer context, which generic views
+    pass automatically.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET':
+            return
+
+        params = getattr(request, 'query_params', request.GET)
+        wanted = self._parse(params.get(self.fields_query_param))
+        omitted = self._parse(params.get(self.omit_query_param))
+        for name in list(self.fields):
+            if (wanted and name not in wanted) or name in omitted:
+                self.fields.pop(name)
+
+    @staticmethod
+    def _parse(value):
+        if not value:
+            return set()
+        return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class TranslatedFieldsMixin:
+    """
+    Emits each modeltranslation field once, in the active language.
+
+    ``title`` etc. already resolve to the language picked by LocaleMiddleware
+    (or ``?lang=``, see ``core.middleware.QueryLanguageMiddleware``) with the
+    MODELTRANSLATION_DEFAULT_LANGUAGE fallback, so on reads the per-language
+    ``title_uz``/``title_ru``/``title_en`` columns are dropped. Staff clients
+    that edit translations ask for them with ``?translations=all``.
+    """
+    translations_query_param = 'translations'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or self.wants_all_translations(request):
+            return
+
+        for name in self.localized_field_names():
+            self.fields.pop(name, None)
+
+    def wants_all_translations(self, request):
+        params = getattr(request, 'query_params', request.GET)
+        if params.get(self.translations_query_param) != 'all':
+            return False
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_staff)
+
+    def localized_field_names(self):
+        try:
+            options = translator.get_options_for_model(self.Meta.model)
+        except NotRegistered:
+            return set()
+        return {
+            field.name
+            for localized in options.all_fields.values()
+            for field in localized
+        }
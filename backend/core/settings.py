@@ -53,12 +53,15 @@ INSTALLED_APPS = [
     'news',
     'books',
     'accounts',
+    'jobs',
+    'uploads',
     'rest_framework.authtoken',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # Token first: token clients never reach the session lookup
+        'accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -79,6 +82,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware', # Language Support
+    'core.middleware.QueryLanguageMiddleware', # ?lang= override
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -118,6 +122,38 @@ DATABASES = {
 }
 
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'kutubxona',
+    },
+    # Shared by every worker process on the host, so a tag invalidated by one
+    # worker is seen by all of them (see core.cache)
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('RESPONSE_CACHE_DIR', BASE_DIR / 'cache' / 'responses'),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+# Each worker adds its hit/miss counts to the shared totals this often (s)
+RESPONSE_CACHE_STATS_INTERVAL = 10
+
+# Resolved API tokens kept per process (accounts.authentication): entries, seconds.
+# TOKEN_CACHE_ALIAS (e.g. 'responses') adds a cache shared by all workers.
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_ALIAS = os.environ.get('TOKEN_CACHE_ALIAS') or None
+TOKEN_CACHE_SHARED_TTL = 300
+
+
+# Background jobs (see jobs.queue); run `manage.py run_jobs` next to the web workers.
+# JOBS_EAGER runs them in-process after commit instead, for development without a worker.
+JOBS_EAGER = os.environ.get('JOBS_EAGER', 'False') == 'True'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -162,6 +198,32 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Public page of a book; encoded into its QR code ("{id}" is the book id).
+# Served codes follow it at once; stored copies need `manage.py regenerate_qr_codes`.
+BOOK_PUBLIC_URL = os.environ.get('BOOK_PUBLIC_URL', 'https://e-library.samduuf.uz/books/{id}')
+
+# /media-resized/<w>x<h>/<path> disk cache (core.resize); least recently used copies go first
+RESIZED_MEDIA_ROOT = os.environ.get('RESIZED_MEDIA_ROOT', BASE_DIR / 'cache' / 'media-resized')
+RESIZED_MEDIA_MAX_BYTES = int(os.environ.get('RESIZED_MEDIA_MAX_BYTES', 512 * 1024 * 1024))
+# Each side of <w>x<h> is 0 (free) or one of these; any other size is a 404, so
+# the cache cannot be filled with every possible width of every image
+RESIZED_MEDIA_SIZES = (80, 160, 240, 320, 480, 640, 800, 960, 1280, 1600, 1920)
+
+# Book files (uploads.storage.protected_storage). Kept outside MEDIA_ROOT so that
+# /media/ never serves them; only the download views below do
+PROTECTED_MEDIA_ROOT = os.environ.get('PROTECTED_MEDIA_ROOT', BASE_DIR / 'protected')
+
+# Book file downloads (core.downloads). With an offload mode the front proxy sends the
+# bytes: 'x-accel' (nginx, `internal` location PROTECTED_MEDIA_PREFIX aliased to
+# PROTECTED_MEDIA_ROOT) or 'x-sendfile' (Apache mod_xsendfile, lighttpd). Empty streams from Django.
+PROTECTED_MEDIA_OFFLOAD = os.environ.get('PROTECTED_MEDIA_OFFLOAD', '')
+PROTECTED_MEDIA_PREFIX = os.environ.get('PROTECTED_MEDIA_PREFIX', '/protected-media/')
+# Lifetime (s) of a signed download link handed to the browser
+DOWNLOAD_LINK_MAX_AGE = 6 * 60 * 60
+
+# Widths (px) of the WebP/JPEG copies made of book covers and news images (core.images)
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 960)
+
 # CORS Configuration
 # Only allow all origins in DEBUG mode. In production, restrict to allowed origins.
 CORS_ALLOW_ALL_ORIGINS = DEBUG
@@ -241,6 +303,17 @@ HEMIS_STAFF_URL = 'https://hemis.samduuf.uz'
 HEMIS_API_URL = 'https://student.samduuf.uz/oauth/api' 
 
 HEMIS_REDIRECT_URI = os.environ.get('HEMIS_REDIRECT_URI', 'https://e-library.samduuf.uz/login/callback')
+# Token exchange races the candidate endpoints (accounts.hemis_client): requests in
+# flight, seconds for the whole exchange, seconds per request, pooled connections
+HEMIS_EXCHANGE_CONCURRENCY = 4
+HEMIS_EXCHANGE_DEADLINE = 20
+HEMIS_HTTP_TIMEOUT = 8
+HEMIS_HTTP_MAX_CONNECTIONS = 20
+# The endpoint that worked last time runs alone for at least this long (s) before
+# the others join; failing endpoints wait 30s, 60s, ... up to an hour (accounts.hemis_discovery)
+HEMIS_EXCHANGE_HEAD_START = 1.5
+HEMIS_ENDPOINT_BACKOFF = 30
+HEMIS_ENDPOINT_BACKOFF_MAX = 60 * 60
 
 # ==========================================
 # PRODUCTION SECURITY HARDENING
@@ -268,5 +341,17 @@ USE_X_FORWARDED_HOST = True
 SECURE_SSL_REDIRECT = False
 
 # File Upload Settings
-DATA_UPLOAD_MAX_MEMORY_SIZE = 209715200  # 200MB
-FILE_UPLOAD_MAX_MEMORY_SIZE = 209715200  # 200MB
+# Larger multipart files spill to a temp file; big book files go through the chunked API
+DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440  # 2.5MB
+
+# Chunked, resumable uploads (/api/uploads/, see uploads.views). Keep the directory on
+# the PROTECTED_MEDIA_ROOT filesystem so attaching a finished file is a rename, not a copy.
+CHUNKED_UPLOAD_DIR = os.environ.get('CHUNKED_UPLOAD_DIR', BASE_DIR / 'cache' / 'uploads')
+CHUNKED_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB per PUT
+CHUNKED_UPLOAD_MAX_SIZE = 2 * 1024 * 1024 * 1024  # 2GB
+# Unfinished uploads untouched this long are removed by `manage.py purge_uploads`
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24
+
+# Checkpoints of resumable management commands (regenerate_qr_codes --resume, ...)
+PROGRESS_DIR = os.environ.get('PROGRESS_DIR', BASE_DIR / 'cache' / 'progress')
@@ -0,0 +1,261 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from books.models import Book
+from . import exports, resize
+from .cache import StatsCounter, cache_stats, count, stats_counter
+from .downloads import content_disposition, parse_range
+from .translit import build_search_key, normalize, transliterate, trigrams
+
+
+class TranslitTests(SimpleTestCase):
+
+    def test_cyrillic_and_latin_spellings_agree(self):
+        self.assertEqual(normalize("O'tkan kunlar"), normalize('Ўткан кунлар'))
+        self.assertEqual(normalize('Qodiriy'), normalize('Қодирий'))
+        self.assertEqual(normalize('Xamza'), normalize('Ҳамза'))
+        self.assertEqual(normalize('Abdulla Qodiriy'), 'abdula kodiri')
+
+    def test_apostrophes_and_diacritics_are_dropped(self):
+        for spelling in ("G'afur G'ulom", 'Gʻafur Gʻulom', 'G‘afur G’ulom', 'Gafur Gulom'):
+            self.assertEqual(normalize(spelling), 'gafur gulom', spelling)
+        self.assertEqual(normalize('Café'), 'cafe')
+
+    def test_transliterate_keeps_latin(self):
+        self.assertEqual(transliterate('Shayx ҚЎЧҚОР'), "shayx qo'chqor")
+
+    def test_search_key_words_are_distinct_and_ordered(self):
+        self.assertEqual(build_search_key('Kimyo', 'Химия', None, ''), 'kimio himia')
+        self.assertEqual(build_search_key('Tarix', 'Тарих'), 'tarih')
+
+    def test_empty_and_short_input(self):
+        self.assertEqual(normalize(None), '')
+        self.assertEqual(normalize('?!'), '')
+        self.assertEqual(trigrams('ab cd'), set())
+        self.assertEqual(trigrams('kitob'), {'kit', 'ito', 'tob'})
+
+
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class CacheStatsTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        stats_counter.pending.clear()
+
+    def test_counts_are_batched_per_process(self):
+        counter = StatsCounter()
+        with self.settings(RESPONSE_CACHE_STATS_INTERVAL=60):
+            for _ in range(3):
+                counter.add('hits')
+            counter.add('misses')
+        self.assertIsNone(caches['default'].get('response-cache:stats:hits'))
+        counter.flush()
+        self.assertEqual(caches['default'].get('response-cache:stats:hits'), 3)
+        self.assertEqual(counter.pending, {})
+
+        with self.settings(RESPONSE_CACHE_STATS_INTERVAL=0):
+            counter.add('hits', 2)
+        self.assertEqual(caches['default'].get('response-cache:stats:hits'), 5)
+
+    def test_stats_include_this_process(self):
+        with self.settings(RESPONSE_CACHE_STATS_INTERVAL=60):
+            count('hits', 3)
+            count('misses')
+            stats = cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores']), (3, 1, 0))
+        self.assertEqual(stats['hitRatio'], 0.75)
+
+    def test_no_lookups_no_ratio(self):
+        self.assertIsNone(cache_stats()['hitRatio'])
+
+
+class ParseRangeTests(SimpleTestCase):
+
+    def test_ranges_are_clamped_sorted_and_merged(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), [(0, 9)])
+        self.assertEqual(parse_range('bytes=90-', 100), [(90, 99)])
+        self.assertEqual(parse_range('bytes=-10', 100), [(90, 99)])
+        self.assertEqual(parse_range('bytes=-500', 100), [(0, 99)])
+        self.assertEqual(parse_range('bytes=50-500', 100), [(50, 99)])
+        self.assertEqual(parse_range('bytes=20-29, 0-9, 5-14, 30-39', 100), [(0, 14), (20, 39)])
+
+    def test_unsatisfiable_ranges_are_empty(self):
+        self.assertEqual(parse_range('bytes=100-', 100), [])
+        self.assertEqual(parse_range('bytes=-0', 100), [])
+        self.assertEqual(parse_range('bytes=200-300,-0', 100), [])
+
+    def test_malformed_headers_are_ignored(self):
+        for header in (None, '', 'items=0-9', 'bytes=', 'bytes=-', 'bytes=9-0', 'bytes=a-b', 'bytes=0-9;x'):
+            self.assertIsNone(parse_range(header, 100), header)
+        many = 'bytes=' + ','.join(f'{n * 2}-{n * 2}' for n in range(20))
+        self.assertIsNone(parse_range(many, 100))
+
+
+class ContentDispositionTests(SimpleTestCase):
+
+    def test_unicode_name_has_an_ascii_fallback(self):
+        self.assertEqual(
+            content_disposition('Ўткан кунлар.pdf', True),
+            "attachment; filename=\" .pdf\"; filename*=UTF-8''%D0%8E%D1%82%D0%BA%D0%B0%D0%BD%20"
+            "%D0%BA%D1%83%D0%BD%D0%BB%D0%B0%D1%80.pdf",
+        )
+
+    def test_control_characters_and_quotes_are_dropped(self):
+        header = content_disposition('a"b\\c\r\nd\te\x00.pdf', False)
+        self.assertEqual(header, "inline; filename=\"abcde.pdf\"; filename*=UTF-8''a%22b%5Ccde.pdf")
+        self.assertEqual(content_disposition('\r\n', False), "inline; filename=\"download\"; filename*=UTF-8''download")
+
+
+class ResizedMediaTests(TestCase):
+
+    def setUp(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        self.media = os.path.join(tmp, 'media')
+        override = override_settings(
+            MEDIA_ROOT=self.media, RESIZED_MEDIA_ROOT=os.path.join(tmp, 'resized'),
+            RESIZED_MEDIA_SIZES=(160, 320),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        os.makedirs(os.path.join(self.media, 'covers'))
+        for name in ('a.png', 'b.png', 'c.png'):
+            Image.new('RGB', (640, 480), 'red').save(os.path.join(self.media, 'covers', name))
+
+    def total(self):
+        with open(os.path.join(resize.cache_root(), resize.SIZE_FILE)) as f:
+            return int(f.read())
+
+    def test_renders_once_then_serves_from_disk(self):
+        response = self.client.get('/media-resized/320x0/covers/a.png')
+        self.assertEqual(response.status_code, 200)
+        with Image.open(resize.variant_path(320, 0, 'covers/a.png')) as image:
+            self.assertEqual(image.size, (320, 240))
+        self.assertEqual(self.total(), os.path.getsize(resize.variant_path(320, 0, 'covers/a.png')))
+
+        with mock.patch.object(resize, 'render') as render:
+            response = self.client.get('/media-resized/320x0/covers/a.png')
+        self.assertEqual(response.status_code, 200)
+        render.assert_not_called()
+        response = self.client.get(
+            '/media-resized/320x0/covers/a.png', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_sizes_outside_the_allow_list_are_not_found(self):
+        for url in ('/media-resized/300x0/covers/a.png', '/media-resized/0x0/covers/a.png',
+                    '/media-resized/320x2048/covers/a.png'):
+            self.assertEqual(self.client.get(url).status_code, 404, url)
+        self.assertFalse(os.path.exists(resize.cache_root()))
+
+    def test_bad_sources_are_not_found(self):
+        with open(os.path.join(self.media, 'notes.txt'), 'w') as f:
+            f.write('x')
+        for path in ('covers/missing.png', 'notes.txt', '../resized/x.png', '%2e%2e/%2e%2e/etc/passwd'):
+            self.assertEqual(self.client.get(f'/media-resized/160x0/{path}').status_code, 404, path)
+
+        # A detour that ends inside MEDIA_ROOT is cached under the plain name
+        self.assertEqual(self.client.get('/media-resized/160x0/../media/covers/a.png').status_code, 200)
+        self.assertTrue(os.path.exists(resize.variant_path(160, 0, 'covers/a.png')))
+        self.assertEqual([name for name in os.listdir(resize.cache_root()) if name[0] != '.'], ['160x0'])
+
+    def test_evicts_only_over_the_cap(self):
+        self.client.get('/media-resized/160x0/covers/a.png')
+        size = self.total()
+        with self.settings(RESIZED_MEDIA_MAX_BYTES=size * 2 + size // 2), mock.patch.object(resize, 'evict') as evict:
+            self.client.get('/media-resized/160x0/covers/b.png')
+        evict.assert_not_called()
+
+        oldest = resize.variant_path(160, 0, 'covers/a.png')
+        os.utime(oldest, (0, os.stat(oldest).st_mtime))
+        with self.settings(RESIZED_MEDIA_MAX_BYTES=size * 2 + size // 2):
+            self.client.get('/media-resized/160x0/covers/c.png')
+        self.assertFalse(os.path.exists(oldest))
+        self.assertTrue(os.path.exists(resize.variant_path(160, 0, 'covers/c.png')))
+        self.assertEqual(self.total(), size * 2)
+
+    def test_unknown_total_is_recounted(self):
+        self.client.get('/media-resized/160x0/covers/a.png')
+        size = self.total()
+        with open(os.path.join(resize.cache_root(), resize.SIZE_FILE), 'w') as f:
+            f.write('garbage')
+        self.client.get('/media-resized/160x0/covers/b.png')
+        self.assertEqual(self.total(), size * 2)
+
+
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.titles = ['=HYPERLINK("http://x")', '+998 kitob', '-', '@SUM(A1)', 'Oddiy, "qo\'shtirnoq"']
+        for title in cls.titles:
+            Book.objects.create(title=title, author='Muallif', page_count=-1 if title == '-' else 10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_csv_cells_never_start_a_formula(self):
+        response = self.client.get(reverse('export', args=['books', 'csv']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(self.body(response).decode())))
+        self.assertEqual(
+            [row['title_uz'] for row in rows],
+            ["'=HYPERLINK(\"http://x\")", "'+998 kitob", "'-", "'@SUM(A1)", 'Oddiy, "qo\'shtirnoq"'],
+        )
+        # Numbers stay numbers
+        self.assertEqual(rows[2]['page_count'], '-1')
+
+    def test_jsonl_keeps_values_as_they_are(self):
+        response = self.client.get(reverse('export', args=['books', 'jsonl']))
+        rows = [json.loads(line) for line in self.body(response).decode().splitlines()]
+        self.assertEqual([row['title_uz'] for row in rows], self.titles)
+        self.assertEqual(rows[0]['page_count'], 10)
+
+    def test_gzip(self):
+        response = self.client.get(reverse('export', args=['users', 'jsonl']), {'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.jsonl.gz"', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(self.body(response)).decode().splitlines()]
+        self.assertEqual([row['username'] for row in rows], ['admin'])
+        self.assertNotIn('password', rows[0])
+
+    def test_blocks_are_bounded(self):
+        with mock.patch.object(exports, 'BLOCK_SIZE', 100):
+            blocks = list(exports.stream(exports.get_export('books'), 'csv', chunk_size=2))
+        self.assertGreater(len(blocks), 1)
+        self.assertTrue(all(len(block) < 400 for block in blocks))
+
+    def test_only_admins_export(self):
+        self.assertEqual(self.client.get('/api/export/orders.csv').status_code, 404)
+        self.client.force_authenticate(User.objects.create_user('talaba', password='x'))
+        self.assertEqual(self.client.get(reverse('export', args=['users', 'csv'])).status_code, 403)
+        self.client.force_authenticate(None)
+        self.assertIn(self.client.get(reverse('export', args=['users', 'csv'])).status_code, (401, 403))
+
+    def test_command_writes_the_file(self):
+        output = os.path.join(tempfile.mkdtemp(), 'kitoblar.csv.gz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        call_command('export_catalog', 'books', gzip=True, output=output, stderr=io.StringIO())
+        with gzip.open(output, 'rt') as f:
+            self.assertEqual(len(list(csv.DictReader(f))), len(self.titles))
+        self.assertEqual(os.listdir(os.path.dirname(output)), ['kitoblar.csv.gz'])
@@ -0,0 +1,71 @@
+import re
+import unicodedata
+
+# Uzbek Cyrillic (plus the Russian-only letters) to the official Latin alphabet.
+CYRILLIC_TO_LATIN = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': "g'", 'д': 'd', 'е': 'e',
+    'ё': 'yo', 'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'қ': 'q',
+    'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's',
+    'т': 't', 'у': 'u', 'ў': "o'", 'ф': 'f', 'х': 'x', 'ҳ': 'h', 'ц': 'ts',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': "'", 'ы': 'i', 'ь': '', 'э': 'e',
+    'ю': 'yu', 'я': 'ya',
+}
+
+# Every way people type the o'/g' apostrophe and the tutuq belgisi.
+APOSTROPHES = "'`´ʻʼʹ‘’′"
+
+# Letters that the Latin spelling and a Russian transcription of the same name
+# disagree on (Qodiriy / Кадыри -> kadiri). Applied after transliteration.
+PHONETIC_FOLDS = (
+    ('q', 'k'),
+    ('x', 'h'),
+    ('w', 'v'),
+    ('y', 'i'),
+)
+
+_APOSTROPHE_RE = re.compile(f"[{re.escape(APOSTROPHES)}]")
+_NON_WORD_RE = re.compile(r'[^a-z0-9]+')
+_REPEAT_RE = re.compile(r'(.)\1+')
+
+
+def transliterate(text):
+    """Cyrillic -> Uzbek Latin, lowercased. Latin input passes through."""
+    return ''.join(CYRILLIC_TO_LATIN.get(char, char) for char in text.lower())
+
+
+def normalize(text):
+    """
+    Search key for one string: transliterated, lowercased, diacritics and
+    apostrophes dropped, and folded so that spelling variants of the same
+    Uzbek word end up identical.
+    """
+    if not text:
+        return ''
+    text = transliterate(text)
+    text = _APOSTROPHE_RE.sub('', text)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    for source, target in PHONETIC_FOLDS:
+        text = text.replace(source, target)
+    text = _REPEAT_RE.sub(r'\1', text)
+    return ' '.join(_NON_WORD_RE.sub(' ', text).split())
+
+
+def build_search_key(*values):
+    """Distinct normalized words of all ``values``, in first-seen order."""
+    words = []
+    for value in values:
+        for word in normalize(value).split():
+            if word not in words:
+                words.append(word)
+    return ' '.join(words)
+
+
+def trigrams(text):
+    """Trigrams of each word in an already normalized string."""
+    grams = set()
+    for word in text.split():
+        if len(word) < 3:
+            continue
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
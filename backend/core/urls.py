@@ -15,16 +15,21 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from .views import ExportView, ResizedMediaView, ResponseCacheStatsView
 
 urlpatterns = [
     # path('admin/', admin.site.urls),
     path('api/', include('news.urls')),
     path('api/', include('books.urls')),
     path('api/accounts/', include('accounts.urls')),
+    path('api/uploads/', include('uploads.urls')),
+    path('api/cache/stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
+    re_path(r'^api/export/(?P<name>\w+)\.(?P<fmt>csv|jsonl)$', ExportView.as_view(), name='export'),
     path("ckeditor5/", include('django_ckeditor_5.urls')),
+    re_path(r'^media-resized/(?P<width>\d+)x(?P<height>\d+)/(?P<path>.+)$', ResizedMediaView.as_view(), name='media-resized'),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,64 @@
+import mimetypes
+import os
+
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views import View
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAdminUser
+from .cache import cache_stats
+from . import exports, resize
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class ExportView(APIView):
+    """
+    ``/api/export/<books|news|users>.<csv|jsonl>[?gzip=1]``: the whole table,
+    streamed row by row (see core.exports).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name, fmt):
+        if name not in exports.EXPORTS:
+            raise Http404
+        compress = request.query_params.get('gzip') == '1'
+        response = StreamingHttpResponse(
+            exports.stream(exports.get_export(name), fmt, compress),
+            content_type='application/gzip' if compress else f'{exports.FORMATS[fmt]}; charset=utf-8',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{exports.filename(name, fmt, compress)}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class ResizedMediaView(View):
+    """
+    ``/media-resized/<w>x<h>/<path>``: a media image scaled to fit the box
+    (``0`` leaves that side free), rendered once and then served from the
+    disk cache in ``core.resize``. Sizes outside RESIZED_MEDIA_SIZES are 404s.
+    """
+    max_age = 30 * 24 * 60 * 60
+
+    def get(self, request, width, height, path):
+        width, height = int(width), int(height)
+        if not resize.allowed_size(width, height):
+            raise Http404
+        variant = resize.get_variant(width, height, path)
+        if variant is None:
+            raise Http404
+        modified = os.stat(variant).st_mtime
+        response = get_conditional_response(request, last_modified=int(modified))
+        if response is None:
+            content_type = mimetypes.guess_type(variant)[0] or 'application/octet-stream'
+            response = FileResponse(open(variant, 'rb'), content_type=content_type)
+        response['Last-Modified'] = http_date(modified)
+        patch_cache_control(response, public=True, max_age=self.max_age)
+        return response
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+    verbose_name = 'Fon vazifalari'
+
+    def ready(self):
+        # Registers every app's @task functions (<app>/tasks.py)
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('tasks')
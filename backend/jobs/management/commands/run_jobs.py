@@ -0,0 +1,75 @@
+import logging
+import multiprocessing
+import signal
+import time
+from multiprocessing.connection import wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from jobs.queue import Worker, purge
+
+logger = logging.getLogger(__name__)
+
+
+def run_worker(options):
+    worker = Worker(
+        lease=options['lease'],
+        poll_interval=options['poll_interval'],
+        names=options['task'] or None,
+    )
+
+    def stop(signum, frame):
+        worker.stopping = True
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    worker.run(burst=options['burst'])
+
+
+class Command(BaseCommand):
+    help = 'Runs background jobs from the jobs table (QR codes, thumbnails, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to start')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle')
+        parser.add_argument('--lease', type=int, default=300, help='Seconds before a silent job is retried elsewhere')
+        parser.add_argument('--task', action='append', help='Only run jobs with this name (repeatable)')
+        parser.add_argument('--purge-days', type=int, default=7, help='Delete jobs finished this many days ago')
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(message)s')
+        purged = purge(options['purge_days'])
+        if purged:
+            self.stdout.write(f"Purged {purged} finished jobs")
+
+        if options['processes'] <= 1:
+            run_worker(options)
+            return
+
+        # Children must open their own database connections. Forked, so they
+        # inherit the configured Django instead of re-importing it
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+
+        def start():
+            worker = context.Process(target=run_worker, args=(options,), daemon=True)
+            worker.start()
+            return worker
+
+        workers = [start() for _ in range(options['processes'])]
+        self.stdout.write(self.style.SUCCESS(f"Started {len(workers)} workers"))
+        try:
+            # A worker only exits cleanly when told to stop; one that died is replaced
+            while workers:
+                wait([worker.sentinel for worker in workers])
+                for worker in [worker for worker in workers if not worker.is_alive()]:
+                    workers.remove(worker)
+                    if worker.exitcode != 0:
+                        logger.error("Worker %s exited with code %s, restarting", worker.pid, worker.exitcode)
+                        time.sleep(1)
+                        workers.append(start())
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,51 @@
+from django.db import models
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Navbatda'),
+        (RUNNING, 'Bajarilmoqda'),
+        (DONE, 'Bajarildi'),
+        (FAILED, 'Xatolik'),
+    ]
+
+    # Registered name of the task function (see jobs.queue.task)
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Idempotency key: at most one queued job per key, extra enqueues are dropped
+    key = models.CharField(max_length=200, null=True, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    last_error = models.TextField(blank=True, default='')
+
+    # Lease of the worker currently running the job; expired leases are requeued
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Vazifa"
+        verbose_name_plural = "Vazifalar"
+        ordering = ['run_at', 'id']
+        indexes = [
+            # The worker's poll: next due queued jobs
+            models.Index(fields=['status', 'run_at', 'id'], name='job_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status='queued'), name='job_queued_key_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
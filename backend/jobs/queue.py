@@ -0,0 +1,190 @@
+"""
+Persistent job queue in the project database, no broker involved.
+
+Functions decorated with ``@task('app.name')`` in an app's ``tasks.py`` are
+enqueued by name with JSON arguments and executed by ``manage.py run_jobs``.
+Workers claim a job with a conditional UPDATE (so any number of processes
+can poll the same table), hold it under a lease, and retry failures with
+exponential backoff up to ``max_attempts``. A database error in the worker's
+own queries (``database is locked``...) is logged and retried after a pause
+instead of ending the worker; a job it could not report on is simply run
+again once its lease runs out.
+"""
+import datetime
+import logging
+import os
+import socket
+import time
+import traceback
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+RETRY_BASE_DELAY = 30
+RETRY_MAX_DELAY = 3600
+# How often a worker looks for jobs whose lease ran out
+REAP_INTERVAL = 30
+# Pause after a database error, doubling while they persist
+ERROR_BASE_DELAY = 1
+ERROR_MAX_DELAY = 60
+
+
+def task(name):
+    """Register the decorated function as the job ``name``."""
+    def decorator(func):
+        _registry[name] = func
+        func.task_name = name
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def enqueue(name, *args, key=None, delay=0, max_attempts=3, **kwargs):
+    """
+    Queue ``name(*args, **kwargs)``. With a ``key``, an identical job that is
+    still waiting absorbs this one and nothing new is written.
+    """
+    if name not in _registry:
+        raise KeyError(f"Unknown task: {name}")
+    job = Job(
+        name=name, args=list(args), kwargs=kwargs, key=key, max_attempts=max_attempts,
+        run_at=timezone.now() + datetime.timedelta(seconds=delay),
+    )
+    # The partial unique index on queued keys turns a duplicate into a no-op
+    Job.objects.bulk_create([job], ignore_conflicts=key is not None)
+    return job
+
+
+def enqueue_on_commit(name, *args, **kwargs):
+    """``enqueue`` once the surrounding transaction commits (right away outside one)."""
+    if getattr(settings, 'JOBS_EAGER', False):
+        # Development without a worker: run in-process after the commit
+        task_kwargs = {k: v for k, v in kwargs.items() if k not in ('key', 'delay', 'max_attempts')}
+        transaction.on_commit(lambda: get_task(name)(*args, **task_kwargs))
+        return
+    transaction.on_commit(lambda: enqueue(name, *args, **kwargs))
+
+
+def retry_delay(attempts):
+    return min(RETRY_BASE_DELAY * 2 ** (attempts - 1), RETRY_MAX_DELAY)
+
+
+class Worker:
+    def __init__(self, lease=300, poll_interval=1.0, batch_size=10, names=None):
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.names = names
+        self.ident = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = False
+        self.next_reap = 0
+
+    def run(self, burst=False):
+        """Process jobs until stopped; with ``burst``, until the queue is empty."""
+        logger.info("Worker %s started", self.ident)
+        errors = 0
+        while not self.stopping:
+            try:
+                found = self.step()
+            except DatabaseError:
+                errors += 1
+                delay = min(ERROR_BASE_DELAY * 2 ** (errors - 1), ERROR_MAX_DELAY)
+                logger.exception("Worker %s: database error, retrying in %ss", self.ident, delay)
+                close_old_connections()
+                time.sleep(delay)
+                continue
+            errors = 0
+            if not found:
+                if burst:
+                    break
+                time.sleep(self.poll_interval)
+        logger.info("Worker %s stopped", self.ident)
+
+    def step(self):
+        """Claim and run one due job; ``False`` if there was none."""
+        close_old_connections()
+        if time.monotonic() >= self.next_reap:
+            self.requeue_expired()
+            self.next_reap = time.monotonic() + REAP_INTERVAL
+        job = self.claim()
+        if job is None:
+            return False
+        self.execute(job)
+        return True
+
+    def requeue_expired(self):
+        # A worker that died mid-job leaves a lease nobody renews
+        expired = Job.objects.filter(status=Job.RUNNING, locked_until__lt=timezone.now())
+        try:
+            with transaction.atomic():
+                queued_keys = Job.objects.filter(status=Job.QUEUED, key__isnull=False).values('key')
+                expired.filter(key__in=queued_keys).delete()
+                expired.update(status=Job.QUEUED, locked_by='', locked_until=None)
+        except IntegrityError:
+            pass  # raced with an enqueue; the next pass picks it up
+
+    def claim(self):
+        now = timezone.now()
+        due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        if self.names:
+            due = due.filter(name__in=self.names)
+        for pk in due.order_by('run_at', 'id').values_list('pk', flat=True)[:self.batch_size]:
+            # Whoever flips the status first owns the job; the others move on
+            claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING,
+                locked_by=self.ident,
+                locked_until=now + datetime.timedelta(seconds=self.lease),
+            )
+            if claimed:
+                return Job.objects.get(pk=pk)
+        return None
+
+    def execute(self, job):
+        job.attempts += 1
+        try:
+            func = get_task(job.name)
+            func(*job.args, **job.kwargs)
+        except Exception:
+            job.last_error = traceback.format_exc()
+            if job.attempts < job.max_attempts:
+                job.status = Job.QUEUED
+                job.run_at = timezone.now() + datetime.timedelta(seconds=retry_delay(job.attempts))
+                logger.warning("Job %s #%s failed (attempt %s), retrying", job.name, job.pk, job.attempts)
+            else:
+                job.status = Job.FAILED
+                job.finished_at = timezone.now()
+                logger.error("Job %s #%s failed permanently", job.name, job.pk)
+        else:
+            job.status = Job.DONE
+            job.finished_at = timezone.now()
+            job.last_error = ''
+        job.locked_by = ''
+        job.locked_until = None
+        self.save_result(job)
+        return job
+
+    def save_result(self, job):
+        fields = ['status', 'attempts', 'run_at', 'last_error', 'locked_by', 'locked_until', 'finished_at']
+        # Only while we still hold the lease: an expired one may already be someone else's
+        mine = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=self.ident)
+        try:
+            with transaction.atomic():
+                mine.update(**{field: getattr(job, field) for field in fields})
+        except IntegrityError:
+            # Retry of a keyed job that was enqueued again meanwhile: the fresh one supersedes it
+            mine.delete()
+
+
+def purge(older_than_days=7):
+    """Delete finished jobs; failed ones are kept for inspection."""
+    cutoff = timezone.now() - datetime.timedelta(days=older_than_days)
+    return Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()[0]
@@ -0,0 +1,202 @@
+import datetime
+from unittest import mock
+
+from django.db import OperationalError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from books.models import Book
+from .models import Job
+from .queue import Worker, enqueue, enqueue_on_commit, retry_delay, task
+
+calls = []
+
+
+@task('jobs.test_record')
+def record(*args, **kwargs):
+    calls.append((args, kwargs))
+
+
+@task('jobs.test_fail')
+def fail():
+    raise RuntimeError('xato')
+
+
+class QueueTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(lease=60, poll_interval=0)
+
+
+class EnqueueTests(QueueTestCase):
+
+    def test_job_runs_with_its_arguments(self):
+        enqueue('jobs.test_record', 1, 'a', size=2)
+        self.worker.run(burst=True)
+        self.assertEqual(calls, [((1, 'a'), {'size': 2})])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), (Job.DONE, 1, ''))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_waiting_job_absorbs_duplicates_by_key(self):
+        enqueue('jobs.test_record', 1, key='kitob:1')
+        enqueue('jobs.test_record', 1, key='kitob:1')
+        enqueue('jobs.test_record', 2, key='kitob:2')
+        self.assertEqual(Job.objects.count(), 2)
+        self.worker.run(burst=True)
+        # Once the first one ran, the key is free again
+        enqueue('jobs.test_record', 1, key='kitob:1')
+        self.assertEqual(Job.objects.filter(key='kitob:1').count(), 2)
+        self.assertEqual(len(calls), 2)
+
+    def test_unknown_task_is_refused(self):
+        with self.assertRaises(KeyError):
+            enqueue('jobs.yoq')
+        self.assertFalse(Job.objects.exists())
+
+    def test_delayed_job_waits(self):
+        enqueue('jobs.test_record', delay=60)
+        self.worker.run(burst=True)
+        self.assertEqual(calls, [])
+
+    def test_enqueued_on_commit_only(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue_on_commit('jobs.test_record', 1, key='k')
+            self.assertFalse(Job.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(Job.objects.get().args, [1])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_in_process(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_on_commit('jobs.test_record', 1, key='k', size=3)
+        self.assertEqual(calls, [((1,), {'size': 3})])
+        self.assertFalse(Job.objects.exists())
+
+
+class BookJobTests(QueueTestCase):
+
+    def test_new_cover_queues_variants_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            book = Book.objects.create(title='Kitob', author='Muallif', cover_image='books/covers/a.jpg')
+            book.save()
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.args, job.key), ('books.cover_variants', [book.pk], f'book-cover:{book.pk}'))
+
+    def test_book_without_cover_queues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Book.objects.create(title='Kitob', author='Muallif')
+        self.assertFalse(Job.objects.exists())
+
+    def test_rolled_back_save_queues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Book.objects.create(title='Kitob', author='Muallif', cover_image='books/covers/a.jpg')
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertFalse(Job.objects.exists())
+
+
+class RetryTests(QueueTestCase):
+
+    def test_failures_back_off_then_give_up(self):
+        job = enqueue('jobs.test_fail', max_attempts=3)
+        for attempt in (1, 2):
+            started = timezone.now()
+            self.worker.run(burst=True)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, attempt))
+            self.assertIn('RuntimeError: xato', job.last_error)
+            self.assertGreaterEqual(job.run_at, started + datetime.timedelta(seconds=retry_delay(attempt)))
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.worker.run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertEqual((job.locked_by, job.locked_until), ('', None))
+
+    def test_delay_doubles_up_to_the_cap(self):
+        self.assertEqual([retry_delay(n) for n in (1, 2, 3)], [30, 60, 120])
+        self.assertEqual(retry_delay(20), 3600)
+
+
+class LeaseTests(QueueTestCase):
+
+    def expire(self):
+        Job.objects.filter(status=Job.RUNNING).update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_expired_lease_is_requeued_and_run_again(self):
+        job = enqueue('jobs.test_record', 7)
+        claimed = Worker(lease=60).claim()
+        self.assertEqual((claimed.pk, claimed.status), (job.pk, Job.RUNNING))
+        self.assertIsNone(self.worker.claim())
+
+        self.expire()
+        self.worker.run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, calls), (Job.DONE, [((7,), {})]))
+
+    def test_live_lease_is_left_alone(self):
+        job = enqueue('jobs.test_record')
+        Worker(lease=60).claim()
+        self.worker.requeue_expired()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+
+    def test_expired_job_yields_to_a_queued_duplicate(self):
+        enqueue('jobs.test_record', key='k')
+        Worker().claim()
+        self.expire()
+        enqueue('jobs.test_record', key='k')
+        self.worker.requeue_expired()
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), [Job.QUEUED])
+
+    def test_late_result_does_not_overwrite_the_new_owner(self):
+        job = enqueue('jobs.test_record')
+        slow = Worker()
+        slow.ident = 'sekin:1'
+        claimed = slow.claim()
+        self.expire()
+        self.worker.run(burst=True)
+        slow.execute(claimed)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 1))
+
+
+class WorkerErrorTests(QueueTestCase):
+
+    def test_database_errors_are_retried_with_backoff(self):
+        enqueue('jobs.test_record', 1)
+        claim = self.worker.claim
+        errors = [OperationalError('database is locked')] * 3
+
+        def flaky_claim():
+            if errors:
+                raise errors.pop()
+            return claim()
+
+        with mock.patch.object(self.worker, 'claim', side_effect=flaky_claim), \
+                mock.patch('jobs.queue.time.sleep') as sleep, \
+                self.assertLogs('jobs.queue', 'ERROR') as logs:
+            self.worker.run(burst=True)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 2, 4])
+        self.assertIn('database is locked', logs.output[0])
+        self.assertEqual(calls, [((1,), {})])
+
+    def test_failed_result_save_is_retried_after_the_lease(self):
+        job = enqueue('jobs.test_record')
+        with mock.patch.object(Worker, 'save_result', side_effect=OperationalError('database is locked')), \
+                mock.patch('jobs.queue.time.sleep'), self.assertLogs('jobs.queue', 'ERROR'):
+            worker = Worker()
+            worker.claim = mock.Mock(side_effect=[worker.claim(), None])
+            worker.run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - datetime.timedelta(seconds=1))
+        self.worker.run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(len(calls), 2)
@@ -0,0 +1,13 @@
+from core.exports import Export, localized
+from .models import News
+
+news = Export(
+    lambda: News.objects.order_by('pk'),
+    {
+        'id': 'pk',
+        **localized('title', 'description', 'author', 'category'),
+        'date': 'date',
+        'image': 'image',
+        'updated_at': 'updated_at',
+    },
+)
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 10:20
+
+from django.db import migrations
+
+# Frozen copy of the table news.search.news_index describes; a later change
+# to the live index needs its own migration.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS news_news_fts USING fts5("
+    "title, author, description, tokenize='unicode61 remove_diacritics 2')"
+)
+DROP_SQL = "DROP TABLE IF EXISTS news_news_fts"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_news_news_date_id_idx'),
+    ]
+
+    operations = [
+        # Filled by signals on save/delete and by `manage.py rebuild_search_index`
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_news_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-18 14:40
+
+import uploads.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_news_image_variants'),
+        ('uploads', '0002_blob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='news',
+            name='image',
+            field=models.ImageField(storage=uploads.storage.ContentAddressedStorage(), upload_to='news/', verbose_name='Rasm'),
+        ),
+    ]
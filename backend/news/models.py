@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from django_ckeditor_5.fields import CKEditor5Field
+from uploads.storage import blob_storage
 
 class News(models.Model):
     CATEGORY_CHOICES = [
@@ -14,15 +15,22 @@ class News(models.Model):
 
     title = models.CharField("Sarlavha", max_length=255)
     description = CKEditor5Field('Maqola Matni', config_name='extends')
-    image = models.ImageField("Rasm", upload_to='news/')
+    image = models.ImageField("Rasm", upload_to='news/', storage=blob_storage)
+    # Resized WebP/JPEG copies of image, see core.images
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     date = models.DateField("Sana", default=timezone.now)
     category = models.CharField("Kategoriya", max_length=20, choices=CATEGORY_CHOICES, default='Yangilik')
     author = models.CharField("Muallif", max_length=50, default='Admin')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = 'Yangilik'
         verbose_name_plural = 'Yangiliklar'
         ordering = ['-date']
+        indexes = [
+            # Backs keyset pagination in core.pagination.NewsPagination
+            models.Index(fields=['-date', 'id'], name='news_date_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
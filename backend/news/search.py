@@ -0,0 +1,14 @@
+from core.search import SearchIndex
+from .models import News
+
+news_index = SearchIndex(
+    News,
+    table='news_news_fts',
+    columns={
+        'title': ['title'],
+        'author': ['author'],
+        'description': ['description'],
+    },
+    weights=(10.0, 3.0, 1.0),
+    html_fields=('description',),
+)
@@ -1,20 +1,23 @@
 from rest_framework import serializers
 from .models import News
+from core import images
+from core.serializers import SparseFieldsetMixin, TranslatedFieldsMixin, force_https
+
+class NewsSerializer(SparseFieldsetMixin, TranslatedFieldsMixin, serializers.ModelSerializer):
+    image_srcset = serializers.SerializerMethodField()
 
-class NewsSerializer(serializers.ModelSerializer):
     class Meta:
         model = News
-        fields = '__all__'
+        exclude = ['image_variants']
         extra_kwargs = {
             'title': {'required': False},
             'description': {'required': False}
         }
 
+    def get_image_srcset(self, obj):
+        return images.srcset(obj.image, obj.image_variants, self.context.get('request'))
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         # Force HTTPS for image if it exists and starts with http:
-        if representation.get('image'):
-            url = representation['image']
-            if url.startswith('http:'):
-                representation['image'] = url.replace('http:', 'https:', 1)
-        return representation
+        return force_https(representation, 'image')
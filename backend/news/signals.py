@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import News
+from .search import news_index
+from core import images
+from core.cache import invalidate_tags
+from jobs.queue import enqueue_on_commit
+
+
+@receiver(post_save, sender=News)
+def index_news(sender, instance, **kwargs):
+    news_index.update(instance)
+
+
+@receiver(post_save, sender=News)
+def queue_image_variants(sender, instance, **kwargs):
+    if instance.image and not images.is_current(instance.image, instance.image_variants):
+        enqueue_on_commit('news.image_variants', instance.pk, key=f'news-image:{instance.pk}')
+
+
+@receiver(post_delete, sender=News)
+def unindex_news(sender, instance, **kwargs):
+    news_index.delete(instance.pk)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_news_responses(sender, instance, **kwargs):
+    invalidate_tags(f'news:{instance.pk}', 'news:list')
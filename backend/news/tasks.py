@@ -0,0 +1,23 @@
+from django.utils import timezone
+from jobs.queue import task
+from .models import News
+from core import images
+from core.cache import invalidate_tags
+
+
+@task('news.image_variants')
+def build_image_variants(news_id):
+    news = News.objects.filter(pk=news_id).only('pk', 'image', 'image_variants').first()
+    if news is None or not news.image or images.is_current(news.image, news.image_variants):
+        return
+
+    manifest = images.build_variants(news.image)
+    # Only if the image was not replaced again while rendering
+    updated = News.objects.filter(pk=news.pk, image=news.image.name).update(
+        image_variants=manifest, updated_at=timezone.now()
+    )
+    if updated:
+        images.delete_variants(news.image_variants)
+        invalidate_tags(f'news:{news.pk}', 'news:list')
+    else:
+        images.delete_variants(manifest)
@@ -1,3 +1,40 @@
-from django.test import TestCase
+import base64
+import datetime
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .models import News
+
+
+def cursor(link):
+    return parse_qs(urlsplit(link).query)['cursor'][0]
+
+
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class NewsPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for n in range(5):
+            News.objects.create(title=f'Yangilik {n}', date=datetime.date(2026, 1, 1 + n // 2))
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        self.url = reverse('news-list')
+
+    def test_pages_follow_date_then_id(self):
+        first = self.client.get(self.url, {'page_size': 3}).data
+        second = self.client.get(self.url, {'page_size': 3, 'cursor': cursor(first['next'])}).data
+        ids = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual(ids, list(News.objects.order_by('-date', 'id').values_list('id', flat=True)))
+        self.assertIsNone(second['next'])
+
+    def test_cursor_with_a_bad_date_is_404(self):
+        bad = '{"v":["yesterday",1],"r":0}'
+        response = self.client.get(self.url, {'cursor': base64.urlsafe_b64encode(bad.encode()).decode()})
+        self.assertEqual(response.status_code, 404)
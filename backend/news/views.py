@@ -1,7 +1,20 @@
 from rest_framework import viewsets
 from .models import News
 from .serializers import NewsSerializer
+from .search import news_index
+from core.cache import TaggedResponseCacheMixin
+from core.conditional import ConditionalGetMixin
+from core.pagination import NewsPagination
+from core.search import FullTextSearchFilter
 
-class NewsViewSet(viewsets.ModelViewSet):
+class NewsViewSet(TaggedResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = News.objects.all()
     serializer_class = NewsSerializer
+    pagination_class = NewsPagination
+    filter_backends = [FullTextSearchFilter]
+    search_index = news_index
+
+    def get_cache_tags(self, request, *args, **kwargs):
+        if 'pk' in kwargs:
+            return [f"news:{kwargs['pk']}"]
+        return ['news:list']
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import Blob, Upload
+
+
+@admin.register(Upload)
+class UploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'size', 'received', 'updated_at')
+    search_fields = ('filename', 'sha256')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'created_at', 'touched_at')
+    search_fields = ('name', 'sha256')
+    readonly_fields = ('name', 'sha256', 'size', 'refcount', 'created_at', 'touched_at')
@@ -0,0 +1,16 @@
+from django.apps import AppConfig, apps
+from django.db.models.signals import pre_save, post_save, post_delete
+
+
+class UploadsConfig(AppConfig):
+    name = 'uploads'
+    verbose_name = 'Yuklashlar'
+
+    def ready(self):
+        from .signals import blob_fields, remember_blobs, count_blobs, release_blobs
+        # Reference counting for every model storing files in the content-addressed storage
+        for model in apps.get_models():
+            if blob_fields(model):
+                pre_save.connect(remember_blobs, sender=model, dispatch_uid=f'remember_blobs:{model._meta.label}')
+                post_save.connect(count_blobs, sender=model, dispatch_uid=f'count_blobs:{model._meta.label}')
+                post_delete.connect(release_blobs, sender=model, dispatch_uid=f'release_blobs:{model._meta.label}')
@@ -0,0 +1,101 @@
+"""
+Disk side of chunked uploads: append a request body to the part file, hash
+it, and hand the finished file to a FileField.
+
+Chunks are copied from the request stream in CHUNK_SIZE blocks, so a worker
+never holds more than one block of an upload in memory whatever the file
+size. An exclusive ``flock`` on the part file serialises writers of the same
+upload across worker processes.
+"""
+import fcntl
+import hashlib
+import os
+import re
+from contextlib import contextmanager
+
+from django.core.files import File
+
+CHUNK_SIZE = 64 * 1024
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class Busy(Exception):
+    """Another request is writing to the same upload."""
+
+
+class ChunkError(Exception):
+    pass
+
+
+class PartFile(File):
+    # FileSystemStorage moves a file that has a temporary path instead of copying it
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def parse_content_range(header):
+    """``(start, end)`` inclusive from ``bytes start-end/total``, or ``None``."""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        return None
+    start, end, total = map(int, match.groups())
+    if end < start or end >= total:
+        return None
+    return start, end, total
+
+
+@contextmanager
+def locked(upload):
+    os.makedirs(os.path.dirname(upload.part_path), exist_ok=True)
+    fd = os.open(upload.part_path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise Busy
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def write_chunk(fd, stream, start, length, sha256=None):
+    """
+    Copy ``length`` bytes of ``stream`` to offset ``start``. Raises
+    ChunkError if the stream ends early or the chunk's SHA-256 is not
+    ``sha256``; the caller then leaves the committed offset where it was.
+    """
+    digest = hashlib.sha256()
+    os.lseek(fd, start, os.SEEK_SET)
+    remaining = length
+    while remaining > 0:
+        block = stream.read(min(CHUNK_SIZE, remaining))
+        if not block:
+            raise ChunkError("Bo'lak to'liq kelmadi")
+        digest.update(block)
+        os.write(fd, block)
+        remaining -= len(block)
+    if sha256 and digest.hexdigest() != sha256.lower():
+        raise ChunkError("Bo'lak nazorat summasi mos kelmadi")
+    os.fsync(fd)
+
+
+def file_sha256(fd, size):
+    digest = hashlib.sha256()
+    os.lseek(fd, 0, os.SEEK_SET)
+    remaining = size
+    while remaining > 0:
+        block = os.read(fd, min(1024 * 1024, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest.hexdigest()
+
+
+def attach(upload, field_file, sha256=None):
+    """Store the finished part file as ``field_file`` (moved, not copied, on local storage)."""
+    with open(upload.part_path, 'rb') as f:
+        part = PartFile(f)
+        # Spares the content-addressed storage hashing the file again
+        part.sha256 = sha256
+        field_file.save(upload.filename, part, save=False)
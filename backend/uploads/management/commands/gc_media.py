@@ -0,0 +1,108 @@
+import datetime
+import os
+from collections import Counter, defaultdict
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import FileField
+from django.utils import timezone
+from core import images
+from uploads.models import Blob
+from uploads.signals import blob_fields
+from uploads.storage import CONTENT_STORAGES
+
+# Resized copies recorded next to their originals (see core.images)
+VARIANT_MANIFESTS = [('books.Book', 'cover_variants'), ('news.News', 'image_variants')]
+
+
+class Command(BaseCommand):
+    help = 'Deletes unreferenced content-addressed blobs and orphaned media files (e.g. of deleted books)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Keep anything newer than this; its row may not be committed yet')
+        parser.add_argument('--recount', action='store_true',
+                            help='Recompute blob reference counts from the tables first')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(hours=options['grace_hours'])
+        if options['recount']:
+            self.recount()
+        self.collect_blobs(cutoff, options['dry_run'])
+        self.collect_orphans(cutoff.timestamp(), options['dry_run'])
+
+    def recount(self):
+        counts = Counter()
+        for model in apps.get_models():
+            for field in blob_fields(model):
+                prefix = model._meta.get_field(field).storage.prefix
+                names = model.objects.filter(**{f'{field}__startswith': f'{prefix}/'}).values_list(field, flat=True)
+                counts.update(names.iterator(chunk_size=2000))
+        changed = []
+        for blob in Blob.objects.only('pk', 'name', 'refcount').iterator(chunk_size=2000):
+            if blob.refcount != counts[blob.name]:
+                blob.refcount = counts[blob.name]
+                changed.append(blob)
+        Blob.objects.bulk_update(changed, ['refcount'], batch_size=1000)
+        self.stdout.write(f"Recounted references: {len(changed)} blobs corrected")
+
+    def collect_blobs(self, cutoff, dry_run):
+        count = size = 0
+        for storage in CONTENT_STORAGES:
+            candidates = Blob.objects.filter(refcount=0, touched_at__lt=cutoff, name__startswith=f'{storage.prefix}/')
+            # Exclusive: no upload can resolve to a blob between its row and its file going away
+            with storage.gc_lock(exclusive=True):
+                for blob in candidates.iterator():
+                    if not dry_run:
+                        if not Blob.objects.filter(pk=blob.pk, refcount=0).delete()[0]:
+                            continue  # referenced again meanwhile
+                        storage.delete(blob.name)
+                    count += 1
+                    size += blob.size
+        self.report('unreferenced blobs', count, size, dry_run)
+
+    def collect_orphans(self, cutoff, dry_run):
+        """Files under the fields' upload directories (and the blob directories) that no row points at."""
+        referenced = set(Blob.objects.values_list('name', flat=True).iterator(chunk_size=2000))
+        # Storage root -> directories to sweep in it
+        directories = defaultdict(set)
+        for storage in CONTENT_STORAGES:
+            directories[storage.location].add(storage.prefix)
+        for model in apps.get_models():
+            for field in model._meta.fields:
+                if isinstance(field, FileField) and isinstance(field.upload_to, str):
+                    directories[field.storage.location].add(field.upload_to.strip('/'))
+                    referenced.update(
+                        model.objects.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                        .values_list(field.name, flat=True).iterator(chunk_size=2000)
+                    )
+        for label, field in VARIANT_MANIFESTS:
+            for manifest in apps.get_model(label).objects.values_list(field, flat=True).iterator(chunk_size=2000):
+                for fmt in images.FORMATS:
+                    referenced.update((manifest or {}).get(fmt, {}).values())
+
+        count = size = 0
+        for root, names in sorted(directories.items()):
+            for directory in sorted(names):
+                for dirpath, _, filenames in os.walk(os.path.join(root, directory)):
+                    for filename in filenames:
+                        full = os.path.join(dirpath, filename)
+                        name = os.path.relpath(full, root).replace(os.sep, '/')
+                        if name in referenced or filename.endswith('.lock'):
+                            continue
+                        try:
+                            stat = os.stat(full)
+                        except FileNotFoundError:
+                            continue
+                        if stat.st_mtime > cutoff:
+                            continue
+                        if not dry_run:
+                            os.remove(full)
+                        count += 1
+                        size += stat.st_size
+        self.report('orphaned files', count, size, dry_run)
+
+    def report(self, what, count, size, dry_run):
+        verb = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} {what} ({size / 1024 / 1024:.1f} MB)"))
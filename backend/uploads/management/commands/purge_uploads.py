@@ -0,0 +1,22 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from uploads.models import Upload
+
+
+class Command(BaseCommand):
+    help = 'Deletes chunked uploads that were abandoned before completion, with their part files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=settings.CHUNKED_UPLOAD_EXPIRY_HOURS,
+                            help='Delete uploads untouched for this many hours')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - datetime.timedelta(hours=options['hours'])
+        count = 0
+        for upload in Upload.objects.filter(updated_at__lt=cutoff).iterator():
+            upload.discard()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} abandoned uploads"))
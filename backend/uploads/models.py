@@ -0,0 +1,64 @@
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class Upload(models.Model):
+    """
+    A file arriving in chunks (see uploads.views). The bytes so far live in
+    ``part_path``; ``received`` is how many of them are committed, so a
+    client that lost its connection resumes from there. The row is deleted
+    once the file is attached to its target.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    # Hex SHA-256 of the whole file if the client announced one; checked on completion
+    sha256 = models.CharField(max_length=64, blank=True, default='')
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Yuklash"
+        verbose_name_plural = "Yuklashlar"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    @property
+    def part_path(self):
+        return os.path.join(str(settings.CHUNKED_UPLOAD_DIR), f'{self.pk}.part')
+
+    def discard(self):
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
+        self.delete()
+
+
+class Blob(models.Model):
+    """A file in the content-addressed storage (uploads.storage) and how many fields use it."""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last time an upload resolved to this blob; gc_media spares recently touched blobs
+    touched_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Fayl (blob)"
+        verbose_name_plural = "Fayllar (blob)"
+        indexes = [
+            models.Index(fields=['refcount', 'touched_at'], name='blob_gc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount})"
@@ -0,0 +1,22 @@
+from django.conf import settings
+from rest_framework import serializers
+from .models import Upload
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$', required=False, allow_blank=True)
+
+    class Meta:
+        model = Upload
+        fields = ['id', 'filename', 'size', 'sha256', 'received', 'created_at']
+        read_only_fields = ['id', 'received', 'created_at']
+
+    def validate_size(self, value):
+        if value > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError("Fayl hajmi juda katta")
+        return value
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        data['chunk_size'] = settings.CHUNKED_UPLOAD_CHUNK_SIZE
+        return data
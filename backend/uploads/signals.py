@@ -0,0 +1,51 @@
+"""
+Keep ``Blob.refcount`` equal to the number of model fields pointing at each
+blob. Connected in UploadsConfig.ready() for every model with a FileField on
+the content-addressed storage.
+
+``QuerySet.update()``/``bulk_create()`` bypass these; run
+``manage.py gc_media --recount`` after writing file fields that way.
+"""
+from django.db.models import F, FileField
+from .models import Blob
+from .storage import ContentAddressedStorage
+
+
+def blob_fields(model):
+    return [
+        field.name for field in model._meta.fields
+        if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def adjust(name, delta):
+    if not name:
+        return
+    blobs = Blob.objects.filter(name=name)
+    if delta < 0:
+        blobs = blobs.filter(refcount__gte=-delta)
+    blobs.update(refcount=F('refcount') + delta)
+
+
+def remember_blobs(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._old_blobs = {}
+        return
+    instance._old_blobs = sender.objects.filter(pk=instance.pk).values(*blob_fields(sender)).first() or {}
+
+
+def count_blobs(sender, instance, update_fields=None, **kwargs):
+    old = instance.__dict__.pop('_old_blobs', {})
+    for field in blob_fields(sender):
+        if update_fields is not None and field not in update_fields:
+            continue
+        new_name = getattr(instance, field).name or ''
+        old_name = old.get(field) or ''
+        if new_name != old_name:
+            adjust(new_name, 1)
+            adjust(old_name, -1)
+
+
+def release_blobs(sender, instance, **kwargs):
+    for field in blob_fields(sender):
+        adjust(getattr(instance, field).name, -1)
@@ -0,0 +1,137 @@
+"""
+Content-addressed file storage: every file is stored once, named by its
+SHA-256 (``blobs/ab/cd/abcd....pdf``), however many times it is uploaded.
+
+The digest is computed while the upload is copied to a temporary file next
+to the blobs, so content is read once and never held in memory; a file that
+already has a temporary path (large uploads, finished chunked uploads) is
+hashed from disk and renamed into place. Each stored file has a ``Blob`` row
+whose ``refcount`` the signals in uploads.signals keep equal to the number
+of model fields pointing at it; ``manage.py gc_media`` deletes blobs nobody
+references any more.
+
+Book files go to ``protected_storage``: the same scheme under
+PROTECTED_MEDIA_ROOT, which lies outside MEDIA_ROOT, so neither ``/media/``
+nor a proxy alias of it can serve them; only the download views can.
+"""
+import fcntl
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+BLOB_PREFIX = 'blobs'
+PROTECTED_PREFIX = 'files'
+CHUNK_SIZE = 1024 * 1024
+
+
+def blob_name(digest, name, prefix=BLOB_PREFIX):
+    ext = os.path.splitext(name)[1].lower()
+    return f'{prefix}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def hash_path(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    # Blob names start with it; it also keeps Blob rows of different storages apart
+    prefix = BLOB_PREFIX
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content in _save; identical content shares it
+        return name
+
+    @contextmanager
+    def gc_lock(self, exclusive=False):
+        """Savers share this lock; gc_media takes it exclusively to delete blobs."""
+        path = self.path(f'{self.prefix}/.gc.lock')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _save(self, name, content):
+        from .models import Blob
+
+        blob_dir = self.path(self.prefix)
+        os.makedirs(blob_dir, exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            tmp = content.temporary_file_path()
+            # Finished chunked uploads already know their digest
+            digest = getattr(content, 'sha256', None) or hash_path(tmp)
+            size = os.path.getsize(tmp)
+            owned = False
+        else:
+            digest_obj = hashlib.sha256()
+            size = 0
+            fd, tmp = tempfile.mkstemp(dir=blob_dir, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest_obj.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+            digest = digest_obj.hexdigest()
+            owned = True
+
+        name = blob_name(digest, name, self.prefix)
+        full_path = self.path(name)
+        with self.gc_lock():
+            if os.path.exists(full_path):
+                # Already stored: the new copy is not needed
+                os.remove(tmp)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                if owned:
+                    os.replace(tmp, full_path)
+                else:
+                    file_move_safe(tmp, full_path, allow_overwrite=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+            blob, created = Blob.objects.get_or_create(name=name, defaults={'sha256': digest, 'size': size})
+            if not created:
+                # A fresh save restarts the grace period gc_media gives unreferenced blobs
+                Blob.objects.filter(pk=blob.pk).update(touched_at=timezone.now())
+        return name
+
+
+@deconstructible
+class ProtectedStorage(ContentAddressedStorage):
+    prefix = PROTECTED_PREFIX
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PROTECTED_MEDIA_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PROTECTED_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+
+
+blob_storage = ContentAddressedStorage()
+protected_storage = ProtectedStorage()
+CONTENT_STORAGES = (blob_storage, protected_storage)
+
+
+def storage_for(name):
+    """The content-addressed storage a ``Blob`` name belongs to."""
+    return protected_storage if name.startswith(f'{PROTECTED_PREFIX}/') else blob_storage
@@ -0,0 +1,277 @@
+import datetime
+import fcntl
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from books.models import Book
+from news.models import News
+from .models import Blob, Upload
+from .storage import blob_storage, protected_storage
+
+
+class TemporaryStorageMixin:
+    """MEDIA_ROOT, PROTECTED_MEDIA_ROOT and CHUNKED_UPLOAD_DIR in a throwaway directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=os.path.join(self.root, 'media'),
+            PROTECTED_MEDIA_ROOT=os.path.join(self.root, 'protected'),
+            CHUNKED_UPLOAD_DIR=os.path.join(self.root, 'uploads'),
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+@override_settings(CHUNKED_UPLOAD_CHUNK_SIZE=8)
+class ChunkedUploadTests(TemporaryStorageMixin, TestCase):
+    content = b'0123456789abcdef!'
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_user('admin', password='x', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.book = Book.objects.create(title='Kitob', author='Muallif')
+
+    def start(self, **fields):
+        fields = {'filename': 'kitob.pdf', 'size': len(self.content), **fields}
+        response = self.client.post(reverse('upload-create'), fields, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def put(self, pk, start, end, body=None, **headers):
+        body = self.content[start:end + 1] if body is None else body
+        return self.client.put(
+            reverse('upload-detail', args=[pk]), body, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.content)}', **headers,
+        )
+
+    def complete(self, pk):
+        return self.client.post(reverse('upload-complete', args=[pk]), {'book': self.book.pk}, format='json')
+
+    def test_chunks_resume_and_complete(self):
+        pk = self.start(sha256=hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(self.put(pk, 0, 7).json(), {'received': 8, 'size': len(self.content)})
+        # A client that lost the connection asks where to go on
+        resumed = self.client.get(reverse('upload-detail', args=[pk])).json()
+        self.assertEqual((resumed['received'], resumed['chunk_size']), (8, 8))
+        self.assertEqual(self.put(pk, 8, 15).json()['received'], 16)
+        self.assertEqual(self.put(pk, 16, 16).json()['received'], len(self.content))
+
+        part = Upload.objects.get(pk=pk).part_path
+        response = self.complete(pk)
+        self.assertEqual(response.status_code, 200)
+        self.book.refresh_from_db()
+        self.assertEqual(response.json()['file'], self.book.file.name)
+        with self.book.file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertFalse(Upload.objects.filter(pk=pk).exists())
+        self.assertFalse(os.path.exists(part))
+
+    def test_wrong_offset_is_a_conflict(self):
+        pk = self.start()
+        response = self.put(pk, 8, 15)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 0)
+
+        self.put(pk, 0, 7)
+        # A repeated chunk after a lost answer
+        response = self.put(pk, 0, 7)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 8)
+
+    def test_chunk_checksum_mismatch_keeps_the_offset(self):
+        pk = self.start()
+        response = self.put(pk, 0, 7, HTTP_X_CHUNK_SHA256=hashlib.sha256(b'boshqa').hexdigest())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['received'], 0)
+        response = self.put(pk, 0, 7, HTTP_X_CHUNK_SHA256=hashlib.sha256(self.content[:8]).hexdigest())
+        self.assertEqual(response.json()['received'], 8)
+
+    def test_bad_chunks_are_rejected(self):
+        pk = self.start()
+        detail = reverse('upload-detail', args=[pk])
+        self.assertEqual(self.client.put(detail, b'x', content_type='application/octet-stream').status_code, 400)
+        response = self.client.put(
+            detail, b'0123', content_type='application/octet-stream', HTTP_CONTENT_RANGE='bytes 0-3/99',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.put(pk, 0, 3, body=b'01').status_code, 400)
+        self.assertEqual(self.put(pk, 0, 15).status_code, 413)
+        self.assertEqual(Upload.objects.get(pk=pk).received, 0)
+
+    def test_concurrent_writer_is_a_conflict(self):
+        pk = self.start()
+        upload = Upload.objects.get(pk=pk)
+        os.makedirs(os.path.dirname(upload.part_path))
+        with open(upload.part_path, 'w') as other:
+            fcntl.flock(other, fcntl.LOCK_EX)
+            self.assertEqual(self.put(pk, 0, 7).status_code, 409)
+        self.assertEqual(self.put(pk, 0, 7).status_code, 200)
+
+    def test_incomplete_upload_cannot_be_attached(self):
+        pk = self.start()
+        self.put(pk, 0, 7)
+        response = self.complete(pk)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 8)
+        self.book.refresh_from_db()
+        self.assertFalse(self.book.file)
+
+    def test_file_checksum_mismatch_discards_the_upload(self):
+        pk = self.start(sha256='0' * 64)
+        for start in range(0, len(self.content), 8):
+            self.put(pk, start, min(start + 7, len(self.content) - 1))
+        part = Upload.objects.get(pk=pk).part_path
+        self.assertEqual(self.complete(pk).status_code, 400)
+        self.assertFalse(Upload.objects.filter(pk=pk).exists())
+        self.assertFalse(os.path.exists(part))
+
+    def test_uploads_are_private_and_bounded(self):
+        pk = self.start()
+        other = User.objects.create_user('boshqa', password='x', is_staff=True)
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(reverse('upload-detail', args=[pk])).status_code, 404)
+        self.assertEqual(self.put(pk, 0, 7).status_code, 404)
+        with self.settings(CHUNKED_UPLOAD_MAX_SIZE=10):
+            response = self.client.post(reverse('upload-create'), {'filename': 'a.pdf', 'size': 11}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(User.objects.create_user('talaba', password='x'))
+        self.assertEqual(self.client.get(reverse('upload-detail', args=[pk])).status_code, 403)
+
+    def test_purge_removes_abandoned_uploads(self):
+        old, fresh = self.start(), self.start()
+        self.put(old, 0, 7)
+        Upload.objects.filter(pk=old).update(updated_at=timezone.now() - datetime.timedelta(days=2))
+        part = Upload.objects.get(pk=old).part_path
+        call_command('purge_uploads', hours=24, stdout=io.StringIO())
+        self.assertEqual(list(Upload.objects.values_list('pk', flat=True)), [Upload.objects.get(pk=fresh).pk])
+        self.assertFalse(os.path.exists(part))
+
+
+class BlobStorageTests(TemporaryStorageMixin, TestCase):
+
+    def book(self, **files):
+        return Book.objects.create(title='Kitob', author='Muallif', **files)
+
+    def refcounts(self):
+        return dict(Blob.objects.values_list('name', 'refcount'))
+
+    def test_same_content_is_stored_once(self):
+        first = self.book(cover_image=SimpleUploadedFile('a.png', b'rasm'))
+        second = self.book(cover_image=SimpleUploadedFile('boshqa nom.PNG', b'rasm'))
+        news = News.objects.create(title='Yangilik', description='Matn', image=SimpleUploadedFile('n.png', b'rasm'))
+        digest = hashlib.sha256(b'rasm').hexdigest()
+        name = f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.png'
+        self.assertEqual({first.cover_image.name, second.cover_image.name, news.image.name}, {name})
+        self.assertEqual(self.refcounts(), {name: 3})
+        blob = Blob.objects.get()
+        self.assertEqual((blob.sha256, blob.size), (digest, 4))
+        self.assertEqual(os.listdir(os.path.dirname(blob_storage.path(name))), [f'{digest}.png'])
+
+    def test_book_files_have_their_own_blobs(self):
+        book = self.book(cover_image=SimpleUploadedFile('a.pdf', b'%PDF'), file=SimpleUploadedFile('a.pdf', b'%PDF'))
+        self.assertTrue(book.cover_image.name.startswith('blobs/'))
+        self.assertTrue(book.file.name.startswith('files/'))
+        self.assertEqual(set(self.refcounts().values()), {1})
+        self.assertTrue(protected_storage.exists(book.file.name))
+        self.assertFalse(blob_storage.exists(book.file.name))
+
+    def test_refcounts_follow_saves_and_deletes(self):
+        book = self.book(cover_image=SimpleUploadedFile('a.png', b'birinchi'))
+        other = self.book(cover_image=SimpleUploadedFile('b.png', b'birinchi'))
+        old = book.cover_image.name
+
+        book.cover_image = SimpleUploadedFile('c.png', b'ikkinchi')
+        book.save()
+        self.assertEqual(self.refcounts(), {old: 1, book.cover_image.name: 1})
+        # Saving other fields only leaves the counts alone
+        book.title = 'Yangi'
+        book.save(update_fields=['title'])
+        self.assertEqual(self.refcounts(), {old: 1, book.cover_image.name: 1})
+
+        other.delete()
+        book.delete()
+        self.assertEqual(set(self.refcounts().values()), {0})
+
+    def test_refcount_never_goes_below_zero(self):
+        book = self.book(cover_image=SimpleUploadedFile('a.png', b'rasm'))
+        Blob.objects.update(refcount=0)
+        book.delete()
+        self.assertEqual(Blob.objects.get().refcount, 0)
+
+
+class GcMediaTests(TemporaryStorageMixin, TestCase):
+
+    def gc(self, *args, **options):
+        output = io.StringIO()
+        call_command('gc_media', *args, stdout=output, **options)
+        return output.getvalue()
+
+    def age(self, names, hours=48):
+        Blob.objects.filter(name__in=names).update(touched_at=timezone.now() - datetime.timedelta(hours=hours))
+
+    def test_unreferenced_blobs_are_deleted_after_the_grace_period(self):
+        kept = Book.objects.create(title='Kitob', author='Muallif', file=SimpleUploadedFile('a.pdf', b'qoladi'))
+        gone = Book.objects.create(title='Kitob', author='Muallif', file=SimpleUploadedFile('b.pdf', b'ketadi'))
+        recent = protected_storage.save('c.pdf', ContentFile(b'yangi'))
+        name = gone.file.name
+        gone.delete()
+        self.age([kept.file.name, name])
+
+        self.assertIn('Would delete 1 unreferenced blobs', self.gc('--dry-run'))
+        self.assertTrue(protected_storage.exists(name))
+        self.assertIn('Deleted 1 unreferenced blobs', self.gc())
+        self.assertFalse(protected_storage.exists(name))
+        self.assertEqual(set(Blob.objects.values_list('name', flat=True)), {kept.file.name, recent})
+        self.assertTrue(protected_storage.exists(kept.file.name))
+
+    def test_recount_repairs_counts_before_collecting(self):
+        book = Book.objects.create(title='Kitob', author='Muallif', cover_image=SimpleUploadedFile('a.png', b'rasm'))
+        # Written around the signals, e.g. by a bulk update
+        Blob.objects.update(refcount=0)
+        self.age([book.cover_image.name])
+        self.assertIn('1 blobs corrected', self.gc('--recount'))
+        self.assertEqual(Blob.objects.get().refcount, 1)
+        self.assertTrue(blob_storage.exists(book.cover_image.name))
+
+    def test_orphaned_files_are_deleted(self):
+        legacy = Book.objects.create(title='Kitob', author='Muallif')
+        Book.objects.filter(pk=legacy.pk).update(file='books/files/eski.pdf', cover_image='books/covers/eski.png')
+        paths = {
+            name: storage.path(name) for storage, name in [
+                (protected_storage, 'books/files/eski.pdf'), (protected_storage, 'books/files/tashlandiq.pdf'),
+                (blob_storage, 'books/covers/eski.png'), (blob_storage, 'books/covers/tashlandiq.png'),
+            ]
+        }
+        old = timezone.now().timestamp() - 48 * 3600
+        for path in paths.values():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'x')
+            os.utime(path, (old, old))
+        fresh = blob_storage.path('books/covers/yangi.png')
+        with open(fresh, 'wb') as f:
+            f.write(b'x')
+
+        self.assertIn('Deleted 2 orphaned files', self.gc())
+        self.assertTrue(os.path.exists(paths['books/files/eski.pdf']))
+        self.assertTrue(os.path.exists(paths['books/covers/eski.png']))
+        self.assertFalse(os.path.exists(paths['books/files/tashlandiq.pdf']))
+        self.assertFalse(os.path.exists(paths['books/covers/tashlandiq.png']))
+        self.assertTrue(os.path.exists(fresh))
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import UploadCreateView, UploadDetailView, UploadCompleteView
+
+urlpatterns = [
+    path('', UploadCreateView.as_view(), name='upload-create'),
+    path('<uuid:pk>/', UploadDetailView.as_view(), name='upload-detail'),
+    path('<uuid:pk>/complete/', UploadCompleteView.as_view(), name='upload-complete'),
+]
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import transaction
+from django.http import UnreadablePostError
+from django.shortcuts import get_object_or_404
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from books.models import Book
+from .models import Upload
+from .serializers import UploadSerializer
+from . import chunks
+
+
+class UploadCreateView(APIView):
+    """
+    ``POST /api/uploads/`` with ``{filename, size, sha256?}`` starts a chunked
+    upload. Then, for each chunk, ``PUT /api/uploads/<id>/`` with the raw
+    bytes and ``Content-Range: bytes <start>-<end>/<size>`` (optionally
+    ``X-Chunk-SHA256``), and ``POST /api/uploads/<id>/complete/``.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        serializer = UploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        upload = serializer.save(user=request.user)
+        return Response(UploadSerializer(upload).data, status=201)
+
+
+class UploadDetailView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get_upload(self, request, pk):
+        return get_object_or_404(Upload, pk=pk, user=request.user)
+
+    def get(self, request, pk):
+        # Where to resume after a dropped connection
+        return Response(UploadSerializer(self.get_upload(request, pk)).data)
+
+    def put(self, request, pk):
+        upload = self.get_upload(request, pk)
+        content_range = chunks.parse_content_range(request.headers.get('Content-Range'))
+        if content_range is None or content_range[2] != upload.size:
+            return Response({'error': "Content-Range noto'g'ri"}, status=400)
+        start, end, _ = content_range
+        length = end - start + 1
+        if length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+            return Response({'error': "Bo'lak juda katta"}, status=413)
+        if int(request.headers.get('Content-Length') or 0) != length:
+            return Response({'error': "Content-Length Content-Range bilan mos emas"}, status=400)
+
+        try:
+            with chunks.locked(upload) as fd:
+                upload.refresh_from_db(fields=['received'])
+                if start != upload.received:
+                    # Lost or repeated chunk: tell the client where to continue
+                    return Response({'error': "Noto'g'ri joy", 'received': upload.received}, status=409)
+                # Straight from the WSGI input; request.data would buffer the body
+                chunks.write_chunk(fd, request.stream, start, length, request.headers.get('X-Chunk-SHA256'))
+                upload.received = end + 1
+                upload.save(update_fields=['received', 'updated_at'])
+        except chunks.Busy:
+            return Response({'error': "Bu fayl boshqa so'rovda yuklanmoqda", 'received': upload.received}, status=409)
+        except (chunks.ChunkError, UnreadablePostError) as exc:
+            return Response({'error': str(exc), 'received': upload.received}, status=400)
+        return Response({'received': upload.received, 'size': upload.size})
+
+    def delete(self, request, pk):
+        self.get_upload(request, pk).discard()
+        return Response(status=204)
+
+
+class UploadCompleteView(APIView):
+    """Verify the finished upload and attach it to a book: ``{"book": <id>}``."""
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, pk):
+        upload = get_object_or_404(Upload, pk=pk, user=request.user)
+        book = get_object_or_404(Book, pk=request.data.get('book'))
+        try:
+            with chunks.locked(upload) as fd:
+                upload.refresh_from_db(fields=['received'])
+                if upload.received != upload.size:
+                    return Response({'error': "Fayl to'liq yuklanmagan", 'received': upload.received}, status=409)
+                sha256 = chunks.file_sha256(fd, upload.size)
+                if upload.sha256 and sha256 != upload.sha256.lower():
+                    upload.discard()
+                    return Response({'error': "Fayl nazorat summasi mos kelmadi"}, status=400)
+                with transaction.atomic():
+                    chunks.attach(upload, book.file, sha256)
+                    book.save()
+                    upload.delete()
+        except chunks.Busy:
+            return Response({'error': "Bu fayl boshqa so'rovda yuklanmoqda"}, status=409)
+        return Response({'book': book.pk, 'file': book.file.name, 'sha256': sha256})
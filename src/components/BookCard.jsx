@@ -3,10 +3,14 @@ import { User, BookOpen } from "lucide-react";
 import { useNavigate, Link } from "react-router-dom";
 import { motion } from "framer-motion";
 
+// Grid column widths in BooksPage
+const COVER_SIZES = "(min-width: 1024px) 25vw, (min-width: 640px) 50vw, 100vw";
+
 export default function BookCard({
   title,
   author,
   coverUrl,
+  coverSrcset,
   id,
   category = "Kategoriya",
   description = "Izoh mavjud emas",
@@ -48,13 +52,20 @@ export default function BookCard({
           {/* Image */}
           <div className="w-full h-full rounded-r-xl overflow-hidden bg-stone-100 relative">
             {!isImageLoaded && <div className="absolute inset-0 bg-stone-200 animate-pulse" />}
-            <img
-              src={validCoverUrl}
-              alt={title}
-              className="w-full h-full object-cover"
-              onLoad={() => setIsImageLoaded(true)}
-              onError={(e) => { e.target.src = fallbackCover; setIsImageLoaded(true); }}
-            />
+            {/* Resized WebP/JPEG copies from the API; the browser picks the width it renders */}
+            <picture>
+              {coverSrcset?.webp && <source type="image/webp" srcSet={coverSrcset.webp} sizes={COVER_SIZES} />}
+              <img
+                src={validCoverUrl}
+                srcSet={coverSrcset?.jpeg}
+                sizes={coverSrcset ? COVER_SIZES : undefined}
+                alt={title}
+                loading="lazy"
+                className="w-full h-full object-cover"
+                onLoad={() => setIsImageLoaded(true)}
+                onError={(e) => { e.target.srcset = ""; e.target.src = fallbackCover; setIsImageLoaded(true); }}
+              />
+            </picture>
 
             {/* Category Badge on Cover */}
             <div className="absolute top-4 right-4 z-50">
@@ -12,7 +12,7 @@ export default function MostPopularBooks() {
   const [books, setBooks] = useState([]);
 
   useEffect(() => {
-    fetch(`${API_BASE_URL}/api/books/popular/`, {
+    fetch(`${API_BASE_URL}/api/books/popular/?fields=id,title,author,description,cover_image`, {
       headers: {
         "Accept-Language": i18n.language
       }
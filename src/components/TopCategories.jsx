@@ -42,7 +42,7 @@ function BookCard({ title, cover, id }) {
 
 export default function TopCategoriesSection() {
   const { t } = useTranslation();
-  const [activeCategory, setActiveCategory] = useState("Adabiyotlar");
+  const [activeCategory, setActiveCategory] = useState("adabiyotlar");
   const [books, setBooks] = useState([]);
   const [loading, setLoading] = useState(false);
   const [showArrows, setShowArrows] = useState(false);
@@ -1,6 +1,6 @@
 export const BOOK_CATEGORIES = [
-    { value: "Adabiyotlar", label: "Adabiyotlar" },
-    { value: "Darslik", label: "Darslik" },
-    { value: "Ilmiy", label: "Ilmiy Adabiyot" },
-    { value: "Oquv", label: "O'quv adabiyotlar" }
+    { value: "adabiyotlar", label: "Adabiyotlar" },
+    { value: "darslik", label: "Darslik" },
+    { value: "ilmiy", label: "Ilmiy Adabiyot" },
+    { value: "oquv", label: "O'quv adabiyotlar" }
 ];
@@ -125,7 +125,7 @@ export function UserProvider({ children }) {
     };
 
     return (
-        <UserContext.Provider value={{ user, token, login, loginWithHemis, getHemisAuthUrl, logout, refreshUser }}>
+        <UserContext.Provider value={{ user, setUser, token, login, loginWithHemis, getHemisAuthUrl, logout, refreshUser }}>
             {children}
         </UserContext.Provider>
     );
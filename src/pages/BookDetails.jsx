@@ -22,10 +22,11 @@ export default function BookDetails() {
   const [isFavorited, setIsFavorited] = useState(false);
 
   useEffect(() => {
-    if (user && user.favourites && book) {
-      setIsFavorited(user.favourites.some(fav => fav.id === book.id));
-    }
-  }, [user, book]);
+    if (!user || !book) return;
+    axios.get(`${API_BASE_URL}/api/accounts/favorites/check/`, { params: { books: book.id } })
+      .then(res => setIsFavorited(res.data.favourites.includes(book.id)))
+      .catch(error => console.error("Error checking favorite:", error));
+  }, [user?.id, book]);
 
   const toggleFavorite = async () => {
     if (!user) {
@@ -33,19 +34,20 @@ export default function BookDetails() {
       return;
     }
     try {
-      const response = await axios.post(`${API_BASE_URL}/api/accounts/favorites/${book.id}/`, {}, {
-        headers: { Authorization: `Token ${localStorage.getItem('token')}` } // Assuming token is in localStorage
+      // PUT adds, DELETE removes; both are safe to repeat
+      const response = await axios({
+        method: isFavorited ? "delete" : "put",
+        url: `${API_BASE_URL}/api/accounts/favorites/`,
+        data: { books: [book.id] }
       });
 
-      setIsFavorited(response.data.liked);
+      setIsFavorited(!isFavorited);
 
-      // Update User Context to reflect changes immediately in Profile
-      if (response.data.favourites) {
-        setUser(prevUser => ({
-          ...prevUser,
-          favourites: response.data.favourites
-        }));
-      }
+      // Keep the profile counter in step without refetching it
+      setUser(prevUser => ({
+        ...prevUser,
+        favourites_count: response.data.favourites_count
+      }));
     } catch (error) {
       console.error("Error toggling favorite:", error);
     }
@@ -160,8 +162,11 @@ export default function BookDetails() {
                     onClick={() => {
                       if (user) {
                         if (book.file) {
-                          const fileUrl = book.file.startsWith('http') ? book.file : `${API_BASE_URL}${book.file}`;
-                          window.open(fileUrl, '_blank');
+                          // The tab gets a signed link: it cannot send the auth header itself
+                          const win = window.open('', '_blank');
+                          axios.get(`${API_BASE_URL}/api/books/${book.id}/file/link/`)
+                            .then(res => { win.location = res.data.url; })
+                            .catch(() => { win.close(); alert("Faylni ochib bo'lmadi"); });
                         }
                         else alert("Fayl yuklanmagan");
                       } else {
@@ -97,7 +97,7 @@ export default function BooksPage() {
     } else if (sort === "author") {
       works.sort((a, b) => (a.author || "").localeCompare(b.author || ""));
     } else if (sort === "year") {
-      works.sort((a, b) => new Date(b.published_date || 0) - new Date(a.published_date || 0));
+      works.sort((a, b) => (b.year || 0) - (a.year || 0));
     }
 
     setDisplayBooks(works);
@@ -215,7 +215,8 @@ export default function BooksPage() {
                               ? (book.cover_image.startsWith('http') ? book.cover_image : `${API_BASE_URL}${book.cover_image}`)
                               : ""
                           }
-                          category={book.category}
+                          coverSrcset={book.cover_srcset}
+                          category={book.category_name || book.category}
                         />
                       </motion.div>
                     ))
@@ -1,4 +1,5 @@
 import { useEffect, useState } from "react";
+import axios from "axios";
 import { useUser } from "../context/UserContext";
 import { FiLogOut, FiHeart, FiUser, FiSettings, FiBookOpen, FiAward, FiGrid } from "react-icons/fi";
 import { Link, useNavigate } from "react-router-dom";
@@ -9,6 +10,8 @@ export default function Profile() {
     const { user, logout, refreshUser } = useUser();
     const navigate = useNavigate();
     const [activeTab, setActiveTab] = useState("books");
+    const [favourites, setFavourites] = useState([]);
+    const [nextFavourites, setNextFavourites] = useState(null);
 
     useEffect(() => {
         if (!user) {
@@ -18,6 +21,20 @@ export default function Profile() {
         }
     }, [user, navigate]);
 
+    const fetchFavourites = async (url = `${API_BASE_URL}/api/accounts/favorites/`, append = false) => {
+        try {
+            const res = await axios.get(url);
+            setFavourites(prev => append ? [...prev, ...res.data.results] : res.data.results);
+            setNextFavourites(res.data.next);
+        } catch (error) {
+            console.error("Error fetching favourites:", error);
+        }
+    };
+
+    useEffect(() => {
+        if (user) fetchFavourites();
+    }, [user?.id, user?.favourites_count]);
+
     const handleLogout = () => {
         logout();
         navigate("/");
@@ -99,11 +116,12 @@ export default function Profile() {
                                 <h3 className="text-xl font-bold font-serif mb-6 text-stone-800 flex items-center gap-2">
                                     <FiHeart className="text-red-500" /> Sevimli Kitoblar
                                 </h3>
-                                {user.favourites && user.favourites.length > 0 ? (
+                                {favourites.length > 0 ? (
+                                    <>
                                     <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-5">
-                                        {user.favourites.map((book) => {
-                                            const coverSrc = book.coverUrl
-                                                ? (book.coverUrl.startsWith('http') ? book.coverUrl : `${API_BASE_URL}${book.coverUrl}`)
+                                        {favourites.map((book) => {
+                                            const coverSrc = book.cover_image
+                                                ? (book.cover_image.startsWith('http') ? book.cover_image : `${API_BASE_URL}${book.cover_image}`)
                                                 : "/images/image.png";
                                             return (
                                                 <Link to={`/book/${book.id}`} key={book.id} className="group bg-white rounded-xl overflow-hidden border border-stone-100 hover:border-amber-200 hover:shadow-md transition-all flex flex-col">
@@ -121,6 +139,12 @@ export default function Profile() {
                                             )
                                         })}
                                     </div>
+                                    {nextFavourites && (
+                                        <div className="mt-6 text-center">
+                                            <button onClick={() => fetchFavourites(nextFavourites, true)} className="px-6 py-2 rounded-full text-sm font-semibold text-amber-700 border border-amber-200 hover:bg-amber-50 transition-all">Ko'proq ko'rsatish</button>
+                                        </div>
+                                    )}
+                                    </>
                                 ) : (
                                     <div className="flex flex-col items-center justify-center py-20 text-center opacity-60">
                                         <div className="w-16 h-16 bg-stone-200 rounded-full flex items-center justify-center mb-4">
@@ -143,7 +167,7 @@ export default function Profile() {
                                 </h3>
                                 <div className="grid grid-cols-1 sm:grid-cols-2 gap-4">
                                     <div className="bg-gradient-to-br from-amber-50 to-orange-50 p-6 rounded-2xl border border-amber-100">
-                                        <div className="text-3xl font-bold text-amber-700 mb-1">{user.favourites?.length || 0}</div>
+                                        <div className="text-3xl font-bold text-amber-700 mb-1">{user.favourites_count || 0}</div>
                                         <div className="text-sm text-stone-600">Jami Saqlangan Kitoblar</div>
                                     </div>
                                     <div className="bg-gradient-to-br from-blue-50 to-indigo-50 p-6 rounded-2xl border border-blue-100">
@@ -5,6 +5,7 @@ import { FiSave, FiArrowLeft, FiUploadCloud, FiGlobe } from "react-icons/fi";
 import { Loader } from "lucide-react";
 import { API_BASE_URL } from "../../config";
 import { BOOK_CATEGORIES } from "../../constants/categories";
+import { uploadBookFile } from "../../utils/chunkedUpload";
 
 export default function AdminBookForm() {
     const { id } = useParams();
@@ -13,6 +14,7 @@ export default function AdminBookForm() {
 
     const [loading, setLoading] = useState(isEdit);
     const [submitting, setSubmitting] = useState(false);
+    const [uploadProgress, setUploadProgress] = useState(null);
     const [activeTab, setActiveTab] = useState("uz"); // 'uz', 'ru', 'en'
 
     // Initial State including translated fields
@@ -20,7 +22,7 @@ export default function AdminBookForm() {
         // Common
         page_count: 0,
         publication_year: new Date().getFullYear(),
-        category: "Adabiyotlar",
+        category: "adabiyotlar",
 
         // Files
         cover_image: null,
@@ -38,7 +40,7 @@ export default function AdminBookForm() {
 
     useEffect(() => {
         if (isEdit) {
-            axios.get(`${API_BASE_URL}/api/books/${id}/`)
+            axios.get(`${API_BASE_URL}/api/books/${id}/?translations=all`)
                 .then(res => {
                     const data = res.data;
                     setFormData({
@@ -84,31 +86,32 @@ export default function AdminBookForm() {
             data.append(key, formData[key]);
         });
 
-        // Ensure category is set for all languages
+        // Category slug; its labels are translated on the Category itself
         data.append("category", formData.category);
-        data.append("category_uz", formData.category);
-        data.append("category_ru", formData.category);
-        data.append("category_en", formData.category);
 
         // Handle date
         data.append("published_date", `${formData.publication_year}-01-01`);
 
-        // Handle files
+        // Handle files; the book file itself goes through the chunked upload API afterwards
         if (formData.cover_image) data.append("cover_image", formData.cover_image);
-        if (formData.file) data.append("file", formData.file);
 
         try {
+            let bookId = id;
             if (isEdit) {
                 if (!formData.cover_image) data.delete("cover_image");
-                if (!formData.file) data.delete("file");
 
                 await axios.patch(`${API_BASE_URL}/api/books/${id}/`, data, {
                     headers: { 'Content-Type': 'multipart/form-data' }
                 });
             } else {
-                await axios.post(`${API_BASE_URL}/api/books/`, data, {
+                const res = await axios.post(`${API_BASE_URL}/api/books/`, data, {
                     headers: { 'Content-Type': 'multipart/form-data' }
                 });
+                bookId = res.data.id;
+            }
+            if (formData.file) {
+                setUploadProgress(0);
+                await uploadBookFile(bookId, formData.file, setUploadProgress);
             }
             navigate("/admin-panel/books");
         } catch (error) {
@@ -116,6 +119,7 @@ export default function AdminBookForm() {
             alert("Saqlashda xatolik! " + (error.response?.data?.detail || JSON.stringify(error.response?.data)));
         } finally {
             setSubmitting(false);
+            setUploadProgress(null);
         }
     };
 
@@ -221,6 +225,9 @@ export default function AdminBookForm() {
                                 <input name="file" onChange={handleChange} type="file" className="absolute inset-0 opacity-0 cursor-pointer z-10" />
                                 <FiUploadCloud size={24} className="text-stone-400 mb-2" />
                                 <span className="text-xs text-stone-500 break-all px-2">{formData.file?.name || "Fayl yuklash"}</span>
+                                {uploadProgress !== null && (
+                                    <span className="text-xs font-semibold text-amber-600 mt-1">{Math.round(uploadProgress * 100)}%</span>
+                                )}
                             </div>
                         </div>
                     </div>
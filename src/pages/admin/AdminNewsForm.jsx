@@ -33,7 +33,7 @@ export default function AdminNewsForm() {
 
     useEffect(() => {
         if (isEdit) {
-            axios.get(`${API_BASE_URL}/api/news/${id}/`)
+            axios.get(`${API_BASE_URL}/api/news/${id}/?translations=all`)
                 .then(res => {
                     const data = res.data;
                     setFormData({
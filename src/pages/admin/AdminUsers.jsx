@@ -9,12 +9,17 @@ export default function AdminUsers() {
     const [users, setUsers] = useState([]);
     const [loading, setLoading] = useState(true);
     const [search, setSearch] = useState("");
+    const [next, setNext] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     const fetchUsers = async () => {
         setLoading(true);
         try {
-            const res = await axios.get(`${API_BASE_URL}/api/accounts/users/?search=${search}`);
-            setUsers(res.data.results || res.data); // Handle pagination or list
+            const res = await axios.get(`${API_BASE_URL}/api/accounts/users/`, {
+                params: { search, page_size: 50 }
+            });
+            setUsers(res.data.results);
+            setNext(res.data.next);
         } catch (error) {
             console.error("Error fetching users:", error);
         } finally {
@@ -22,6 +27,19 @@ export default function AdminUsers() {
         }
     };
 
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            const res = await axios.get(next);
+            setUsers(prev => [...prev, ...res.data.results]);
+            setNext(res.data.next);
+        } catch (error) {
+            console.error("Error fetching users:", error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         const timeout = setTimeout(() => {
             fetchUsers();
@@ -87,7 +105,7 @@ export default function AdminUsers() {
                                                 </div>
                                                 <div>
                                                     <p className="font-bold text-stone-800">{user.first_name || user.username}</p>
-                                                    <p className="text-xs text-stone-400">@{user.username}</p>
+                                                    <p className="text-xs text-stone-400">@{user.username}{user.hemis_id ? ` · HEMIS ${user.hemis_id}` : ""}</p>
                                                 </div>
                                             </div>
                                         </td>
@@ -111,6 +129,17 @@ export default function AdminUsers() {
                         </tbody>
                     </table>
                 </div>
+                {next && !loading && (
+                    <div className="p-4 border-t border-stone-100 text-center">
+                        <button
+                            onClick={loadMore}
+                            disabled={loadingMore}
+                            className="px-4 py-2 rounded-xl text-sm font-semibold text-amber-700 hover:bg-amber-50 transition-colors disabled:opacity-50"
+                        >
+                            {loadingMore ? <Loader className="animate-spin inline" /> : "Ko'proq yuklash"}
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -0,0 +1,45 @@
+import axios from "axios";
+import { API_BASE_URL } from "../config";
+
+const MAX_RETRIES = 5;
+
+async function sha256Hex(blob) {
+    // crypto.subtle only exists on https/localhost; the server then skips the check
+    if (!window.crypto?.subtle) return null;
+    const digest = await window.crypto.subtle.digest("SHA-256", await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, "0")).join("");
+}
+
+// Sends `file` in chunks to /api/uploads/ and attaches it to the book.
+// A failed chunk is retried from the offset the server reports.
+export async function uploadBookFile(bookId, file, onProgress) {
+    const { data: upload } = await axios.post(`${API_BASE_URL}/api/uploads/`, {
+        filename: file.name,
+        size: file.size,
+    });
+    const url = `${API_BASE_URL}/api/uploads/${upload.id}/`;
+
+    let offset = 0;
+    let retries = 0;
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + upload.chunk_size);
+        const headers = {
+            "Content-Type": "application/octet-stream",
+            "Content-Range": `bytes ${offset}-${offset + chunk.size - 1}/${file.size}`,
+        };
+        const checksum = await sha256Hex(chunk);
+        if (checksum) headers["X-Chunk-SHA256"] = checksum;
+        try {
+            const res = await axios.put(url, chunk, { headers });
+            offset = res.data.received;
+            retries = 0;
+        } catch (error) {
+            if (++retries > MAX_RETRIES) throw error;
+            const state = await axios.get(url).catch(() => null);
+            if (state) offset = state.data.received;
+        }
+        if (onProgress) onProgress(offset / file.size);
+    }
+
+    return axios.post(`${url}complete/`, { book: bookId });
+}